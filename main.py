@@ -1,16 +1,24 @@
 """cdp エントリポイント。各コンポーネントを組み立てて起動する。"""
+import argparse
+import functools
 import logging
 import logging.handlers
 import sys
 import tkinter as tk
 
+from src.audio.burst import BurstBuffer
 from src.audio.engine import PlaybackEngine
-from src.audio.sources import create_source
-from src.core.controller import AppController
-from src.disc.monitor import create_monitor
+from src.audio.output import (OUTPUT_MODES, PersistentOutput,
+                              make_stream_factory)
+from src.audio.ripcache import AudioCache
+from src.audio.sources import READERS, create_source
+from src.core.controller import AppController, default_eject
+from src.core.multi import MultiDriveController
+from src.disc.monitor import create_monitor, discover_drives
 from src.disc.toc import TocReader
-from src.metadata.fetcher import MetadataService
-from src.ui.view import View
+from src.metadata.fetcher import (MetadataFetcher, MetadataService,
+                                  thumbnail_size)
+from src.ui.view import View, art_size
 
 VERSION = "0.4.0"
 
@@ -26,34 +34,161 @@ def setup_logging():
         logging.getLogger(noisy).setLevel(logging.WARNING)
 
 
-def main():
-    setup_logging()
-    logging.info("cdp %s starting", VERSION)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CD Auto-Player")
+    parser.add_argument(
+        "--output", choices=OUTPUT_MODES, default="blocking",
+        help="音声出力方式(blocking: write で直接書く / callback: "
+             "PortAudio のコールバックで引き出す)")
+    parser.add_argument(
+        "--latency", default=None,
+        help="callback 方式の出力レイテンシ(秒、または low / high)")
+    parser.add_argument(
+        "--blocksize", type=int, default=0,
+        help="callback 方式のブロック長(フレーム、0 = PortAudio 任せ)")
+    parser.add_argument(
+        "--audio-device", action="append", default=[],
+        metavar="DRIVE=DEVICE",
+        help="ドライブごとの出力デバイス(例: /dev/sr1=hw:1,0)。複数ドライブを"
+             "別々に鳴らすときに繰り返し指定する。指定のないドライブは既定の出力")
+    parser.add_argument(
+        "--reader", choices=READERS, default="cdparanoia",
+        help="Linux でのドライブの読み方(cdparanoia: 子プロセス / ioctl: "
+             "CDROMREADAUDIO で直接)")
+    parser.add_argument(
+        "--rip-cache-gb", type=float, default=0,
+        help="再生しながらディスクを ~/.cache/cdp に保存し、次回はそこから"
+             "再生する。値は容量上限(GB、0 = 無効)")
+    parser.add_argument(
+        "--burst-mb", type=int, default=0,
+        help="ディスク全体を最高速で RAM へ読み込んでからドライブを止めて"
+             "再生する。値はメモリの上限(MB、0 = 無効。CD 1 枚は最大約 "
+             "800 MB)。超えるディスクは従来どおり読みながら再生する")
+    parser.add_argument(
+        "--cover-original", action="store_true",
+        help="カバーアートを原寸で取得する(既定は画面に合う縮小版)")
+    return parser.parse_args(argv)
 
-    root = tk.Tk()
-    root.title("cdp")
 
+def _latency(value):
+    if value is None or value in ("low", "high"):
+        return value
+    return float(value)
+
+
+def _audio_devices(pairs):
+    devices = {}
+    for pair in pairs:
+        drive, sep, device = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--audio-device は DRIVE=DEVICE の形式: {pair}")
+        devices[drive] = int(device) if device.isdigit() else device
+    return devices
+
+
+def _drives():
+    """再生パイプラインを作るドライブ。macOS は /Volumes をまとめて 1 つ。"""
+    if sys.platform == "darwin":
+        return ["/Volumes"]
+    return discover_drives() or ["/dev/sr0"]
+
+
+def open_output(args, audio_device):
+    """出力デバイス 1 つ分の PersistentOutput。
+
+    起動時に開いて使い続ける(開くたびに HDMI が再同期するため)。
+    """
+    output = PersistentOutput(make_stream_factory(
+        args.output, latency=_latency(args.latency), blocksize=args.blocksize,
+        device=audio_device))
+    try:
+        output.open()
+    except Exception:
+        logging.exception("音声出力を開けません(再生時に再試行します): %s",
+                          audio_device or "既定の出力")
+    return output
+
+
+def build_pipeline(drive, output, shared, eject_fn):
+    """ドライブ 1 台分のエンジン・コントローラを組み立てる。"""
     # engine → controller は post 経由の循環依存になるため遅延束縛する
     controller_ref = []
 
     def post_event(event):
         controller_ref[0].post(event)
 
-    engine = PlaybackEngine(post_event=post_event)
+    engine = PlaybackEngine(post_event=post_event,
+                            stream_factory=output.lease)
     controller = AppController(
-        toc_reader=TocReader(),
         engine=engine,
-        metadata_service=MetadataService(),
-        source_factory=create_source)
+        source_factory=functools.partial(create_source, reader=args.reader),
+        eject_fn=eject_fn,
+        **shared)
     controller_ref.append(controller)
+    return controller, engine
+
+
+def main():
+    args = parse_args()
+    setup_logging()
+    logging.info("cdp %s starting (output=%s)", VERSION, args.output)
+
+    root = tk.Tk()
+    root.title("cdp")
+
+    audio_cache = None
+    if args.rip_cache_gb > 0:
+        audio_cache = AudioCache(budget_bytes=int(args.rip_cache_gb * 1024 ** 3))
+    burst_buffer = None
+    if args.burst_mb > 0:
+        burst_buffer = BurstBuffer(budget_bytes=args.burst_mb * 1024 ** 2)
+    cover_size = None
+    if not args.cover_original:
+        cover_size = thumbnail_size(art_size(root.winfo_screenheight()))
+    metadata = MetadataService(fetcher=MetadataFetcher(cover_size=cover_size))
+    shared = {"toc_reader": TocReader(), "metadata_service": metadata,
+              "audio_cache": audio_cache, "burst_buffer": burst_buffer}
+    audio_devices = _audio_devices(args.audio_device)
+    drives = _drives()
+    monitor_ref = []
+
+    def eject_drive(drive):
+        # 検知側が開いたままのデバイスがあるとカーネルが取り出しを断る
+        if monitor_ref and hasattr(monitor_ref[0], "release"):
+            monitor_ref[0].release(drive)
+        default_eject(drive)
+
+    # 出力はデバイスごとに 1 つ。同じデバイス(指定のないドライブは既定の
+    # 出力)を 2 度開くと hw: では失敗し、無音を書くスレッドも重なる
+    pipelines, engines, outputs = {}, [], {}
+    for drive in drives:
+        device = audio_devices.get(drive)
+        if device in outputs:
+            logging.info("ドライブ %s は %s を他のドライブと共有します", drive,
+                         device if device is not None else "既定の出力")
+        else:
+            outputs[device] = open_output(args, device)
+        controller, engine = build_pipeline(
+            drive, outputs[device], shared,
+            functools.partial(eject_drive, drive))
+        pipelines[drive] = controller
+        engines.append(engine)
+    logging.info("ドライブ %d 台: %s", len(drives), ", ".join(drives))
+    controller = MultiDriveController(pipelines)
 
     view = View(root, controller)
-    monitor = create_monitor(controller.post)
+    monitor = create_monitor(
+        controller.post,
+        devices=drives if sys.platform.startswith("linux") else None)
+    monitor_ref.append(monitor)
     monitor.start()
 
     def on_quit():
         monitor.stop()
-        engine.stop()
+        for engine in engines:
+            engine.stop()
+        for output in outputs.values():
+            output.shutdown()
 
     view.set_on_quit(on_quit)
     root.mainloop()
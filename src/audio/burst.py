@@ -0,0 +1,283 @@
+"""ディスク全体を全速で RAM へ読み込み、読み終えたらドライブを止める。
+
+再生ペースで読み続けるとアルバム 1 枚のあいだドライブが回り続け、騒音・
+電力と、傷による読み取り停止にさらされ続ける。容量上限に収まるディスクは
+挿入直後に最高速で読み切り、以後はメモリから再生する。曲送り・シークは
+読み込み済みの範囲なら待ちなしで効く。
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from src.audio.depth import BYTES_PER_SECOND
+from src.audio.sources import (CD_BYTES_PER_FRAME, CD_FRAMES_PER_SECTOR,
+                               CD_SAMPLE_RATE, CHUNK_BYTES, TrackSourceError)
+
+logger = logging.getLogger(__name__)
+
+BURST_READ_BYTES = 64 * 1024
+BYTES_PER_SECTOR = CD_FRAMES_PER_SECTOR * CD_BYTES_PER_FRAME
+
+
+def disc_bytes(tracks) -> int | None:
+    """TOC 上のトラック長の合計(バイト)。長さの分からないトラックがあれば None。"""
+    if not tracks or any(not t.sectors for t in tracks):
+        return None
+    return sum(t.sectors for t in tracks) * BYTES_PER_SECTOR
+
+
+class BurstBuffer:
+    """RAM 読み込みの設定。収まるディスクのソースを BurstSource で包む。"""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+
+    def wrap(self, source, tracks):
+        """収まらない・連続読みできないソースはそのまま返す(ストリーミング)。"""
+        size = disc_bytes(tracks)
+        if size is None or not hasattr(source, "open_from"):
+            return source
+        if size > self.budget_bytes:
+            logger.info("ディスク(%.0f MB)がメモリの上限(%.0f MB)を超えるため、"
+                        "ドライブから読みながら再生します", size / 2 ** 20,
+                        self.budget_bytes / 2 ** 20)
+            return source
+        return BurstSource(source, tracks)
+
+
+class _MemoryReader:
+    """BurstSource のバッファの [pos, end) を読む。readinto 対応。
+
+    まだ届いていない位置では届くまで待つ。読み込みが届かずに終わったら、
+    その位置からドライブを直接読む。
+    """
+
+    def __init__(self, burst: BurstSource, pos: int, end: int, span: bool,
+                 run: int):
+        self._burst = burst
+        self._run = run
+        self._pos = pos
+        self._end = end
+        self._span = span
+        self._stream = None
+
+    def readinto(self, buf) -> int:
+        if self._stream is not None:
+            return self._stream.readinto(buf)
+        if self._pos >= self._end:
+            return 0
+        view = self._burst.wait(self._pos, self._run)
+        if view is None:
+            self._stream = _StreamReader(self._burst.stream(self._pos,
+                                                            self._span))
+            return self._stream.readinto(buf)
+        n = min(len(buf), len(view), self._end - self._pos)
+        buf[:n] = view[:n]
+        self._pos += n
+        return n
+
+    def __iter__(self):
+        buf = bytearray(CHUNK_BYTES)
+        while True:
+            n = self.readinto(buf)
+            if not n:
+                return
+            yield bytes(buf[:n])
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+class _StreamReader:
+    """ドライブからの続き。readinto を持たないソースのイテレータも包む。"""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._readinto = getattr(reader, "readinto", None)
+        self._it = None if self._readinto else iter(reader)
+        self._pending = b""
+
+    def readinto(self, buf) -> int:
+        if self._readinto is not None:
+            return self._readinto(buf)
+        while not self._pending:
+            chunk = next(self._it, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        n = min(len(buf), len(self._pending))
+        buf[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self) -> None:
+        if hasattr(self._reader, "close"):
+            self._reader.close()
+
+
+class BurstSource:
+    """ディスク全体を RAM へ読み込み、そこから再生する TrackSource。
+
+    読み込みは最初の open で始まる(包んだ直後にキャッシュ再生へ切り替わる
+    こともあるため)。トラック長は TOC のものを使うので、すべて必要。
+    close の後に open すると読み込みをやり直す(エラー後の再試行)。
+    """
+
+    def __init__(self, inner, tracks):
+        self._inner = inner
+        self._numbers = [t.number for t in tracks]
+        self._starts: dict[int, int] = {}
+        self._ends: dict[int, int] = {}
+        pos = 0
+        for t in tracks:
+            self._starts[t.number] = pos
+            pos += t.sectors * BYTES_PER_SECTOR
+            self._ends[t.number] = pos
+        self.size = pos
+        self._cond = threading.Condition()
+        self._buf: bytearray | None = None
+        self._filled = 0
+        self._done = False  # 読み込みが終わった(最後まで、または途中で失敗)
+        self._run = 0  # 読み込みの回。close で進め、古いスレッド・読み手を外す
+        self._thread: threading.Thread | None = None
+
+    @property
+    def complete(self) -> bool:
+        with self._cond:
+            return self._done and self._filled == self.size
+
+    def list_tracks(self):
+        return self._inner.list_tracks()
+
+    def open(self, track_no: int, start_frame: int = 0):
+        return self._reader(track_no, start_frame, span=False)
+
+    def open_from(self, track_no: int, start_frame: int = 0):
+        """track_no 以降を連続で読む(ギャップレス)。"""
+        return self._reader(track_no, start_frame, span=True)
+
+    def _reader(self, track_no: int, start_frame: int, span: bool):
+        if track_no not in self._starts:
+            raise TrackSourceError(f"トラック {track_no} がありません")
+        run = self._start()
+        pos = self._starts[track_no] + start_frame * CD_BYTES_PER_FRAME
+        end = self.size if span else self._ends[track_no]
+        return _MemoryReader(self, min(pos, end), end, span, run)
+
+    def _start(self) -> int:
+        """読み込みを始める(始まっていれば何もしない)。今の回を返す。"""
+        with self._cond:
+            if self._thread is None:
+                self._buf = None
+                self._filled = 0
+                self._done = False
+                self._thread = threading.Thread(target=self._burst,
+                                                args=(self._run,),
+                                                daemon=True)
+                self._thread.start()
+            return self._run
+
+    def wait(self, pos: int, run: int):
+        """pos から読み込み済みの範囲の memoryview。届くまで待つ。
+
+        読み込みが pos に届かずに終わったら None(ドライブから読む)。
+        閉じられたら空(EOF)。
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._filled > pos or self._done
+                                or self._run != run)
+            if self._run != run:
+                return memoryview(b"")
+            if self._filled > pos:
+                return memoryview(self._buf)[pos:self._filled]
+            return None
+
+    def stream(self, pos: int, span: bool):
+        """pos(ディスク先頭からのバイト位置)からドライブを直接読む。"""
+        track_no = max(n for n in self._numbers if self._starts[n] <= pos)
+        frame, skip = divmod(pos - self._starts[track_no], CD_BYTES_PER_FRAME)
+        logger.info("トラック %d の %.1f 秒からはドライブから直接読みます",
+                    track_no, frame / CD_SAMPLE_RATE)
+        opener = self._inner.open_from if span else self._inner.open
+        # 先頭から読むときは、シーク非対応のソースも使えるよう従来の形で呼ぶ
+        reader = opener(track_no, frame) if frame else opener(track_no)
+        if skip:  # フレームの途中で止まった分を読み捨てる
+            reader = _StreamReader(reader)
+            scratch = bytearray(skip)
+            while skip:
+                n = reader.readinto(memoryview(scratch)[:skip])
+                if not n:
+                    break
+                skip -= n
+        return reader
+
+    def _burst(self, run: int) -> None:
+        started = time.monotonic()
+        try:
+            buf = bytearray(self.size)
+        except MemoryError:
+            logger.warning("ディスク全体を読み込むメモリを確保できません")
+            self._finish(run)
+            return
+        with self._cond:
+            if self._run != run:
+                return
+            self._buf = buf
+        select_speed = getattr(self._inner, "select_speed", None)
+        if select_speed is not None:
+            select_speed(0)  # 最高速で読み切る
+        reader = None
+        filled = 0
+        try:
+            reader = _StreamReader(self._inner.open_from(self._numbers[0]))
+            view = memoryview(buf)
+            while filled < self.size and self._run == run:
+                n = reader.readinto(view[filled:filled + BURST_READ_BYTES])
+                if not n:
+                    break
+                filled += n
+                with self._cond:
+                    if self._run != run:
+                        break
+                    self._filled = filled
+                    self._cond.notify_all()
+        except Exception as e:
+            logger.warning("ディスクの読み込みが %.1f 秒の位置で止まりました: %s",
+                           filled / BYTES_PER_SECOND, e)
+        finally:
+            if reader is not None:
+                reader.close()
+        if not self._finish(run) or filled < self.size:
+            return
+        elapsed = time.monotonic() - started
+        logger.info("ディスク全体(%.0f MB)を %.1f 秒で読み込みました(%.1f 倍速)。"
+                    "ドライブを止めてメモリから再生します", self.size / 2 ** 20,
+                    elapsed, self.size / BYTES_PER_SECOND / max(elapsed, 1e-6))
+        stop_motor = getattr(self._inner, "stop_motor", None)
+        if stop_motor is not None:
+            stop_motor()
+        self._inner.close()  # 読み取りプロセス・デバイスを手放す
+
+    def _finish(self, run: int) -> bool:
+        """読み込みの終わりを知らせる。閉じられた回なら False。"""
+        with self._cond:
+            if self._run != run:
+                return False
+            self._done = True
+            self._cond.notify_all()
+            return True
+
+    def close(self) -> None:
+        """読み込みを止めてバッファを手放す。次の open で読み直す。"""
+        with self._cond:
+            self._run += 1
+            self._buf = None
+            self._filled = 0
+            self._done = False
+            self._thread = None
+            self._cond.notify_all()
+        self._inner.close()
@@ -0,0 +1,100 @@
+"""先読みの深さを、読み取り実績(速度・停止)に合わせて伸縮させる。
+
+健全な速いドライブでは必要以上の RAM を抱えず、傷ディスクで cdparanoia が
+何秒も止まるなら、その停止を吸収できるだけ深くする。実績はディスク単位で
+集計する(ディスクが変われば最初から測り直す)。
+
+計測するのはソースからの読み取り 1 回ごとの所要時間だけで、リングが満杯で
+書き手が待たされた時間は含めない。各トラックの最初の読み取りは
+コールドスタートの待ちなので、停止としては数えない。
+"""
+from __future__ import annotations
+
+import logging
+import threading
+
+from src.audio.sources import CD_BYTES_PER_FRAME, CD_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+BYTES_PER_SECOND = CD_SAMPLE_RATE * CD_BYTES_PER_FRAME
+MIN_SECONDS = 4.0
+INITIAL_SECONDS = 8.0
+CEILING_BYTES = 32 * 1024 * 1024  # ≒ 190 秒分
+GAP_FACTOR = 2.0      # 最長停止の何倍を蓄えるか
+MARGIN_SECONDS = 2.0
+SLOW_DRIVE_SPEED = 1.5  # これ未満の倍速だと停止後の回復に時間がかかる
+
+
+class ReadStats:
+    """ある区間の読み取り実績。"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.busy = 0.0        # 読み取りに費やした秒数
+        self.longest_gap = 0.0  # 1 回の読み取りで待たされた最長秒数
+        self.reads = 0
+
+    def add(self, nbytes: int, elapsed: float, first: bool) -> None:
+        self.bytes += nbytes
+        self.busy += elapsed
+        self.reads += 1
+        if not first:
+            self.longest_gap = max(self.longest_gap, elapsed)
+
+    @property
+    def speed(self) -> float | None:
+        """実時間比の読み取り速度(倍速)。測れていなければ None。"""
+        if self.busy <= 0 or self.bytes == 0:
+            return None
+        return self.bytes / self.busy / BYTES_PER_SECOND
+
+
+class AdaptiveDepth:
+    def __init__(self, min_seconds: float = MIN_SECONDS,
+                 initial_seconds: float = INITIAL_SECONDS,
+                 ceiling_bytes: int = CEILING_BYTES):
+        self._min = int(min_seconds * BYTES_PER_SECOND)
+        self._initial = int(initial_seconds * BYTES_PER_SECOND)
+        self.ceiling_bytes = ceiling_bytes
+        self._lock = threading.Lock()
+        self.disc = ReadStats()
+        self._lap = ReadStats()
+
+    def start_disc(self) -> None:
+        with self._lock:
+            self.disc = ReadStats()
+            self._lap = ReadStats()
+
+    def record(self, nbytes: int, elapsed: float, first: bool = False) -> None:
+        """先読みスレッドから、ソースの読み取り 1 回ごとに呼ぶ。"""
+        with self._lock:
+            self.disc.add(nbytes, elapsed, first)
+            self._lap.add(nbytes, elapsed, first)
+
+    def lap(self) -> ReadStats:
+        """前回の lap 以降の実績を返し、次の区間を始める。"""
+        with self._lock:
+            stats, self._lap = self._lap, ReadStats()
+            return stats
+
+    def target_bytes(self) -> int:
+        with self._lock:
+            stats = self.disc
+            if stats.reads < 8:
+                target = self._initial  # まだ判断材料がない
+            else:
+                seconds = stats.longest_gap * GAP_FACTOR + MARGIN_SECONDS
+                speed = stats.speed
+                if speed is not None and speed < SLOW_DRIVE_SPEED:
+                    seconds *= 1.5
+                target = int(seconds * BYTES_PER_SECOND)
+        return max(min(target, self.ceiling_bytes), min(self._min,
+                                                        self.ceiling_bytes))
+
+
+def describe(stats: ReadStats) -> str:
+    speed = stats.speed
+    speed_text = f"{speed:.1f} 倍速" if speed is not None else "速度不明"
+    return (f"{stats.bytes / BYTES_PER_SECOND:.1f} 秒分を {speed_text}、"
+            f"最長停止 {stats.longest_gap:.1f} 秒")
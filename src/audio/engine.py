@@ -1,94 +1,374 @@
 """PCM 再生エンジン。再生位置・トラック番号はここが所有する。"""
 from __future__ import annotations
 
+import contextlib
+import functools
 import logging
-import queue
 import threading
 import time
 
-from src.audio.sources import (CD_BYTES_PER_FRAME, CD_CHANNELS,
-                               CD_SAMPLE_RATE, SourceStallError)
+from src.audio.depth import (BYTES_PER_SECOND, CEILING_BYTES, AdaptiveDepth,
+                             describe)
+from src.audio.output import default_stream_factory
+from src.audio.ring import PcmRingBuffer
+from src.audio.sources import (CD_BYTES_PER_FRAME, CD_FRAMES_PER_SECTOR,
+                               CD_SAMPLE_RATE, CHUNK_BYTES, SourceStallError,
+                               TrackSourceError)
 from src.core.events import (PlaybackError, PlaybackFinished, TrackChanged,
                              TrackSkipped)
 
 logger = logging.getLogger(__name__)
 
-PREFETCH_CHUNKS = 86  # ≒ 8 秒分 (44100 * 8 / 4096)
+STALL_SKIP_SECONDS = 0.5     # 最初の読み直しで飛ばす長さ。失敗が続くと倍々
+STALL_RETRIES = 5            # 同じ箇所で読み直す回数の上限
+STALL_BUDGET_SECONDS = 20.0  # 1 トラックで飛ばしてよい合計
+SLOW_READ_SECONDS = 0.5      # 再生中にこれ以上データを待ったら読み取りの不調
+KEEP_ALIVE_INTERVAL = 20.0   # 一時停止中にドライブへ軽い読み取りを送る間隔
+KEEP_ALIVE_SECONDS = 300.0   # それを続ける長さ。以後はドライブを止めてよい
+COLD_PAUSE_SECONDS = 30.0    # これより長く回していなければ再開時は冷えている
 
 
-def default_stream_factory():
-    # import はここまで遅延させている(テストや macOS 開発時に PortAudio を
-    # 必須にしないため)。その代わり依存漏れが再生の瞬間まで表面化しないので、
-    # 失敗時は原因と対処をそのまま画面に出せる文言にしておく。
-    try:
-        import sounddevice as sd
-    except ImportError as e:
-        raise RuntimeError(
-            "sounddevice を読み込めません。venv の Python で起動してください "
-            "(.venv/bin/python main.py)") from e
-    return sd.RawOutputStream(samplerate=CD_SAMPLE_RATE,
-                              channels=CD_CHANNELS, dtype="int16")
+def _read_mode(source, track_no: int, span: bool):
+    """ソースが track_no を読むモード(読み取り品質を持たないソースは None)。"""
+    mode = getattr(source, "read_mode", None)
+    return mode(track_no, span) if mode is not None else None
+
+
+class _StallRecovery:
+    """1 トラック分の、読み取り停止からの復帰の記録。"""
+
+    def __init__(self, index: int, skip_frames: int, retries: int,
+                 budget_frames: int):
+        self.index = index
+        self._skip = skip_frames
+        self._retries = retries
+        self._budget = budget_frames
+        self.first_stall: int | None = None
+        self.skipped = 0  # 飛ばしたフレーム数の合計
+        self.attempt = 0  # 同じ箇所での連続した読み直し回数
+        self._restarted_at: int | None = None
+
+    def restart_at(self, stalled: int, length: int | None) -> int | None:
+        """stalled で止まった。読み直すフレーム位置か、諦めるなら None。"""
+        if self.first_stall is None:
+            self.first_stall = stalled
+        if (self._restarted_at is not None
+                and stalled - self._restarted_at >= CD_SAMPLE_RATE):
+            self.attempt = 0  # 1 秒以上進めた = 別の傷。また短く飛ばす
+        skip = self._skip << self.attempt
+        restart = stalled + skip
+        if (self.attempt >= self._retries
+                or self.skipped + skip > self._budget
+                or (length is not None and restart >= length)):
+            return None
+        self.attempt += 1
+        self.skipped += skip
+        self._restarted_at = restart
+        return restart
 
 
 class _Prefetcher:
-    """ソースを先読みしてキュー(リングバッファ)に貯める。"""
+    """ソースを先読みしてリングバッファに貯める。
 
-    _EOF = object()
+    segments はトラックの列(1 要素 = 1 トラック)。要素はチャンク列か、
+    呼ぶとチャンク列を返す関数。前のトラックを読み切った時点で次の要素を
+    取り出す(= 次のトラックを開く)ので、トラックの変わり目でもバッファが
+    空にならない。要素の間には BOUNDARY の印を挟む。
 
-    def __init__(self, chunks, max_chunks: int):
-        self._queue: queue.Queue = queue.Queue(maxsize=max_chunks)
+    readinto を持つチャンク列(パイプ・soundfile)はリングへ直接読み込む。
+    読み取りごとの所要時間を depth に渡し、その判断に合わせてリングの
+    容量を変える(書き込み途中の領域がない、このスレッドの中でだけ)。
+
+    guard はソースの open_lock(あれば)。次のトラックは、それを持った
+    まま世代を確かめてから開く。止められた古い先読みが、閉じたソースや
+    次の再生の読み取りを開き直さないように。
+    """
+
+    BOUNDARY = object()
+    EOF = object()
+
+    def __init__(self, segments, ring: PcmRingBuffer, depth: AdaptiveDepth,
+                 guard=None):
+        self._ring = ring
+        self._depth = depth
+        self._guard = guard or contextlib.nullcontext()
+        self._epoch = ring.reset()
         self._error: Exception | None = None
-        self._abort = threading.Event()
-        self._thread = threading.Thread(target=self._fill, args=(chunks,),
+        self._thread = threading.Thread(target=self._fill, args=(segments,),
                                         daemon=True)
         self._thread.start()
 
-    def _fill(self, chunks) -> None:
+    def _fill(self, segments) -> None:
+        ring, epoch = self._ring, self._epoch
         try:
-            for chunk in chunks:
-                if not self._put(chunk):
+            it = iter(segments)
+            first = True
+            while True:
+                segment = next(it, None)
+                if segment is None:
+                    break
+                if not first and not ring.mark(epoch, self.BOUNDARY):
                     return
-            self._put(self._EOF)
+                first = False
+                with self._guard:
+                    if ring.epoch != epoch:
+                        return
+                    chunks = segment() if callable(segment) else segment
+                if not self._copy(chunks):
+                    return
+                logger.info("読み取り: %s", describe(self._depth.lap()))
+            ring.mark(epoch, self.EOF)
         except Exception as e:  # SourceStallError 等はここで捕まえて伝搬する
             self._error = e
-            self._put(self._EOF)
+            ring.mark(epoch, self.EOF)
 
-    def _put(self, item) -> bool:
-        while not self._abort.is_set():
-            try:
-                self._queue.put(item, timeout=0.2)
+    def _copy(self, chunks) -> bool:
+        """1 トラック分をリングへ。世代が変わった(停止された)ら False。"""
+        ring, epoch = self._ring, self._epoch
+        first = True
+        readinto = getattr(chunks, "readinto", None)
+        if readinto is None:
+            it = iter(chunks)
+            while True:
+                t0 = time.monotonic()
+                chunk = next(it, None)
+                if chunk is None:
+                    return True
+                self._depth.record(len(chunk), time.monotonic() - t0, first)
+                first = False
+                self._adjust()
+                if not ring.write(epoch, chunk):
+                    return False
+        while True:
+            self._adjust()
+            view = ring.write_view(epoch)
+            if view is None:
+                return False
+            t0 = time.monotonic()
+            n = readinto(view)
+            self._depth.record(n, time.monotonic() - t0, first)
+            first = False
+            if not n:
                 return True
-            except queue.Full:
-                continue
-        return False
-
-    def get(self, timeout: float):
-        """次のチャンク。EOF なら None。ソース側エラーなら raise。
-        タイムアウトは queue.Empty を送出する。"""
-        item = self._queue.get(timeout=timeout)
-        if item is self._EOF:
-            if self._error is not None:
-                raise self._error
+            if not ring.commit(epoch, n):
+                return False
+
+    def _adjust(self) -> None:
+        # 細かな揺れで確保し直さないよう、25% 以上ずれたときだけ変える
+        target = self._depth.target_bytes()
+        capacity = self._ring.capacity
+        if abs(target - capacity) * 4 > capacity:
+            if self._ring.resize(self._epoch, target):
+                logger.info("先読みを %.1f 秒分に変更(%.1f 秒分から)",
+                            self._ring.capacity / BYTES_PER_SECOND,
+                            capacity / BYTES_PER_SECOND)
+
+    def get(self, timeout: float | None, max_bytes: int, interrupted=None):
+        """次に出力する PCM の memoryview(最大 max_bytes)、BOUNDARY、EOF の
+        いずれか。タイムアウトか interrupted() が真なら None。ソース側
+        エラーなら raise。
+
+        memoryview はリング内を直接指すので、書き終えたら consume すること。
+        """
+        if not self._ring.wait_readable(timeout, interrupted):
             return None
-        return item
+        item = self._ring.pop_mark()
+        if item is self.EOF and self._error is not None:
+            raise self._error
+        if item is not None:
+            return item
+        return self._ring.peek(max_bytes)
+
+    def consume(self, n: int) -> None:
+        self._ring.consume(n)
 
     def stop(self) -> None:
-        self._abort.set()
+        self._ring.reset()
+        # 止まった読み取り(傷・ドライブ待ち)の終わりは待たない。読み取り
+        # 途中の古い領域に後から書かれても困らないよう、領域を取り替える
+        self._thread.join(timeout=0.05)
+        if self._thread.is_alive():
+            self._ring.reallocate()
+
+
+class _PrimedReader:
+    """最初のチャンクを先に読んでおいたリーダー。先読みには元のまま見える。"""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self._first = memoryview(b"")
+        self._rest = None
+        if hasattr(reader, "readinto"):
+            self.readinto = self._readinto
+
+    def prime(self) -> None:
+        """最初のデータが届くまで待つ(コールドスタートの待ちはここで済ませる)。"""
+        if hasattr(self._reader, "readinto"):
+            buf = bytearray(CHUNK_BYTES)
+            self._first = memoryview(buf)[:self._reader.readinto(buf)]
+        else:
+            self._rest = iter(self._reader)
+            self._first = memoryview(next(self._rest, b""))
+
+    def _readinto(self, buf) -> int:
+        if len(self._first):
+            n = min(len(buf), len(self._first))
+            buf[:n] = self._first[:n]
+            self._first = self._first[n:]
+            return n
+        return self._reader.readinto(buf)
+
+    def __iter__(self):
+        if len(self._first):
+            yield bytes(self._first)
+            self._first = memoryview(b"")
+        yield from (self._rest if self._rest is not None else self._reader)
+
+    def close(self) -> None:
+        if hasattr(self._reader, "close"):
+            self._reader.close()
+
+
+class _WarmUp:
+    """ディスク挿入直後の投機的な準備。TOC の読み取りと並行して走る。
+
+    出力ストリームを開くスレッドと、先頭トラックを開いて最初のデータまで
+    読むスレッドを同時に動かす。play で採用(take)されなければ、
+    discard で開いたものをすべて閉じる。
+    """
+
+    def __init__(self, open_stream, source, track_no: int):
+        self.source = source
+        self.track_no = track_no
+        self.continuous = hasattr(source, "open_from")
+        self.mode = _read_mode(source, track_no, self.continuous)
+        self.stream = None
+        self.reader: _PrimedReader | None = None
+        self.started = time.monotonic()
+        self.first_data_at: float | None = None
+        self.committed_at: float | None = None
+        self.saved: float | None = None  # 最初の音までに短縮できた秒数
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._pending = 2
+        self._done = threading.Event()
+        threading.Thread(target=self._open_stream, args=(open_stream,),
+                         daemon=True).start()
+        threading.Thread(target=self._open_reader, daemon=True).start()
+
+    def _open_stream(self, open_stream) -> None:
         try:
-            while True:
-                self._queue.get_nowait()
-        except queue.Empty:
-            pass
-        self._thread.join(timeout=3)
+            self.stream = open_stream()
+        except Exception as e:
+            # 本番の再生で開き直し、そこで PlaybackError として報告する
+            logger.warning("投機的に音声ストリームを開けません: %s", e)
+        self._finish()
+
+    def _open_reader(self) -> None:
+        try:
+            opener = (self.source.open_from if self.continuous
+                      else self.source.open)
+            reader = _PrimedReader(opener(self.track_no))
+            self.reader = reader
+            reader.prime()
+            self.first_data_at = time.monotonic()
+        except Exception as e:
+            logger.warning("投機的にトラック %d を開けません: %s",
+                           self.track_no, e)
+            if self.reader is not None:
+                self.reader.close()
+            self.reader = None
+        self._finish()
+
+    def _finish(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            if self._pending:
+                return
+            self._done.set()
+            if self._cancelled:
+                self._release()
+            else:
+                self._report()
+
+    def matches(self, source, track_numbers) -> bool:
+        # TOC でディスクが分かり、前回上げた読み取りモードに変わることがある
+        return (source is self.source and bool(track_numbers)
+                and track_numbers[0] == self.track_no
+                and _read_mode(source, self.track_no,
+                               self.continuous) == self.mode)
+
+    def wait(self, timeout: float) -> bool:
+        return self._done.wait(timeout)
+
+    def take(self):
+        """(stream, reader) を引き取る。以後の後始末は呼び出し側の責任。"""
+        with self._lock:
+            stream, reader = self.stream, self.reader
+            self.stream = self.reader = None
+            return stream, reader
+
+    def commit(self) -> None:
+        """TOC が先頭トラックを確認した。短縮時間の計算に使う。"""
+        with self._lock:
+            if self.committed_at is None:
+                self.committed_at = time.monotonic()
+            self._report()
+
+    def _report(self) -> None:
+        # 準備なしなら「TOC 待ち + 最初のデータ待ち」が直列にかかっていた。
+        # 並行させたので、短いほうの分だけ最初の音が早まる
+        if (self.saved is not None or self.committed_at is None
+                or self.first_data_at is None):
+            return
+        toc = self.committed_at - self.started
+        first = self.first_data_at - self.started
+        self.saved = min(toc, first)
+        logger.info("ウォームアップで最初の音が %.1f 秒早まった"
+                    "(TOC %.1f 秒 / 最初のデータ %.1f 秒)",
+                    self.saved, toc, first)
+
+    def discard(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            if self._done.is_set():
+                self._release()
+
+    def _release(self) -> None:
+        stream, reader = self.stream, self.reader
+        self.stream = self.reader = None
+        if reader is not None:
+            reader.close()
+        if stream is not None:
+            try:
+                stream.stop()
+                stream.close()
+            except Exception:
+                logger.exception("投機的に開いたストリームを閉じられません")
 
 
 class PlaybackEngine:
     def __init__(self, post_event, stream_factory=default_stream_factory,
-                 stall_timeout: float = 12.0, start_timeout: float = 60.0):
+                 stall_timeout: float = 12.0, start_timeout: float = 60.0,
+                 prefetch_ceiling_bytes: int = CEILING_BYTES,
+                 stall_retries: int = STALL_RETRIES,
+                 stall_skip_seconds: float = STALL_SKIP_SECONDS,
+                 stall_budget_seconds: float = STALL_BUDGET_SECONDS,
+                 keep_alive_seconds: float = KEEP_ALIVE_SECONDS):
         """stall_timeout は再生中の音切れ、start_timeout は最初の音までの待ち。
 
         ソース側の同名の値に対する保険。ソースが待てるようにしても、ここが
         短いままだとコールドスタート時に 1 曲目がスキップされる。
+
+        先読みの深さは読み取り実績から決め、prefetch_ceiling_bytes を上限とする。
+
+        読み取りが止まったら stall_skip_seconds 先から読み直し、続けて
+        止まるたびに倍にする。stall_retries 回、または 1 トラックで飛ばした
+        合計が stall_budget_seconds を超えたらトラックをスキップする。
+
+        一時停止から keep_alive_seconds までは、ソースが対応していれば
+        ドライブへ軽い読み取りを送って回したままにする。それより長い
+        一時停止からの再開は、冷えたドライブとして start_timeout で待つ。
         """
         self._post = post_event
         self._stream_factory = stream_factory
@@ -97,30 +377,127 @@ class PlaybackEngine:
         self._thread: threading.Thread | None = None
         self._stop_flag = threading.Event()
         self._paused = threading.Event()
-        self._lock = threading.Lock()
+        # 制御(停止・一時停止・曲送り)の変化はこの条件変数で再生スレッドに
+        # 知らせる。データ待ちの間はリング側の wake で起こす
+        self._lock = threading.Condition()
         self._jump: int | None = None  # 次に再生するトラックのリスト内 index
+        self._jump_frame = 0  # そのトラック内の開始フレーム(シーク)
+        self._track_sectors: list[int | None] = []
+        self._skip_requested: float | None = None  # 曲送り・シークの要求時刻
+        self._awaiting_first_write = False
+        self.last_skip_latency: float | None = None  # キーから最初の音まで(秒)
         self._index = 0
         self._tracks: list[int] = []
+        self._track_bytes: list[int] | None = None  # 連続読み時のみ
         self._frames_played = 0
+        self.played_audio = False  # この play() で出力へ音を書いたか
+        self._depth = AdaptiveDepth(ceiling_bytes=prefetch_ceiling_bytes)
+        # 再生をまたいで使い回す
+        self._ring = PcmRingBuffer(self._depth.target_bytes())
+        self._keep_alive_seconds = keep_alive_seconds
+        self._cold_until = 0.0  # 一時停止明けでドライブの立ち上がりを待つ期限
+        self._stall_retries = stall_retries
+        self._stall_skip_frames = round(stall_skip_seconds * CD_SAMPLE_RATE)
+        self._stall_budget_frames = round(stall_budget_seconds
+                                          * CD_SAMPLE_RATE)
+        self._recovery: _StallRecovery | None = None
+        self.stall_stats = self._new_stall_stats()
+        self._warm: _WarmUp | None = None
+        self.last_warm_up: _WarmUp | None = None  # 直近に採用した準備(診断用)
+        self._spare = None  # warm_output で先に開いた出力ストリーム
+        self._spare_lock = threading.Lock()
 
     # --- 公開 API(どのスレッドから呼んでも安全) ---
 
-    def play(self, source, track_numbers: list[int]) -> None:
+    def prepare(self, source, track_no: int = 1) -> None:
+        """ディスク挿入直後に呼ぶ。TOC を待たずに出力と先頭トラックを開く。
+
+        同じ source と先頭トラックで play されれば、開いたものをそのまま
+        使う。stop や別の play では捨てる。
+        """
+        self.stop()
+        self._warm = _WarmUp(self._open_stream, source, track_no)
+
+    def warm_output(self) -> None:
+        """ドライブの立ち上がり中に呼ぶ。出力ストリームだけ先に開いておく。
+
+        開いたストリームは次の prepare / play が使う。
+        """
+        def job():
+            try:
+                stream = self._stream_factory()
+                stream.start()
+            except Exception as e:
+                logger.warning("音声ストリームを先に開けません: %s", e)
+                return
+            with self._spare_lock:
+                old, self._spare = self._spare, stream
+            if old is not None:
+                old.stop()
+                old.close()
+
+        threading.Thread(target=job, daemon=True).start()
+
+    def _open_stream(self):
+        """開始済みの出力ストリーム。warm_output で開いたものがあれば使う。"""
+        with self._spare_lock:
+            stream, self._spare = self._spare, None
+        if stream is None:
+            stream = self._stream_factory()
+            stream.start()
+        return stream
+
+    def play(self, source, track_numbers: list[int],
+             track_sectors: list[int | None] | None = None,
+             start: tuple[int, float] | None = None) -> None:
+        """track_sectors は TOC 上の各トラック長(セクタ)。
+
+        全トラック分が分かっていて、ソースが open_from を持つ場合は
+        ディスクを 1 本の連続ストリームとして読み、トラック境界はここで
+        フレーム単位に切る(ギャップレス)。
+
+        start = (トラック番号, 秒) を渡すとその位置から再生する(再開用)。
+        """
+        warm, self._warm = self._warm, None
         self.stop()
         self._tracks = list(track_numbers)
+        self._track_sectors = list(track_sectors or [])
+        self._track_bytes = self._span_layout(track_sectors)
+        self._depth.start_disc()
+        self._recovery = None
+        self.stall_stats = self._new_stall_stats()
+        index, frame = 0, 0
+        if start is not None:
+            index = self._tracks.index(start[0])
+            frame = self._frame_at(index, start[1])
+        if warm is not None and (frame or index
+                                 or not warm.matches(source, self._tracks)):
+            warm.discard()
+            warm = None
         if not self._tracks:
             self._post(PlaybackFinished())
             return
+        if warm is not None:
+            warm.commit()
+            self.last_warm_up = warm
         self._stop_flag.clear()
         self._paused.clear()
-        self._jump = 0
-        self._thread = threading.Thread(target=self._run, args=(source,),
-                                        daemon=True)
+        self._jump, self._jump_frame = index, frame
+        self._skip_requested = None
+        # 出力を開けずに終わっても前のディスクの位置を残さない
+        self._frames_played = frame
+        self.played_audio = False
+        self._thread = threading.Thread(target=self._run,
+                                        args=(source, warm), daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
+        warm, self._warm = self._warm, None
+        if warm is not None:
+            warm.discard()
         self._stop_flag.set()
         self._paused.clear()
+        self._wake()
         if self._thread is not None:
             self._thread.join(timeout=5)
             self._thread = None
@@ -130,43 +507,132 @@ class PlaybackEngine:
             self._paused.clear()
         else:
             self._paused.set()
+        self._wake()
 
     def next_track(self) -> None:
         with self._lock:
             if self._index + 1 < len(self._tracks):
-                self._jump = self._index + 1
+                self._request_jump(self._index + 1)
 
     def prev_track(self) -> None:
         with self._lock:
-            self._jump = max(self._index - 1, 0)
+            self._request_jump(max(self._index - 1, 0))
+
+    def seek(self, track_no: int, seconds: float) -> None:
+        """再生中に、track_no の先頭から seconds 秒の位置へ移る。
+
+        位置はフレーム単位で正確(セクタ単位のソースは端数を読み捨てる)。
+        track_no が再生中のトラック一覧になければ ValueError。
+        """
+        with self._lock:
+            index = self._tracks.index(track_no)
+            self._request_jump(index, self._frame_at(index, seconds))
+
+    @staticmethod
+    def _new_stall_stats() -> dict:
+        return {"stalls": 0, "recovered_seconds": 0.0,
+                "skipped_seconds": 0.0, "abandoned_tracks": 0}
+
+    def _frame_at(self, index: int, seconds: float) -> int:
+        frame = max(0, round(seconds * CD_SAMPLE_RATE))
+        if index < len(self._track_sectors) and self._track_sectors[index]:
+            # トラック長が分かっていれば末尾のフレームまでに収める
+            length = self._track_sectors[index] * CD_FRAMES_PER_SECTOR
+            frame = min(frame, length - 1)
+        return frame
+
+    def _request_jump(self, index: int, frame: int = 0) -> None:
+        # self._lock を持って呼ぶ
+        self._jump, self._jump_frame = index, frame
+        self._skip_requested = time.monotonic()
+        self._wake()
+
+    def _wake(self) -> None:
+        """一時停止中・データ待ち中の再生スレッドをすぐ起こす。"""
+        with self._lock:
+            self._lock.notify_all()
+        self._ring.wake()
+
+    def _leaving(self) -> bool:
+        """今のトラックの再生を抜けるべきか(停止・曲送り)。ロック不要。"""
+        return self._stop_flag.is_set() or self._jump is not None
 
     @property
     def position_seconds(self) -> float:
         return self._frames_played / CD_SAMPLE_RATE
 
+    def buffer_stats(self) -> dict:
+        """先読みバッファの状態(診断用)。容量・充填量はバイト単位。"""
+        ring = self._ring
+        disc = self._depth.disc
+        return {"capacity": ring.capacity, "fill": ring.fill,
+                "high_water": ring.high_water, "underruns": ring.underruns,
+                "depth_seconds": ring.capacity / BYTES_PER_SECOND,
+                "fill_seconds": ring.fill / BYTES_PER_SECOND,
+                "read_speed": disc.speed,
+                "longest_gap": disc.longest_gap,
+                **self.stall_stats}
+
+    def _span_layout(self, track_sectors) -> list[int] | None:
+        """連続読みに使うトラック長(バイト)。使えなければ None。"""
+        if not track_sectors or len(track_sectors) != len(self._tracks):
+            return None
+        if any(not n for n in track_sectors):
+            return None
+        # cdparanoia のスパンは連番トラックしか連続で返さない
+        first = self._tracks[0]
+        if self._tracks != list(range(first, first + len(self._tracks))):
+            return None
+        return [n * CD_FRAMES_PER_SECTOR * CD_BYTES_PER_FRAME
+                for n in track_sectors]
+
     # --- 再生スレッド ---
 
-    def _run(self, source) -> None:
+    def _run(self, source, warm: _WarmUp | None = None) -> None:
+        stream = opened = None
+        if warm is not None:
+            while not warm.wait(0.2):
+                if self._stop_flag.is_set():
+                    warm.discard()
+                    return
+            stream, opened = warm.take()
         try:
-            stream = self._stream_factory()
-            stream.start()
+            if stream is None:
+                stream = self._open_stream()
         except Exception as e:
+            if opened is not None:
+                opened.close()
             logger.exception("音声ストリームを開けません")
             self._post(PlaybackError(f"音声デバイスを開けません: {e}"))
             return
+        continuous = (self._track_bytes is not None
+                      and hasattr(source, "open_from"))
+        if opened is not None and warm.continuous != continuous:
+            opened.close()  # 読み方が違う(TOC にトラック長がなかった)
+            opened = None
         try:
             while not self._stop_flag.is_set():
                 with self._lock:
                     if self._jump is None:
                         break  # 進む先がない = 全トラック終了
                     self._index = self._jump
-                    self._jump = None
+                    start_frame = self._jump_frame
+                    self._jump, self._jump_frame = None, 0
                     track_no = self._tracks[self._index]
-                self._frames_played = 0
+                self._frames_played = start_frame
+                self._awaiting_first_write = True
                 self._post(TrackChanged(track_no))
-                self._play_one(source, track_no, stream)
+                if opened is not None and (track_no != warm.track_no
+                                           or start_frame):
+                    opened.close()  # 再生前に曲送り・シークされた
+                    opened = None
+                self._play_one(source, track_no, stream, continuous, opened,
+                               start_frame)
+                opened = None
                 if self._stop_flag.is_set():
                     return
+                if self._jump is not None and hasattr(stream, "flush"):
+                    stream.flush()  # 曲送り: 前の曲の鳴り残しを捨てる
                 with self._lock:
                     if self._jump is None and self._index + 1 < len(self._tracks):
                         self._jump = self._index + 1
@@ -175,57 +641,275 @@ class PlaybackEngine:
             logger.exception("再生スレッドが異常終了しました")
             self._post(PlaybackError(str(e)))
         finally:
+            stats = self.stall_stats
+            logger.info("ディスクの読み取り: %s / 先読み %.1f 秒分 / "
+                        "停止 %d 回(復帰して再生 %.1f 秒、飛ばした %.1f 秒、"
+                        "スキップ %d トラック)",
+                        describe(self._depth.disc),
+                        self._ring.capacity / BYTES_PER_SECOND,
+                        stats["stalls"], stats["recovered_seconds"],
+                        stats["skipped_seconds"], stats["abandoned_tracks"])
             try:
                 source.close()
             finally:
                 stream.stop()
                 stream.close()
 
-    def _play_one(self, source, track_no: int, stream) -> None:
-        """1 トラックを再生する。読み取り停止はスキップとして扱う。"""
+    def _play_one(self, source, track_no: int, stream,
+                  continuous: bool = False, opened=None,
+                  start_frame: int = 0) -> None:
+        """トラックを再生する。読み取りが止まったら、少し先から読み直す。
+
+        読み直しは止まった位置から始め、失敗が続くほど飛ばす長さを伸ばす。
+        回数か飛ばした合計が上限を超えたら、そのトラックをスキップする。
+        """
+        first = True
+        while True:
+            try:
+                self._play_span(source, track_no, stream, continuous, opened,
+                                start_frame, first)
+                self._finish_recovery()
+                return
+            except TrackSourceError as e:
+                logger.warning("%s — トラックをスキップします", e)
+                self._post(TrackSkipped(self._tracks[self._index]))
+                return
+            except SourceStallError as e:
+                track_no = self._tracks[self._index]
+                self._report_trouble(source, track_no, "読み取りの停止")
+                start_frame = self._recover(track_no, e)
+                if start_frame is None:
+                    self._post(TrackSkipped(track_no))
+                    return
+                opened = None
+                first = False  # ドライブは回っているので停止の閾値で待つ
+
+    def _recover(self, track_no: int, error: Exception) -> int | None:
+        """停止した位置から読み直すフレーム。諦めるなら None。"""
+        rec = self._recovery
+        if rec is None or rec.index != self._index:
+            rec = self._recovery = _StallRecovery(
+                self._index, self._stall_skip_frames, self._stall_retries,
+                self._stall_budget_frames)
+        stalled = self._frames_played
+        length = self._track_frames(self._index)
+        restart = rec.restart_at(stalled, length)
+        stats = self.stall_stats
+        stats["stalls"] += 1
+        if restart is None:
+            lost = max(length - stalled, 0) if length else 0
+            stats["skipped_seconds"] += lost / CD_SAMPLE_RATE
+            stats["abandoned_tracks"] += 1
+            self._recovery = None
+            logger.warning("%s — 読み直しの上限に達したため、トラック %d の"
+                           "残り %.1f 秒をスキップします", error, track_no,
+                           lost / CD_SAMPLE_RATE)
+            return None
+        skipped = restart - stalled
+        stats["skipped_seconds"] += skipped / CD_SAMPLE_RATE
+        logger.warning("%s — %.1f 秒先(%.1f 秒の位置)から読み直します"
+                       "(%d 回目)", error, skipped / CD_SAMPLE_RATE,
+                       restart / CD_SAMPLE_RATE, rec.attempt)
+        self._frames_played = restart
+        return restart
+
+    @staticmethod
+    def _report_trouble(source, track_no: int, reason: str) -> None:
+        """ソースに不調を伝える。読み取りモードを上げられるソースだけが使う。"""
+        report = getattr(source, "report_trouble", None)
+        if report is None:
+            return
         try:
-            chunks = source.open(track_no)
-        except Exception as e:
-            logger.warning("トラック %d を開けません: %s", track_no, e)
-            self._post(TrackSkipped(track_no))
+            report(track_no, reason)
+        except Exception:
+            logger.exception("読み取りの不調を報告できません")
+
+    def _finish_recovery(self) -> None:
+        """トラックを抜けた。停止から復帰して再生できた分を数える。"""
+        rec, self._recovery = self._recovery, None
+        if rec is None or rec.index != self._index:
             return
-        pre = _Prefetcher(chunks, PREFETCH_CHUNKS)
-        first = True
+        recovered = self._frames_played - rec.first_stall - rec.skipped
+        if recovered > 0:
+            self.stall_stats["recovered_seconds"] += recovered / CD_SAMPLE_RATE
+            logger.info("トラック %d: 停止から復帰して %.1f 秒を再生"
+                        "(飛ばしたのは %.1f 秒)", self._tracks[rec.index],
+                        recovered / CD_SAMPLE_RATE,
+                        rec.skipped / CD_SAMPLE_RATE)
+
+    def _track_frames(self, index: int) -> int | None:
+        if index < len(self._track_sectors) and self._track_sectors[index]:
+            return self._track_sectors[index] * CD_FRAMES_PER_SECTOR
+        return None
+
+    def _play_span(self, source, track_no: int, stream, continuous: bool,
+                   opened, start_frame: int, first: bool = True) -> None:
+        """track_no の start_frame から読んで再生する。停止は raise する。
+
+        continuous なら track_no からディスク末尾までを 1 本で読み、
+        TOC の長さに達したところで次のトラックへ進める。そうでなければ
+        先読みスレッドが後続トラックを順に開いてつなぐ。どちらの場合も
+        ジャンプ・停止・エラーでここを抜ける。opened は開き済みのリーダー
+        (ウォームアップで開いたもの)。start_frame はシーク先のフレーム。
+        """
+        # 先頭からなら、シーク非対応のソースでも動く従来の形で開く
+        args = (track_no, start_frame) if start_frame else (track_no,)
+        try:
+            if opened is not None:
+                chunks = opened
+            elif continuous:
+                chunks = source.open_from(*args)
+            else:
+                chunks = source.open(*args)
+        except Exception as e:
+            raise TrackSourceError(
+                f"トラック {track_no} を開けません: {e}") from e
+        if continuous:
+            segments = [chunks]
+        else:
+            segments = self._chain(source, chunks, self._index)
+        pre = _Prefetcher(segments, self._ring, self._depth,
+                          getattr(source, "open_lock", None))
+        remaining = None
+        if continuous:
+            remaining = (self._track_bytes[self._index]
+                         - start_frame * CD_BYTES_PER_FRAME)
         try:
             while True:
-                if self._stop_flag.is_set():
+                if self._leaving():
                     return
-                with self._lock:
-                    if self._jump is not None:
-                        return
                 if self._paused.is_set():
-                    time.sleep(0.05)
+                    if self._wait_unpaused(source):
+                        # 先読みを鳴らし終えたあと、冷えたドライブの
+                        # 立ち上がりを最初の音と同じだけ待つ
+                        self._cold_until = (time.monotonic()
+                                            + self._start_timeout)
                     continue
-                chunk = self._next_chunk(pre, track_no, first)
-                if chunk is None:
-                    return  # トラック終端 or 停止/ジャンプ要求
+                # 連続読みではトラック境界をまたがない長さだけ取り出す
+                limit = CHUNK_BYTES
+                if remaining is not None and remaining > 0:
+                    limit = min(limit, remaining)
+                waited = time.monotonic()
+                chunk = self._next_chunk(pre, track_no, first, limit)
+                waited = time.monotonic() - waited
+                if chunk is None or chunk is _Prefetcher.EOF:
+                    return  # 最終トラック終端 or 停止/ジャンプ要求
+                if chunk is _Prefetcher.BOUNDARY:
+                    if not self._advance():
+                        return
+                    track_no = self._tracks[self._index]
+                    first = True  # 新しい読み取りなので最初の音を待つ
+                    continue
+                if (not first and waited > SLOW_READ_SECONDS
+                        and time.monotonic() > self._cold_until):
+                    # 先読みが尽きてデータを待った = 音切れ。読み取りが
+                    # 追いついていない(待ちが曲送り・停止で終わったのは除く)
+                    self._report_trouble(source, track_no, "読み取りの遅れ")
                 first = False
-                stream.write(chunk)
-                self._frames_played += len(chunk) // CD_BYTES_PER_FRAME
-        except SourceStallError as e:
-            logger.warning("%s — トラックをスキップします", e)
-            self._post(TrackSkipped(track_no))
+                self._write(stream, chunk)
+                pre.consume(len(chunk))
+                if remaining is None:
+                    continue
+                remaining -= len(chunk)
+                if remaining <= 0 and self._index + 1 < len(self._tracks):
+                    # TOC 上のトラック境界に達した。境界のフレームまで
+                    # 書き終えたこの時点で TrackChanged を出す
+                    if not self._advance():
+                        return
+                    track_no = self._tracks[self._index]
+                    remaining = self._track_bytes[self._index]
         finally:
             pre.stop()
 
+    def _chain(self, source, chunks, index: int):
+        """先読みスレッドで回す: 今のトラックに続けて後続トラックを開く。
+
+        ドライブ 1 台の cdparanoia は同時に 2 本読めないので、前のトラックを
+        読み切ってから次を開く(open は前のプロセスを閉じる)。後続は
+        開く関数として渡すので、失敗は BOUNDARY の後に届き、エンジン側では
+        次のトラックの失敗として扱える。
+        """
+        yield chunks
+        for i in range(index + 1, len(self._tracks)):
+            if self._stop_flag.is_set():
+                return
+            yield functools.partial(self._open_track, source,
+                                    self._tracks[i])
+
+    @staticmethod
+    def _open_track(source, track_no: int):
+        try:
+            return source.open(track_no)
+        except Exception as e:
+            raise TrackSourceError(
+                f"トラック {track_no} を開けません: {e}") from e
+
+    def _advance(self) -> bool:
+        """トラック境界を越えた。ジャンプ要求が先にあれば False。"""
+        self._finish_recovery()
+        with self._lock:
+            if self._jump is not None:
+                return False
+            self._index += 1
+            track_no = self._tracks[self._index]
+        self._frames_played = 0
+        self._post(TrackChanged(track_no))
+        return True
+
+    def _write(self, stream, data) -> None:
+        requested = self._skip_requested
+        if requested is not None and self._awaiting_first_write:
+            # 曲送り・シーク後、移った先の最初のサンプルを出力へ渡す瞬間
+            self._skip_requested = None
+            self.last_skip_latency = time.monotonic() - requested
+            logger.info("曲送り・シーク: 要求から最初の音まで %.0f ms",
+                        self.last_skip_latency * 1000)
+        self._awaiting_first_write = False
+        stream.write(data)
+        self.played_audio = True
+        self._frames_played += len(data) // CD_BYTES_PER_FRAME
+
     def _next_chunk(self, pre: _Prefetcher, track_no: int,
-                    first: bool = False):
+                    first: bool = False, max_bytes: int = CHUNK_BYTES):
+        """次のチャンク。停止・曲送りならその場で None(待ちは起こされる)。"""
         limit = self._start_timeout if first else self._stall_timeout
-        deadline = time.monotonic() + limit
+        deadline = max(time.monotonic() + limit, self._cold_until)
         while True:
-            if self._stop_flag.is_set():
+            if self._leaving():
                 return None
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise SourceStallError(
+                    f"トラック {track_no}: 読み取りが {limit} 秒停止")
+            item = pre.get(left, max_bytes, interrupted=self._leaving)
+            if item is not None:
+                return item
+
+    def _wait_unpaused(self, source=None) -> bool:
+        """一時停止が解けるまで眠る(CPU を使わない)。停止・曲送りでも戻る。
+
+        眠っている間もしばらくはドライブを回したままにする。戻り値は、
+        再開時にドライブが冷えている(止まっている)見込みかどうか。
+        """
+        keep_alive = getattr(source, "keep_alive", None)
+        started = last_read = time.monotonic()
+        warm_until = started + (self._keep_alive_seconds
+                                if keep_alive is not None else 0)
+        while True:
+            keeping = time.monotonic() < warm_until
             with self._lock:
-                if self._jump is not None:
-                    return None
-            try:
-                return pre.get(timeout=0.2)
-            except queue.Empty:
-                if time.monotonic() > deadline:
-                    raise SourceStallError(
-                        f"トラック {track_no}: 読み取りが {limit} 秒停止")
+                if self._lock.wait_for(
+                        lambda: not self._paused.is_set() or self._leaving(),
+                        KEEP_ALIVE_INTERVAL if keeping else None):
+                    break
+            if keeping and keep_alive():
+                last_read = time.monotonic()
+        now = time.monotonic()
+        cold = not self._leaving() and now - last_read > COLD_PAUSE_SECONDS
+        if cold:
+            logger.info("%.0f 秒の一時停止から再開。ドライブの立ち上がりを待ちます",
+                        now - started)
+            expect = getattr(source, "expect_spin_up", None)
+            if expect is not None:
+                expect()
+        return cold
@@ -0,0 +1,285 @@
+"""音声出力ストリーム。PlaybackEngine は start/write/stop/close だけを使う。
+
+出力方式は 2 つ:
+- blocking: RawOutputStream.write でデバイスへ直接書く(従来の方式)
+- callback: PortAudio のコールバックが事前確保したリングから引き出す。
+  再生スレッドはリングへ書くだけなので、Tk の描画や画像縮小で GIL が
+  一時的に取られても、リングに残っている分は途切れずに鳴る
+
+同じ実機で両方を比べられるよう、make_stream_factory で切り替える。
+
+どちらの方式も PersistentOutput で包むと、デバイスを起動時に 1 度だけ開き、
+トラック・ディスク・再試行をまたいで使い続ける。
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+
+from src.audio.ring import PcmRingBuffer
+from src.audio.sources import CD_BYTES_PER_FRAME, CD_CHANNELS, CD_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_MODES = ("blocking", "callback")
+CALLBACK_BUFFER_FRAMES = 16384  # ≒ 0.37 秒。コールバック側のリング容量
+IDLE_GAP_SECONDS = 0.05   # 書き込みがこれ以上途切れたら無音で埋める
+IDLE_BLOCK_FRAMES = 1024  # ≒ 23 ms。アイドル中に書く無音の単位
+REOPEN_BACKOFF_SECONDS = 1.0
+
+
+def _import_sounddevice():
+    # import はここまで遅延させている(テストや macOS 開発時に PortAudio を
+    # 必須にしないため)。その代わり依存漏れが再生の瞬間まで表面化しないので、
+    # 失敗時は原因と対処をそのまま画面に出せる文言にしておく。
+    try:
+        import sounddevice as sd
+    except ImportError as e:
+        raise RuntimeError(
+            "sounddevice を読み込めません。venv の Python で起動してください "
+            "(.venv/bin/python main.py)") from e
+    return sd
+
+
+def default_stream_factory(device=None):
+    """device は sounddevice の出力デバイス(番号か名前、None なら既定)。"""
+    sd = _import_sounddevice()
+    return sd.RawOutputStream(samplerate=CD_SAMPLE_RATE,
+                              channels=CD_CHANNELS, dtype="int16",
+                              device=device)
+
+
+class CallbackOutputStream:
+    """コールバック駆動の出力。write はリングへのコピーだけで返る。
+
+    リングが満杯なら write は空くまで待つので、再生スレッドの速度は
+    従来どおりデバイスの消費速度に揃う。コールバック時にリングが足りな
+    ければ残りを無音で埋め、starved として数える。PortAudio 自身が
+    報告したアンダーフロー(status.output_underflow)は underruns に数える。
+    """
+
+    pads_silence = True  # 書かれていない間はコールバックが無音を出す
+
+    def __init__(self, open_stream=None, latency=None, blocksize: int = 0,
+                 buffer_frames: int = CALLBACK_BUFFER_FRAMES, device=None):
+        """open_stream(callback) は生のストリームを返す(テスト用の差し替え口)。
+
+        latency / blocksize / device は sounddevice にそのまま渡す。
+        """
+        self._ring = PcmRingBuffer(buffer_frames * CD_BYTES_PER_FRAME)
+        self._epoch = self._ring.reset()
+        self._silence = b""
+        self._primed = False  # 一度でも書かれたか(開始前の無音は数えない)
+        self.underruns = 0
+        self.starved = 0
+        if open_stream is None:
+            sd = _import_sounddevice()
+
+            def open_stream(callback):
+                return sd.RawOutputStream(
+                    samplerate=CD_SAMPLE_RATE, channels=CD_CHANNELS,
+                    dtype="int16", latency=latency, blocksize=blocksize,
+                    device=device, callback=callback)
+
+        self._stream = open_stream(self._callback)
+
+    def start(self) -> None:
+        self._stream.start()
+
+    def write(self, data) -> None:
+        self._primed = True
+        self._ring.write(self._epoch, data)
+
+    def stop(self) -> None:
+        # blocking 方式の stop と同じく、書き込み済みの分は鳴らし切る
+        self.drain()
+        self._stream.stop()
+        self._epoch = self._ring.reset()  # 待っている write を解放する
+
+    def flush(self) -> None:
+        """書き込み済みでまだ鳴っていない分を捨てる(曲送り用)。
+
+        write と同じスレッドから呼ぶこと。
+        """
+        self._epoch = self._ring.reset()
+
+    def drain(self) -> None:
+        """書き込み済みの分を鳴らし切る。ストリームは止めない。"""
+        self._ring.wait_drained(self._ring.capacity / CD_BYTES_PER_FRAME
+                                / CD_SAMPLE_RATE + 0.5)
+        self._primed = False  # 以後の無音は曲間なので供給不足に数えない
+
+    def close(self) -> None:
+        self._ring.reset()
+        self._stream.close()
+        logger.info("コールバック出力: アンダーラン %d 回 / 供給不足 %d 回",
+                    self.underruns, self.starved)
+
+    def _callback(self, outdata, frames, time_info, status) -> None:
+        if status and getattr(status, "output_underflow", False):
+            self.underruns += 1
+        need = frames * CD_BYTES_PER_FRAME
+        filled = 0
+        epoch = self._ring.epoch  # 途中で flush されたら consume しない
+        while filled < need:
+            view = self._ring.peek(need - filled)
+            if not len(view):
+                break
+            outdata[filled:filled + len(view)] = view
+            filled += len(view)
+            self._ring.consume(len(view), epoch)
+        if filled < need:
+            if len(self._silence) < need:
+                self._silence = bytes(need)
+            outdata[filled:need] = self._silence[:need - filled]
+            if self._primed:
+                self.starved += 1
+
+
+class PersistentOutput:
+    """起動時に開き、再生・ディスクをまたいで使い続ける出力。
+
+    PlaybackEngine には stream_factory として lease を渡す。エンジンから
+    見た start / stop / close は借用の始まりと終わりにすぎず、デバイスは
+    閉じない(HDMI では開くたびにテレビが再同期し、曲頭が欠ける)。
+    書き込みが途切れている間は無音を書き続ける。閉じて開き直すのは
+    デバイスエラーのときだけ。
+    """
+
+    def __init__(self, stream_factory=default_stream_factory,
+                 idle_gap: float = IDLE_GAP_SECONDS,
+                 idle_block_frames: int = IDLE_BLOCK_FRAMES):
+        self._factory = stream_factory
+        self._idle_gap = idle_gap
+        self._silence = bytes(idle_block_frames * CD_BYTES_PER_FRAME)
+        self._stream = None
+        self._lock = threading.Lock()  # デバイスへの書き込みを直列化する
+        self._last_write = 0.0
+        self._closing = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.reopens = 0
+
+    def open(self) -> None:
+        """起動時に呼ぶ。失敗しても、次の再生の start で開き直す。"""
+        with self._lock:
+            self._ensure_open()
+
+    def lease(self) -> PersistentOutput:
+        """stream_factory の代わり。開き直さずに自分自身を返す。"""
+        return self
+
+    # --- エンジンから見たストリーム ---
+
+    def start(self) -> None:
+        with self._lock:
+            self._ensure_open()
+
+    def write(self, data) -> None:
+        with self._lock:
+            self._ensure_open()
+            try:
+                self._stream.write(data)
+            except Exception as e:
+                logger.warning("音声出力エラー。開き直します: %s", e)
+                self._reopen()
+                self._stream.write(data)
+            self._last_write = time.monotonic()
+
+    def stop(self) -> None:
+        drain = getattr(self._stream, "drain", None)
+        if drain is not None:
+            drain()
+
+    def flush(self) -> None:
+        flush = getattr(self._stream, "flush", None)
+        if flush is not None:
+            flush()
+
+    def close(self) -> None:
+        pass  # 借用の終わり。デバイスは開いたまま
+
+    # --- 所有者(main)向け ---
+
+    def shutdown(self) -> None:
+        self._closing.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        with self._lock:
+            self._discard()
+
+    def _start_idle(self) -> None:
+        if self._thread is not None or getattr(self._stream, "pads_silence",
+                                               False):
+            return  # コールバック方式は自前で無音を出す
+        self._thread = threading.Thread(target=self._idle_loop, daemon=True)
+        self._thread.start()
+
+    def _idle_loop(self) -> None:
+        while not self._closing.is_set():
+            wait = self._last_write + self._idle_gap - time.monotonic()
+            if wait > 0:
+                self._closing.wait(wait)
+                continue
+            try:
+                with self._lock:
+                    if self._closing.is_set():
+                        return
+                    if self._stream is None:
+                        # 開き直しは次の再生(start / write)に任せる
+                        self._last_write = (time.monotonic()
+                                            + REOPEN_BACKOFF_SECONDS)
+                        continue
+                    # デバイスの消費速度で返るので、これ自体が待ちになる
+                    self._stream.write(self._silence)
+            except Exception as e:
+                logger.warning("無音の出力に失敗。開き直します: %s", e)
+                with self._lock:
+                    self._discard()
+                self._closing.wait(REOPEN_BACKOFF_SECONDS)
+
+    def _ensure_open(self) -> None:
+        if self._stream is not None:
+            return
+        started = time.monotonic()
+        stream = self._factory()
+        stream.start()
+        self._stream = stream
+        logger.info("音声出力を開きました(%.0f ms)",
+                    (time.monotonic() - started) * 1000)
+        self._start_idle()
+
+    def _reopen(self) -> None:
+        self._discard()
+        self.reopens += 1
+        self._ensure_open()
+
+    def _discard(self) -> None:
+        stream, self._stream = self._stream, None
+        if stream is None:
+            return
+        try:
+            # 壊れたデバイスの鳴り残しは待たない
+            getattr(stream, "abort", stream.stop)()
+            stream.close()
+        except Exception:
+            logger.exception("音声出力を閉じられません")
+
+
+def make_stream_factory(mode: str = "blocking", latency=None,
+                        blocksize: int = 0, device=None):
+    """PlaybackEngine に渡す stream_factory を作る。
+
+    device は出力デバイス(None なら既定)。ドライブごとに別の出力へ
+    鳴らすときに使う。
+    """
+    if mode == "blocking":
+        if device is None:
+            return default_stream_factory
+        return functools.partial(default_stream_factory, device=device)
+    if mode == "callback":
+        return lambda: CallbackOutputStream(latency=latency,
+                                            blocksize=blocksize,
+                                            device=device)
+    raise ValueError(f"不明な出力方式: {mode}({', '.join(OUTPUT_MODES)})")
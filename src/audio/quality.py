@@ -0,0 +1,128 @@
+"""cdparanoia の読み取りモードの段階と、ディスクごとの記録。
+
+普段は -Z(検証なし)で速さを優先し、止まったり読み取りが追いつかなく
+なったトラックだけを一段ずつ慎重なモードへ上げる。上げた結果は
+~/.cache/cdp/<disc_id>/read_quality.json に残し、同じディスクの次回の
+挿入では最初からそのモードで読む。
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReadMode:
+    name: str
+    flags: tuple[str, ...]
+
+
+# 弱い順。-S は読み取り速度(倍速)の指定、-Y は重なり検証のみの paranoia
+READ_MODES = (
+    ReadMode("fast", ("-Z",)),
+    ReadMode("slow", ("-Z", "-S", "8")),
+    ReadMode("overlap", ("-Y", "-S", "8")),
+    ReadMode("paranoia", ("-S", "4")),
+)
+
+
+class ReadQuality:
+    """トラックごとの読み取りモードの段階。どのスレッドから呼んでもよい。"""
+
+    FILENAME = "read_quality.json"
+
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root) if root else Path.home() / ".cache" / "cdp"
+        self._lock = threading.Lock()
+        self._disc_id: str | None = None
+        self._levels: dict[int, int] = {}
+        self._pending: set[int] = set()  # 上げたがまだ開き直していない
+
+    def use_disc(self, disc_id: str | None) -> None:
+        """ディスクが確定した。前回までに上げた段階を読み込む。"""
+        levels = self._load(disc_id) if disc_id else {}
+        with self._lock:
+            self._disc_id = disc_id
+            self._levels = levels
+            self._pending.clear()
+        if levels:
+            logger.info("読み取りモードを前回から引き継ぎます: %s",
+                        ", ".join(f"トラック {n}: {READ_MODES[lv].name}"
+                                  for n, lv in sorted(levels.items())))
+
+    def mode(self, track_no: int, span: bool = False) -> ReadMode:
+        """track_no を読むモード。
+
+        連続読み(span)も track_no のモードで読む。1 プロセスでは途中で
+        モードを変えられないので、モードの変わるトラックの手前(span_end)で
+        区切り、そこから読み直す。上げたトラックだけが遅くなる。
+        """
+        with self._lock:
+            level = self._levels.get(track_no, 0)
+        return READ_MODES[level]
+
+    def span_end(self, track_no: int) -> int | None:
+        """track_no から同じモードで続けて読める最後のトラック。末尾までなら None。"""
+        with self._lock:
+            level = self._levels.get(track_no, 0)
+            last = max(self._levels, default=track_no)
+            for n in range(track_no + 1, last + 2):
+                if self._levels.get(n, 0) != level:
+                    return n - 1
+        return None
+
+    def opened(self, track_no: int, span: bool = False) -> None:
+        """ソースが track_no を(今のモードで)開き直した。"""
+        with self._lock:
+            self._pending = {n for n in self._pending
+                             if n < track_no or (not span and n != track_no)}
+
+    def escalate(self, track_no: int, reason: str) -> bool:
+        """track_no を一段慎重なモードへ。上げたら True。
+
+        上げたモードをまだ試していない間の報告は、同じ読み取りの続きなので
+        数えない。最も慎重なモードからはそれ以上上げない。
+        """
+        with self._lock:
+            level = self._levels.get(track_no, 0)
+            if track_no in self._pending or level + 1 >= len(READ_MODES):
+                return False
+            self._levels[track_no] = level + 1
+            self._pending.add(track_no)
+            disc_id, levels = self._disc_id, dict(self._levels)
+        logger.warning("トラック %d: %s のため読み取りモードを %s → %s に変更",
+                       track_no, reason, READ_MODES[level].name,
+                       READ_MODES[level + 1].name)
+        if disc_id:
+            self._save(disc_id, levels)
+        return True
+
+    def _path(self, disc_id: str) -> Path:
+        return self.root / disc_id / self.FILENAME
+
+    def _load(self, disc_id: str) -> dict[int, int]:
+        path = self._path(disc_id)
+        if not path.exists():
+            return {}
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            return {int(n): min(int(lv), len(READ_MODES) - 1)
+                    for n, lv in data["tracks"].items()}
+        except (OSError, KeyError, TypeError, ValueError, AttributeError):
+            logger.warning("読み取りモードの記録が壊れています: %s", disc_id)
+            return {}
+
+    def _save(self, disc_id: str, levels: dict[int, int]) -> None:
+        path = self._path(disc_id)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(
+                {"tracks": {str(n): lv for n, lv in sorted(levels.items())}},
+                indent=2), encoding="utf-8")
+        except OSError:
+            logger.exception("読み取りモードを保存できません: %s", disc_id)
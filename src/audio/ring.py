@@ -0,0 +1,214 @@
+"""先読み用の PCM リングバッファ。
+
+領域は生成時に確保し、以後は使い回す(容量を変える resize のときだけ
+確保し直す)。書き手はソースから
+memoryview へ直接読み込み(readinto)、読み手も memoryview のまま出力へ
+渡すので、チャンクごとの bytes 生成もキューの受け渡しも発生しない。
+
+トラック境界や終端などの印(mark)は、書き込み位置に紐づけて並べる。
+読み手は印の位置を越えて読むことはなく、印の位置に達したら pop_mark で
+取り出す。
+
+reset のたびに世代(epoch)が進む。古い世代の書き手の操作はすべて無視
+されるので、止め損ねた先読みスレッドが新しい再生に混ざることはない。
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+
+from src.audio.sources import CD_BYTES_PER_FRAME
+
+
+class PcmRingBuffer:
+    def __init__(self, capacity: int):
+        # 書き込み位置が常にフレーム境界に揃うよう、容量もフレーム単位にする
+        frames = -(-capacity // CD_BYTES_PER_FRAME)
+        self._buf = bytearray(frames * CD_BYTES_PER_FRAME)
+        self._view = memoryview(self._buf)
+        self._cond = threading.Condition()
+        self._head = 0  # 書き込み済みの累計バイト数
+        self._tail = 0  # 読み出し済みの累計バイト数
+        self._marks: deque[tuple[int, object]] = deque()
+        self._epoch = 0
+        self._started = False  # この世代で一度でも読まれたか
+        self.high_water = 0  # 最大充填量(バイト)
+        self.underruns = 0   # 再生開始後に空で待たされた回数
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    @property
+    def fill(self) -> int:
+        return self._head - self._tail
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def reset(self) -> int:
+        """中身を捨てて新しい世代を始める。古い書き手は以後すべて弾かれる。"""
+        with self._cond:
+            self._epoch += 1
+            self._head = self._tail = 0
+            self._started = False
+            self._marks.clear()
+            self._cond.notify_all()
+            return self._epoch
+
+    # --- 書き手(先読みスレッド) ---
+
+    def write_view(self, epoch: int, timeout: float | None = None):
+        """空き領域のうち連続した部分の memoryview。
+
+        空きができるまで待つ。世代が変わった・タイムアウトしたら None。
+        書き込んだら commit で確定させる。
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: (epoch != self._epoch
+                             or self._head - self._tail < self.capacity),
+                    timeout):
+                return None
+            if epoch != self._epoch:
+                return None
+            start = self._head % self.capacity
+            free = self.capacity - (self._head - self._tail)
+            return self._view[start:start + min(free, self.capacity - start)]
+
+    def resize(self, epoch: int, capacity: int) -> bool:
+        """容量を変える。中身と印の並びは保つ。
+
+        書き込み途中の領域があってはならないので、書き手自身が write_view を
+        取る前に呼ぶこと。読み手が peek 済みの memoryview は旧領域を指した
+        まま有効で、consume の数え方も変わらない。縮める場合も、溜まって
+        いる分より小さくはしない。
+        """
+        with self._cond:
+            if epoch != self._epoch:
+                return False
+            fill = self._head - self._tail
+            frames = -(-max(capacity, fill) // CD_BYTES_PER_FRAME)
+            size = frames * CD_BYTES_PER_FRAME
+            if size == self.capacity:
+                return True
+            new = bytearray(size)
+            start = self._tail % self.capacity
+            first = min(fill, self.capacity - start)
+            new[:first] = self._view[start:start + first]
+            new[first:fill] = self._view[:fill - first]
+            self._marks = deque((pos - self._tail, item)
+                                for pos, item in self._marks)
+            self._head, self._tail = fill, 0
+            self._buf = new
+            self._view = memoryview(new)
+            self._cond.notify_all()
+            return True
+
+    def commit(self, epoch: int, n: int) -> bool:
+        with self._cond:
+            if epoch != self._epoch:
+                return False
+            self._head += n
+            self.high_water = max(self.high_water, self._head - self._tail)
+            self._cond.notify_all()
+            return True
+
+    def write(self, epoch: int, data) -> bool:
+        """data をコピーして書く(readinto を持たないソース用)。"""
+        src = memoryview(data).cast("B")
+        while len(src):
+            view = self.write_view(epoch)
+            if view is None:
+                return False
+            n = min(len(view), len(src))
+            view[:n] = src[:n]
+            if not self.commit(epoch, n):
+                return False
+            src = src[n:]
+        return True
+
+    def mark(self, epoch: int, item) -> bool:
+        """現在の書き込み位置に印を置く。"""
+        with self._cond:
+            if epoch != self._epoch:
+                return False
+            self._marks.append((self._head, item))
+            self._cond.notify_all()
+            return True
+
+    # --- 読み手(再生スレッド) ---
+
+    def wait_readable(self, timeout: float | None,
+                      interrupted=None) -> bool:
+        """データか印が読めるようになるまで待つ。
+
+        interrupted() が真になったら(wake で起こされたときに確かめる)
+        読めなくても戻る。読めるなら True。
+        """
+        with self._cond:
+            if not self._readable() and self._started:
+                self.underruns += 1
+            if interrupted is None:
+                return self._cond.wait_for(self._readable, timeout)
+            self._cond.wait_for(
+                lambda: self._readable() or interrupted(), timeout)
+            return self._readable()
+
+    def wake(self) -> None:
+        """待っている読み手を起こす(停止・曲送りなど、外の状態が変わった)。"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def reallocate(self) -> None:
+        """領域を新しく確保し直す(中身は捨てる)。
+
+        止め損ねた書き手が古い memoryview へ書き続けても、新しい世代の
+        データを壊さないようにする。
+        """
+        with self._cond:
+            self._buf = bytearray(self.capacity)
+            self._view = memoryview(self._buf)
+            self._head = self._tail = 0
+            self._marks.clear()
+            self._cond.notify_all()
+
+    def _readable(self) -> bool:
+        return self._head > self._tail or bool(self._marks)
+
+    def wait_drained(self, timeout: float | None) -> bool:
+        """書いた分がすべて読まれるまで待つ。"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._head == self._tail,
+                                       timeout)
+
+    def pop_mark(self):
+        """読み出し位置にある印を取り出す。無ければ None。"""
+        with self._cond:
+            if self._marks and self._marks[0][0] == self._tail:
+                return self._marks.popleft()[1]
+            return None
+
+    def peek(self, max_bytes: int) -> memoryview:
+        """読める部分の memoryview(コピーしない)。印の手前で止まる。
+
+        使い終わったら consume で解放する。それまで書き手は同じ領域を
+        上書きしない。
+        """
+        with self._cond:
+            end = self._head
+            if self._marks:
+                end = min(end, self._marks[0][0])
+            start = self._tail % self.capacity
+            n = min(end - self._tail, self.capacity - start, max_bytes)
+            return self._view[start:start + n]
+
+    def consume(self, n: int, epoch: int | None = None) -> None:
+        """epoch を渡すと、peek の後に reset されていた場合は何もしない。"""
+        with self._cond:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._tail += n
+            self._started = True
+            self._cond.notify_all()
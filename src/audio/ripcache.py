@@ -0,0 +1,281 @@
+"""リッピングキャッシュ(既定: ~/.cache/cdp/<disc_id>/audio/)。
+
+再生中にドライブから読んだ PCM をそのままトラック単位の WAV に書き出し、
+全トラックが揃ったディスクは次回の挿入からドライブを待たずにここから
+再生する。メタデータキャッシュと同じディスク別ディレクトリに置く。
+
+- NN.wav       完成したトラック
+- NN.wav.part  途中まで。ヘッダは仮のままで、ファイル長から再開位置が分かる。
+               次に同じトラックを再生したとき、保存済みの範囲は読み飛ばして
+               続きから書き足す
+- .last_used   最後に使った時刻(mtime)。容量超過時はこれが古い順に消す
+"""
+from __future__ import annotations
+
+import logging
+import shutil
+import struct
+import threading
+from pathlib import Path
+
+from src.audio.sources import (CD_BYTES_PER_FRAME, CD_CHANNELS,
+                               CD_FRAMES_PER_SECTOR, CD_SAMPLE_RATE,
+                               FileTreeSource)
+
+logger = logging.getLogger(__name__)
+
+WAV_HEADER_BYTES = 44
+DEFAULT_BUDGET_BYTES = 4 * 1024 ** 3  # CD 5〜6 枚分
+
+
+def wav_header(data_bytes: int) -> bytes:
+    """44.1kHz/16bit/2ch の PCM WAV ヘッダ。"""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, CD_CHANNELS, CD_SAMPLE_RATE,
+        CD_SAMPLE_RATE * CD_BYTES_PER_FRAME, CD_BYTES_PER_FRAME, 16,
+        b"data", data_bytes)
+
+
+def track_bytes(sectors: int) -> int:
+    return sectors * CD_FRAMES_PER_SECTOR * CD_BYTES_PER_FRAME
+
+
+class _TrackWriter:
+    """1 トラック分の書き出し。トラック内 start バイト目からの連続データを
+    feed する。保存済みの範囲より先から始まった(シークした)場合は、
+    間が空くので書かない。"""
+
+    def __init__(self, part: Path, final: Path, expected: int,
+                 start: int = 0):
+        self._part = part
+        self._final = final
+        self._expected = expected
+        self._pos = start  # feed されたデータのトラック内位置
+        size = part.stat().st_size if part.exists() else 0
+        if size >= WAV_HEADER_BYTES:
+            self._file = open(part, "r+b")
+            self._file.seek(0, 2)
+            self._saved = size - WAV_HEADER_BYTES
+        else:
+            self._file = open(part, "wb")
+            self._file.write(wav_header(0))
+            self._saved = 0
+        self.done = False
+
+    def feed(self, data) -> None:
+        end = self._pos + len(data)
+        if self._pos <= self._saved < end and not self.done:
+            start = self._saved - self._pos
+            take = data[start:start + self._expected - self._saved]
+            self._file.write(take)
+            self._saved += len(take)
+            if self._saved >= self._expected:
+                self._finish()
+        self._pos = end
+
+    def _finish(self) -> None:
+        self._file.seek(0)
+        self._file.write(wav_header(self._saved))
+        self._file.close()
+        self._part.replace(self._final)
+        self.done = True
+        logger.info("リッピング完了: %s", self._final)
+
+    def close(self) -> None:
+        if not self.done:
+            self._file.close()
+
+
+class _TeeReader:
+    """ソースの読み取りをそのまま通しつつ、トラック別のファイルへも書く。
+
+    spans は読み取りが順にまたぐ (トラック番号, バイト長)。連続読み
+    (open_from)なら複数、トラック単位なら 1 つ。読み取りが最初のトラックの
+    途中から始まるなら start にそのバイト位置を渡す。
+    """
+
+    def __init__(self, reader, cache: AudioCache, disc_id: str,
+                 spans: list[tuple[int, int]], start: int = 0):
+        self._reader = reader
+        self._cache = cache
+        self._disc_id = disc_id
+        self._spans = list(spans)
+        self._writer: _TrackWriter | None = None
+        self._left = 0  # 今のトラックの残りバイト
+        self._start = start  # 最初のトラックの読み始め位置
+        self._lock = threading.Lock()
+        self._closed = False
+        if hasattr(reader, "readinto"):
+            self.readinto = self._readinto
+
+    def _readinto(self, buf) -> int:
+        n = self._reader.readinto(buf)
+        self._feed(buf[:n])
+        return n
+
+    def __iter__(self):
+        for chunk in self._reader:
+            self._feed(chunk)
+            yield chunk
+
+    def _feed(self, data) -> None:
+        with self._lock:
+            try:
+                while len(data) and not self._closed:
+                    if self._left == 0 and not self._next_track():
+                        return
+                    n = min(len(data), self._left)
+                    if self._writer is not None:
+                        self._writer.feed(data[:n])
+                    self._left -= n
+                    data = data[n:]
+            except OSError:
+                # 書き出しに失敗しても再生は続ける(キャッシュは諦める)
+                logger.exception("リッピングキャッシュへの書き出しに失敗")
+                self._close_writer()
+                self._closed = True
+
+    def _next_track(self) -> bool:
+        self._close_writer()
+        if not self._spans:
+            return False
+        number, length = self._spans.pop(0)
+        start, self._start = self._start, 0
+        self._left = length - start
+        if not self._cache.track_path(self._disc_id, number).exists():
+            self._writer = self._cache.writer(self._disc_id, number,
+                                              length, start)
+        return True
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._close_writer()
+
+
+class RippingSource:
+    """既存の TrackSource を包み、読んだ PCM をキャッシュへ書き出す。"""
+
+    def __init__(self, inner, cache: AudioCache, disc_id: str, tracks):
+        """tracks は TOC の TrackRef 列(sectors が必要)。"""
+        self._inner = inner
+        self._cache = cache
+        self._disc_id = disc_id
+        self._lengths = {t.number: track_bytes(t.sectors) for t in tracks}
+        self._tee: _TeeReader | None = None
+        if hasattr(inner, "open_from"):
+            self.open_from = self._open_from
+        for name in ("read_mode", "report_trouble", "keep_alive",
+                     "expect_spin_up", "open_lock"):
+            if hasattr(inner, name):
+                setattr(self, name, getattr(inner, name))
+
+    def list_tracks(self):
+        return self._inner.list_tracks()
+
+    def open(self, track_no: int, start_frame: int = 0):
+        # 先頭から読むときは、シーク非対応のソースも包めるよう従来の形で呼ぶ
+        args = (track_no, start_frame) if start_frame else (track_no,)
+        return self._wrap(self._inner.open(*args), [track_no], start_frame)
+
+    def _open_from(self, track_no: int, start_frame: int = 0):
+        numbers = [n for n in sorted(self._lengths) if n >= track_no]
+        args = (track_no, start_frame) if start_frame else (track_no,)
+        return self._wrap(self._inner.open_from(*args), numbers, start_frame)
+
+    def _wrap(self, reader, numbers: list[int], start_frame: int = 0):
+        self._close_tee()
+        self._cache.directory(self._disc_id).mkdir(parents=True,
+                                                   exist_ok=True)
+        spans = [(n, self._lengths[n]) for n in numbers if n in self._lengths]
+        self._tee = _TeeReader(reader, self._cache, self._disc_id, spans,
+                               start_frame * CD_BYTES_PER_FRAME)
+        return self._tee
+
+    def _close_tee(self) -> None:
+        if self._tee is not None:
+            self._tee.close()
+            self._tee = None
+
+    def close(self) -> None:
+        try:
+            self._inner.close()
+        finally:
+            self._close_tee()
+
+
+class AudioCache:
+    def __init__(self, root: Path | None = None,
+                 budget_bytes: int = DEFAULT_BUDGET_BYTES):
+        self.root = Path(root) if root else Path.home() / ".cache" / "cdp"
+        self.budget_bytes = budget_bytes
+
+    def directory(self, disc_id: str) -> Path:
+        return self.root / disc_id / "audio"
+
+    def track_path(self, disc_id: str, number: int) -> Path:
+        return self.directory(disc_id) / f"{number:02d}.wav"
+
+    def writer(self, disc_id: str, number: int, expected: int,
+               start: int = 0) -> _TrackWriter:
+        final = self.track_path(disc_id, number)
+        return _TrackWriter(final.with_name(final.name + ".part"), final,
+                            expected, start)
+
+    def is_complete(self, disc_id: str, tracks) -> bool:
+        """TOC の全トラックが、TOC どおりの長さで揃っているか。"""
+        if not tracks or any(not t.sectors for t in tracks):
+            return False
+        for t in tracks:
+            path = self.track_path(disc_id, t.number)
+            expected = WAV_HEADER_BYTES + track_bytes(t.sectors)
+            if not path.exists() or path.stat().st_size != expected:
+                return False
+        return True
+
+    def wrap(self, source, disc_id: str, tracks) -> RippingSource:
+        return RippingSource(source, self, disc_id, tracks)
+
+    def source(self, disc_id: str) -> FileTreeSource:
+        """リッピング済みトラックを再生するソース(mmap、ギャップレス対応)。"""
+        return FileTreeSource(str(self.directory(disc_id)))
+
+    def touch(self, disc_id: str) -> None:
+        d = self.directory(disc_id)
+        d.mkdir(parents=True, exist_ok=True)
+        (d / ".last_used").touch()
+
+    def usage(self) -> list[tuple[float, str, int]]:
+        """(最終使用時刻, disc_id, バイト数) を古い順に。"""
+        found = []
+        if not self.root.exists():
+            return found
+        for d in self.root.glob("*/audio"):
+            marker = d / ".last_used"
+            used = marker.stat().st_mtime if marker.exists() else 0.0
+            size = sum(p.stat().st_size for p in d.iterdir() if p.is_file())
+            found.append((used, d.parent.name, size))
+        return sorted(found)
+
+    def enforce_budget(self, keep: str | None = None) -> int:
+        """容量を超えていれば、使っていない順に音声を消す。消したバイト数。"""
+        entries = self.usage()
+        total = sum(size for _, _, size in entries)
+        freed = 0
+        for _, disc_id, size in entries:
+            if total - freed <= self.budget_bytes:
+                break
+            if disc_id == keep:
+                continue
+            shutil.rmtree(self.directory(disc_id), ignore_errors=True)
+            freed += size
+            logger.info("リッピングキャッシュを削除: %s (%d MB)",
+                        disc_id, size // 2 ** 20)
+        return freed
@@ -1,16 +1,24 @@
 """トラック供給源(プラットフォーム別)。PCM は 44.1kHz/16bit/2ch/LE 固定。"""
 from __future__ import annotations
 
+import functools
 import logging
+import mmap
 import os
 import re
 import select
+import struct
 import subprocess
 import sys
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator, NamedTuple
 
+from src.audio.quality import ReadQuality
 from src.core.events import TrackRef
+from src.disc.cdrom import (CD_FRAMESIZE_RAW, CD_MAX_READ_SECTORS, CdromDevice,
+                            CdToc, CdTrack)
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +27,7 @@ CD_CHANNELS = 2
 CD_BYTES_PER_FRAME = 4  # int16 * 2ch
 CHUNK_FRAMES = 4096
 CHUNK_BYTES = CHUNK_FRAMES * CD_BYTES_PER_FRAME
+CD_FRAMES_PER_SECTOR = 588  # 44100 / 75
 
 
 class SourceStallError(Exception):
@@ -29,36 +38,166 @@ class TrackSourceError(Exception):
     """トラックの列挙・オープンに失敗した。"""
 
 
-_TOC_LINE = re.compile(r"^\s*(\d+)\.\s+(\d+)\s")
+_TOC_LINE = re.compile(r"^\s*(\d+)\.\s+(\d+)\s+(?:\[[^\]]*\]\s+(\d+)\s)?")
 
 
 def parse_cdparanoia_toc(text: str) -> list[TrackRef]:
-    """`cdparanoia -Q` の出力からトラック一覧を得る。セクタ数 / 75 = 秒。"""
+    """`cdparanoia -Q` の出力からトラック一覧を得る。セクタ数 / 75 = 秒。
+
+    begin 列(先頭 LBA)も読むので、disc_id_from_tracks で DiscID が求まる。
+    """
     tracks = []
     for line in text.splitlines():
         m = _TOC_LINE.match(line)
         if m:
+            sectors = int(m.group(2))
+            start = int(m.group(3)) if m.group(3) else None
             tracks.append(TrackRef(number=int(m.group(1)),
-                                   duration=int(m.group(2)) / 75.0))
+                                   duration=sectors / 75.0, sectors=sectors,
+                                   start=start))
     return tracks
 
 
+class _PipeReader:
+    """パイプから PCM を読む。readinto で呼び出し側のバッファへ直接読める。
+
+    イテレータとして回すとチャンクごとの bytes を返す(従来の使い方)。
+    最初のデータだけ start_timeout まで待ち、以後は stall_timeout で諦める。
+    """
+
+    def __init__(self, fd: int, label: str, start_timeout: float,
+                 stall_timeout: float):
+        self._fd = fd
+        self._label = label
+        self._timeout = start_timeout
+        self._start_timeout = start_timeout
+        self._stall_timeout = stall_timeout
+
+    def expect_delay(self) -> None:
+        """次のデータはドライブの立ち上がりを待つ(長い一時停止からの再開)。"""
+        self._timeout = self._start_timeout
+
+    def readinto(self, buf) -> int:
+        """buf へ読み込んだバイト数。0 なら EOF。"""
+        ready, _, _ = select.select([self._fd], [], [], self._timeout)
+        if not ready:
+            raise SourceStallError(f"{self._label}: {self._timeout} 秒無応答")
+        n = os.readv(self._fd, [buf])
+        if n:
+            self._timeout = self._stall_timeout
+        return n
+
+    def __iter__(self) -> Iterator[bytes]:
+        buf = bytearray(CHUNK_BYTES)
+        while True:
+            n = self.readinto(buf)
+            if not n:
+                return
+            yield bytes(buf[:n])
+
+
+class _SoundFileReader:
+    """soundfile の SoundFile から int16 PCM を読む。readinto 対応。"""
+
+    def __init__(self, f):
+        self._file = f
+
+    def readinto(self, buf) -> int:
+        frame_bytes = self._file.channels * 2  # int16 * チャンネル数
+        usable = len(buf) - len(buf) % frame_bytes
+        frames = self._file.buffer_read_into(buf[:usable], dtype="int16")
+        return frames * frame_bytes
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            buf = self._file.buffer_read(CHUNK_FRAMES, dtype="int16")
+            if len(buf) == 0:
+                return
+            yield bytes(buf)
+
+
+def sector_position(start_frame: int) -> tuple[int, int]:
+    """フレーム位置を (セクタ, そのセクタ内で読み捨てるバイト数) に分ける。"""
+    sector, frames = divmod(start_frame, CD_FRAMES_PER_SECTOR)
+    return sector, frames * CD_BYTES_PER_FRAME
+
+
+class _SkipReader:
+    """先頭の n バイトを読み捨てる。
+
+    セクタ単位でしか位置決めできないソースで、フレーム単位のシークを
+    実現するために使う。
+    """
+
+    def __init__(self, reader, skip: int):
+        self._reader = reader
+        self._skip = skip
+        if hasattr(reader, "readinto"):
+            self.readinto = self._readinto
+
+    def _readinto(self, buf) -> int:
+        while self._skip:
+            n = self._reader.readinto(buf[:self._skip])
+            if not n:
+                return 0
+            self._skip -= n
+        return self._reader.readinto(buf)
+
+    def __iter__(self):
+        for chunk in self._reader:
+            if self._skip:
+                drop = min(self._skip, len(chunk))
+                self._skip -= drop
+                chunk = chunk[drop:]
+                if not len(chunk):
+                    continue
+            yield chunk
+
+    def close(self) -> None:
+        if hasattr(self._reader, "close"):
+            self._reader.close()
+
+
+def _skip_within_sector(reader, skip: int):
+    return _SkipReader(reader, skip) if skip else reader
+
+
+def _control_drive(label: str, action) -> bool:
+    """ドライブへの速度指定・モーター停止。非対応のドライブもあるので、
+    失敗は警告だけで再生は続ける。"""
+    try:
+        action()
+        return True
+    except (OSError, TrackSourceError) as e:
+        logger.warning("%s: ドライブを制御できません: %s", label, e)
+        return False
+
+
 class CdparanoiaSource:
     """Linux: cdparanoia の子プロセスから raw PCM を読む。"""
 
     def __init__(self, device: str = "/dev/sr0", binary: str = "cdparanoia",
-                 stall_timeout: float = 10.0, start_timeout: float = 45.0):
+                 stall_timeout: float = 10.0, start_timeout: float = 45.0,
+                 quality: ReadQuality | None = None):
         """stall_timeout は再生中の音切れ、start_timeout は最初の音までの待ち。
 
         両者は別の現象なので閾値を分ける。挿入直後のドライブは冷えており、
         実機計測では最初のデータまで 20.5 秒かかった(Raspberry Pi 4 +
         USB ドライブ)。ここを短く見積もると 1 曲目が必ずスキップされる。
+
+        quality はトラックごとの読み取りモード(既定は -Z から始める)。
         """
         self.device = device
         self.binary = binary
         self.stall_timeout = stall_timeout
         self.start_timeout = start_timeout
+        self.quality = quality or ReadQuality()
+        # プロセスの起動・終了はこれを持って行う。先読みスレッドも持った
+        # まま、まだ読むべきかを確かめてから開く(古い読み取りの起動と
+        # close の行き違いで、プロセスが取り残されないように)
+        self.open_lock = threading.RLock()
         self._proc: subprocess.Popen | None = None
+        self._pipe: _PipeReader | None = None
 
     def list_tracks(self) -> list[TrackRef]:
         result = subprocess.run(
@@ -69,7 +208,7 @@ class CdparanoiaSource:
             raise TrackSourceError("cdparanoia -Q でトラックを列挙できません")
         return tracks
 
-    def read_command(self, track_no: int) -> list[str]:
+    def read_command(self, track_no: int, span: bool = False) -> list[str]:
         """トラック読み出しの argv。
 
         -r: raw リトルエンディアン PCM を stdout へ
@@ -77,39 +216,312 @@ class CdparanoiaSource:
             再生では起動が数秒遅れるうえ、傷ディスクでリトライが長引いて
             stall 検知(トラックスキップ)を誘発する。ドライブ自身の誤り
             訂正に任せ、低遅延と再生継続を優先する。
+
+        -Z で止まったトラックは、quality が慎重なモード(速度を落とす、
+        paranoia を効かせる)へ上げる。
         """
-        return [self.binary, "-q", "-r", "-Z", "-d", self.device,
+        flags = self.quality.mode(track_no, span).flags
+        return [self.binary, "-q", "-r", *flags, "-d", self.device,
                 str(track_no), "-"]
 
-    def open(self, track_no: int) -> Iterator[bytes]:
-        self.close()
-        self._proc = subprocess.Popen(
-            self.read_command(track_no),
-            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-        return self._read_chunks(self._proc)
-
-    def _read_chunks(self, proc: subprocess.Popen) -> Iterator[bytes]:
-        fd = proc.stdout.fileno()
-        timeout = self.start_timeout  # 最初の 1 チャンクだけ長く待つ
+    def span_command(self, track_no: int,
+                     end: int | None = None) -> list[str]:
+        """track_no から end(None ならディスク末尾)までを 1 プロセスで読む argv。
+
+        `N-` / `N-M` は cdparanoia のスパン指定。トラック間でプロセスの起動や
+        ドライブの再シークが起きないため、曲間が途切れない。
+        """
+        argv = self.read_command(track_no, span=True)
+        argv[-2] = f"{track_no}-{end or ''}"
+        return argv
+
+    def select_speed(self, speed: int) -> bool:
+        """読み取り速度(倍速、0 = 最高速)。cdparanoia の外からドライブへ指定する。"""
+        return _control_drive(self.device, lambda: self._with_drive(
+            lambda d: d.select_speed(speed)))
+
+    def stop_motor(self) -> bool:
+        return _control_drive(self.device, lambda: self._with_drive(
+            lambda d: d.stop_motor()))
+
+    def keep_alive(self) -> bool:
+        """一時停止中にドライブを回しておく(cdparanoia はパイプが詰まると読まない)。"""
+        return _control_drive(self.device, lambda: self._with_drive(
+            lambda d: d.keep_spinning()))
+
+    def expect_spin_up(self) -> None:
+        """止まったドライブから読み直す。次のデータは start_timeout まで待つ。"""
+        if self._pipe is not None:
+            self._pipe.expect_delay()
+
+    def _with_drive(self, fn) -> None:
+        drive = CdromDevice(self.device)
+        try:
+            fn(drive)
+        finally:
+            drive.close()
+
+    def use_disc(self, disc_id: str | None) -> None:
+        """TOC からディスクが分かった。前回上げた読み取りモードを使う。"""
+        self.quality.use_disc(disc_id)
+
+    def read_mode(self, track_no: int, span: bool = False) -> str:
+        return self.quality.mode(track_no, span).name
+
+    def report_trouble(self, track_no: int, reason: str) -> bool:
+        """再生側が読み取りの不調(停止・遅延)を見た。次に開くとき効く。"""
+        return self.quality.escalate(track_no, reason)
+
+    @staticmethod
+    def position_spec(track_no: int, sector: int = 0) -> str:
+        """トラック内の位置の指定 `N[mm:ss.ff]`(ff はセクタ = 1/75 秒)。"""
+        if not sector:
+            return str(track_no)
+        minutes, rest = divmod(sector, 75 * 60)
+        seconds, sectors = divmod(rest, 75)
+        return f"{track_no}[{minutes}:{seconds:02d}.{sectors:02d}]"
+
+    def open(self, track_no: int, start_frame: int = 0) -> Iterable[bytes]:
+        """start_frame はトラック先頭からのフレーム位置(シーク)。
+
+        cdparanoia はセクタ単位でしか位置決めできないので、セクタ内の
+        端数は読み捨ててフレーム位置を合わせる。
+        """
+        sector, skip = sector_position(start_frame)
+        argv = self.read_command(track_no)
+        if sector:
+            argv[-2] = f"{self.position_spec(track_no, sector)}-{track_no}"
+        self.quality.opened(track_no)
+        return _skip_within_sector(self._spawn(argv), skip)
+
+    def open_from(self, track_no: int,
+                  start_frame: int = 0) -> Iterable[bytes]:
+        """track_no 以降を連続で読む。トラック境界はエンジンが TOC から切る。
+
+        読み取りモードの違うトラックの手前でスパンを区切り、そこからは
+        そのトラックのモードで cdparanoia を起動し直して続ける。
+        """
+        sector, skip = sector_position(start_frame)
+        return _skip_within_sector(_SpanReader(self, track_no, sector), skip)
+
+    def _spawn_span(self, track_no: int,
+                    sector: int = 0) -> tuple[_PipeReader, int | None]:
+        """track_no から同じモードで読める所までを開く。(パイプ, 続きのトラック)。"""
+        end = self.quality.span_end(track_no)
+        argv = self.span_command(track_no, end)
+        argv[-2] = f"{self.position_spec(track_no, sector)}-{end or ''}"
+        self.quality.opened(track_no, span=True)
+        return self._spawn(argv), (end + 1 if end is not None else None)
+
+    def _spawn(self, argv: list[str]) -> Iterable[bytes]:
+        with self.open_lock:
+            self.close()
+            self._proc = subprocess.Popen(
+                argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            self._pipe = _PipeReader(self._proc.stdout.fileno(),
+                                     f"cdparanoia ({self.device})",
+                                     self.start_timeout, self.stall_timeout)
+            return self._pipe
+
+    def close(self) -> None:
+        with self.open_lock:
+            if self._proc is not None:
+                self._proc.terminate()
+                try:
+                    self._proc.wait(timeout=3)
+                except subprocess.TimeoutExpired:
+                    self._proc.kill()
+                self._proc = None
+                self._pipe = None
+
+
+class _SpanReader:
+    """CdparanoiaSource.open_from の読み取り。区切ったスパンを順につなぐ。
+
+    1 本目が読み終わったら次のスパンを開く(同じ先読みスレッドから)。
+    ソースが閉じられた・別の読み取りが開かれたら、そこで終わる。
+    """
+
+    def __init__(self, source: CdparanoiaSource, track_no: int, sector: int):
+        self._source = source
+        self._pipe, self._next = source._spawn_span(track_no, sector)
+
+    def readinto(self, buf) -> int:
         while True:
-            ready, _, _ = select.select([fd], [], [], timeout)
-            if not ready:
-                raise SourceStallError(
-                    f"cdparanoia ({self.device}): {timeout} 秒無応答")
-            data = os.read(fd, CHUNK_BYTES)
-            if not data:
+            n = self._pipe.readinto(buf)
+            if n or self._next is None:
+                return n
+            with self._source.open_lock:
+                if self._source._pipe is not self._pipe:
+                    return 0  # 閉じられた・別の読み取りが開かれた
+                logger.info("トラック %d から読み取りモード %s で読み直します",
+                            self._next, self._source.read_mode(self._next))
+                self._pipe, self._next = self._source._spawn_span(self._next)
+
+    def __iter__(self) -> Iterator[bytes]:
+        buf = bytearray(CHUNK_BYTES)
+        while True:
+            n = self.readinto(buf)
+            if not n:
                 return
-            timeout = self.stall_timeout
-            yield data
+            yield bytes(buf[:n])
+
+
+class _IoctlReader:
+    """CDROMREADAUDIO で [start, end) のセクタを読む。
+
+    呼び出し側のバッファが 1 セクタ以上あれば、そこへ直接読み込む(先読み
+    リングへゼロコピー)。足りないときは内部のバッチ用バッファに読み、
+    端数を次の readinto で渡す。
+    """
+
+    def __init__(self, device, start: int, end: int, batch: int):
+        self._device = device
+        self._pos = start
+        self._end = end
+        self._batch = batch
+        self._buf = bytearray(batch * CD_FRAMESIZE_RAW)  # 使い回す
+        self._pending = memoryview(self._buf)[:0]
+
+    def readinto(self, buf) -> int:
+        """buf へ読み込んだバイト数。0 なら終端。"""
+        if len(self._pending):
+            n = min(len(buf), len(self._pending))
+            buf[:n] = self._pending[:n]
+            self._pending = self._pending[n:]
+            return n
+        sectors = min(self._batch, self._end - self._pos)
+        if sectors <= 0:
+            return 0
+        direct = len(buf) // CD_FRAMESIZE_RAW
+        if direct:
+            sectors = min(sectors, direct)
+            self._read(sectors, buf)
+            return sectors * CD_FRAMESIZE_RAW
+        self._read(sectors, self._buf)
+        self._pending = memoryview(self._buf)[:sectors * CD_FRAMESIZE_RAW]
+        return self.readinto(buf)
+
+    def _read(self, sectors: int, buf) -> None:
+        try:
+            self._device.read_audio(self._pos, sectors, buf)
+        except OSError as e:
+            raise SourceStallError(
+                f"{self._device.path}: セクタ {self._pos} を読めません: {e}"
+            ) from e
+        self._pos += sectors
+
+    def __iter__(self) -> Iterator[bytes]:
+        while self._pos < self._end:
+            sectors = min(self._batch, self._end - self._pos)
+            self._read(sectors, self._buf)
+            yield bytes(self._buf[:sectors * CD_FRAMESIZE_RAW])
 
     def close(self) -> None:
-        if self._proc is not None:
-            self._proc.terminate()
+        pass  # デバイスはソースが持つ
+
+
+class IoctlCdSource:
+    """Linux: ioctl(CDROMREADAUDIO) で CD-DA を直接読む。
+
+    トラックごとに cdparanoia を fork/exec せず、ドライブの検出もしないので
+    最初の音までが短い。paranoia 検証はしない(cdparanoia -Z 相当)。
+    batch_sectors は 1 回の ioctl で読むセクタ数(1〜75、75 で 1 秒分)。
+    """
+
+    def __init__(self, device: str = "/dev/sr0",
+                 batch_sectors: int = CD_MAX_READ_SECTORS, ioctl=None):
+        """ioctl は CdromDevice にそのまま渡す(テスト用の差し替え口)。"""
+        if not 0 < batch_sectors <= CD_MAX_READ_SECTORS:
+            raise ValueError(
+                f"batch_sectors は 1〜{CD_MAX_READ_SECTORS}: {batch_sectors}")
+        self.device = device
+        self.batch_sectors = batch_sectors
+        self._ioctl = ioctl
+        self._cdrom: CdromDevice | None = None
+        self._toc: CdToc | None = None
+        # ウォームアップの open と TOC のフォールバックが並行しうる
+        self._lock = threading.RLock()
+
+    def _open_device(self) -> CdromDevice:
+        with self._lock:
+            return self._open_device_locked()
+
+    def _open_device_locked(self) -> CdromDevice:
+        if self._cdrom is None or self._cdrom.closed:
             try:
-                self._proc.wait(timeout=3)
-            except subprocess.TimeoutExpired:
-                self._proc.kill()
-            self._proc = None
+                self._cdrom = CdromDevice(self.device, ioctl=self._ioctl)
+            except OSError as e:
+                raise TrackSourceError(f"{self.device} を開けません: {e}") from e
+            self._toc = None
+        return self._cdrom
+
+    def toc(self) -> CdToc:
+        with self._lock:
+            cdrom = self._open_device_locked()
+            if self._toc is None:
+                try:
+                    self._toc = cdrom.read_toc()
+                except OSError as e:
+                    raise TrackSourceError(f"TOC を読めません: {e}") from e
+            return self._toc
+
+    def list_tracks(self) -> list[TrackRef]:
+        toc = self.toc()
+        tracks = []
+        for t in toc.audio_tracks():
+            sectors = toc.track_end(t.number) - t.start
+            tracks.append(TrackRef(number=t.number, duration=sectors / 75.0,
+                                   sectors=sectors, start=t.start))
+        if not tracks:
+            raise TrackSourceError("オーディオトラックがありません")
+        return tracks
+
+    def open(self, track_no: int, start_frame: int = 0) -> Iterable[bytes]:
+        return self._open_span(track_no, track_no, start_frame)
+
+    def open_from(self, track_no: int,
+                  start_frame: int = 0) -> Iterable[bytes]:
+        """track_no から最後のオーディオトラックの終端までを連続で読む。"""
+        last = self.toc().audio_tracks()[-1].number
+        return self._open_span(track_no, last, start_frame)
+
+    def _open_span(self, first: int, last: int, start_frame: int):
+        sector, skip = sector_position(start_frame)
+        start = self._track(first).start + sector
+        return _skip_within_sector(
+            self.open_sectors(start, self.toc().track_end(last)), skip)
+
+    def open_sectors(self, start: int, end: int) -> Iterable[bytes]:
+        """任意のセクタ範囲 [start, end) を読む。"""
+        return _IoctlReader(self._open_device(), start, end,
+                            self.batch_sectors)
+
+    def select_speed(self, speed: int) -> bool:
+        """読み取り速度(倍速、0 = 最高速)。"""
+        return _control_drive(self.device, lambda: self._open_device()
+                              .select_speed(speed))
+
+    def stop_motor(self) -> bool:
+        return _control_drive(self.device,
+                              lambda: self._open_device().stop_motor())
+
+    def keep_alive(self) -> bool:
+        """一時停止中にドライブを回しておく。"""
+        return _control_drive(self.device,
+                              lambda: self._open_device().keep_spinning())
+
+    def _track(self, track_no: int) -> CdTrack:
+        for t in self.toc().audio_tracks():
+            if t.number == track_no:
+                return t
+        raise TrackSourceError(f"トラック {track_no} がありません")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._cdrom is not None:
+                self._cdrom.close()
+                self._cdrom = None
 
 
 _AIFF_NUM = re.compile(r"^(\d+)")
@@ -142,21 +554,16 @@ class AiffFileSource:
                                        duration=len(f) / f.samplerate))
         return tracks
 
-    def open(self, track_no: int) -> Iterator[bytes]:
+    def open(self, track_no: int, start_frame: int = 0) -> Iterable[bytes]:
         import soundfile as sf
         self.close()
         paths = self._paths()
         if track_no not in paths:
             raise TrackSourceError(f"トラック {track_no} がありません")
         self._file = sf.SoundFile(str(paths[track_no]))
-        return self._read_chunks(self._file)
-
-    def _read_chunks(self, f) -> Iterator[bytes]:
-        while True:
-            buf = f.buffer_read(CHUNK_FRAMES, dtype="int16")
-            if len(buf) == 0:
-                return
-            yield bytes(buf)
+        if start_frame:
+            self._file.seek(min(start_frame, len(self._file)))
+        return _SoundFileReader(self._file)
 
     def close(self) -> None:
         if self._file is not None:
@@ -164,8 +571,296 @@ class AiffFileSource:
             self._file = None
 
 
-def create_source(device: str):
-    """OS に応じた TrackSource を返す。device は DiscInserted.device と同じ値。"""
+TREE_SUFFIXES = (".wav", ".aiff", ".aif", ".aifc", ".flac")
+
+
+@dataclass(frozen=True)
+class PcmLayout:
+    """ファイル内の PCM の位置。offset/length はバイト、mappable なら
+    CD 形式(44.1kHz/16bit/2ch/LE)そのままで、コピーせずに渡せる。"""
+    offset: int
+    length: int
+    frames: int
+    mappable: bool
+
+
+def _extended_to_float(b: bytes) -> float:
+    """AIFF の 80 bit 拡張精度浮動小数(サンプルレート)。"""
+    exponent, mantissa = struct.unpack(">HQ", b)
+    sign = -1.0 if exponent & 0x8000 else 1.0
+    exponent &= 0x7FFF
+    if exponent == 0 and mantissa == 0:
+        return 0.0
+    return sign * mantissa * 2.0 ** (exponent - 16383 - 63)
+
+
+def _is_cd_format(channels: int, rate: float, bits: int) -> bool:
+    return (channels == CD_CHANNELS and rate == CD_SAMPLE_RATE
+            and bits == 16)
+
+
+def scan_pcm_layout(path: Path) -> PcmLayout | None:
+    """WAV / AIFF(-C) のヘッダから PCM データの位置を得る。
+
+    CD 形式のリトルエンディアン PCM(WAV、AIFF-C の sowt)なら mappable。
+    ビッグエンディアンの AIFF や別形式の PCM は位置だけ返す(mappable=False)。
+    ヘッダを解釈できない(FLAC など)なら None。
+    """
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if len(head) < 12:
+            return None
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _scan_wav(f, size)
+        if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+            return _scan_aiff(f, size, compressed=head[8:12] == b"AIFC")
+    return None
+
+
+def _scan_wav(f, size: int) -> PcmLayout | None:
+    fmt = None
+    pos = 12
+    while pos + 8 <= size:
+        f.seek(pos)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+        elif chunk_id == b"data" and fmt is not None:
+            tag, channels, rate, _, block_align, bits = fmt
+            length = min(chunk_size, size - pos - 8)
+            length -= length % block_align
+            pcm = tag in (1, 0xFFFE)  # PCM / WAVE_FORMAT_EXTENSIBLE
+            return PcmLayout(
+                offset=pos + 8, length=length,
+                frames=length // block_align,
+                mappable=pcm and _is_cd_format(channels, rate, bits))
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _scan_aiff(f, size: int, compressed: bool) -> PcmLayout | None:
+    comm = None
+    pos = 12
+    while pos + 8 <= size:
+        f.seek(pos)
+        chunk_id, chunk_size = struct.unpack(">4sI", f.read(8))
+        if chunk_id == b"COMM":
+            body = f.read(chunk_size)
+            channels, frames, bits = struct.unpack(">hIh", body[:8])
+            rate = _extended_to_float(body[8:18])
+            kind = body[18:22] if compressed else b"NONE"
+            comm = (channels, frames, bits, rate, kind)
+        elif chunk_id == b"SSND" and comm is not None:
+            channels, frames, bits, rate, kind = comm
+            data_offset, = struct.unpack(">I", f.read(4))
+            offset = pos + 16 + data_offset
+            frame_bytes = channels * bits // 8
+            length = min(frames * frame_bytes, size - offset)
+            return PcmLayout(
+                offset=offset, length=length, frames=length // frame_bytes,
+                mappable=kind == b"sowt" and _is_cd_format(channels, rate,
+                                                           bits))
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+class _MmapReader:
+    """mmap したファイルの PCM 部分を memoryview のスライスで返す。
+
+    イテレータはコピーもメモリ確保もしない(ページキャッシュを直接指す)。
+    seek はオフセットを動かすだけなので即時。
+    """
+
+    def __init__(self, path: Path, layout: PcmLayout):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = memoryview(self._mm)[
+            layout.offset:layout.offset + layout.length]
+        self._pos = 0
+
+    def seek(self, frame: int) -> None:
+        self._pos = min(frame * CD_BYTES_PER_FRAME, len(self._data))
+
+    def readinto(self, buf) -> int:
+        n = min(len(buf), len(self._data) - self._pos)
+        buf[:n] = self._data[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def __iter__(self) -> Iterator[memoryview]:
+        while self._pos < len(self._data):
+            end = min(self._pos + CHUNK_BYTES, len(self._data))
+            chunk = self._data[self._pos:end]
+            self._pos = end
+            yield chunk
+
+    def close(self) -> None:
+        self._data.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # 呼び出し側がまだスライスを持っている。GC に任せる
+
+
+class _ConcatReader:
+    """複数トラックのリーダーを順につなぐ(連続読み用)。後続は必要時に開く。"""
+
+    def __init__(self, openers):
+        self._openers = list(openers)
+        self._current = None
+
+    def _advance(self) -> bool:
+        self.close()
+        if not self._openers:
+            return False
+        self._current = self._openers.pop(0)()
+        return True
+
+    def readinto(self, buf) -> int:
+        while True:
+            if self._current is not None:
+                n = self._current.readinto(buf)
+                if n:
+                    return n
+            if not self._advance():
+                return 0
+
+    def __iter__(self):
+        while self._advance():
+            yield from self._current
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+class _ClosingSoundFileReader(_SoundFileReader):
+    def close(self) -> None:
+        self._file.close()
+
+
+class _TreeEntry(NamedTuple):
+    """FileTreeSource が走査した 1 トラック分のファイル。"""
+    path: Path
+    layout: PcmLayout | None
+    frames: int
+
+
+class FileTreeSource:
+    """トラックごとのファイル(NN*.wav / .aiff / .flac)が並ぶディレクトリを読む。
+
+    リッピング済みディスクやテスト用コーパス向け。CD 形式のリトルエンディアン
+    PCM は mmap のスライスで返し(コピーなし・シーク即時)、それ以外は
+    soundfile で読む。ファイル一覧とヘッダの走査(フレーム数まで)は最初の
+    1 回だけ行う。44.1kHz ステレオでないファイルは変換せず、
+    TrackSourceError で断る。
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._entries: dict[int, _TreeEntry] | None = None
+        self._reader = None
+
+    def _scan(self) -> dict[int, _TreeEntry]:
+        if self._entries is None:
+            entries = {}
+            for p in sorted(self.root.iterdir()):
+                m = _AIFF_NUM.match(p.name)
+                if m and p.suffix.lower() in TREE_SUFFIXES and p.is_file():
+                    layout = scan_pcm_layout(p)
+                    entries[int(m.group(1))] = _TreeEntry(
+                        p, layout, self._frames(p, layout))
+            self._entries = entries
+        return self._entries
+
+    def list_tracks(self) -> list[TrackRef]:
+        entries = self._scan()
+        if not entries:
+            raise TrackSourceError(f"{self.root} に音声ファイルがありません")
+        tracks = []
+        for num in sorted(entries):
+            frames = entries[num].frames
+            sectors = None
+            if frames % CD_FRAMES_PER_SECTOR == 0:
+                sectors = frames // CD_FRAMES_PER_SECTOR
+            tracks.append(TrackRef(number=num,
+                                   duration=frames / CD_SAMPLE_RATE,
+                                   sectors=sectors))
+        return tracks
+
+    @staticmethod
+    def _frames(path: Path, layout: PcmLayout | None) -> int:
+        """path のフレーム数。CD と同じ 44.1kHz ステレオでなければ raise。"""
+        if layout is not None and layout.mappable:
+            return layout.frames
+        import soundfile as sf
+        try:
+            with sf.SoundFile(str(path)) as f:
+                rate, channels, frames = f.samplerate, f.channels, len(f)
+        except (RuntimeError, OSError) as e:
+            raise TrackSourceError(f"{path.name} を読めません: {e}") from e
+        if rate != CD_SAMPLE_RATE or channels != CD_CHANNELS:
+            raise TrackSourceError(
+                f"{path.name} は {rate} Hz / {channels} ch です"
+                f"(44.1kHz ステレオのファイルだけを再生します)")
+        return frames
+
+    def open(self, track_no: int, start_frame: int = 0) -> Iterable[bytes]:
+        self.close()
+        self._reader = self._open_track(track_no, start_frame)
+        return self._reader
+
+    def open_from(self, track_no: int,
+                  start_frame: int = 0) -> Iterable[bytes]:
+        """track_no 以降のファイルを 1 本につないで読む(ギャップレス)。"""
+        self.close()
+        numbers = [n for n in sorted(self._scan()) if n >= track_no]
+        if track_no not in numbers:
+            raise TrackSourceError(f"トラック {track_no} がありません")
+        self._reader = _ConcatReader(
+            functools.partial(self._open_track, n,
+                              start_frame if n == track_no else 0)
+            for n in numbers)
+        return self._reader
+
+    def _open_track(self, track_no: int, start_frame: int = 0):
+        entries = self._scan()
+        if track_no not in entries:
+            raise TrackSourceError(f"トラック {track_no} がありません")
+        path, layout, _ = entries[track_no]
+        if layout is not None and layout.mappable:
+            reader = _MmapReader(path, layout)
+            reader.seek(start_frame)
+            return reader
+        import soundfile as sf
+        f = sf.SoundFile(str(path))
+        if start_frame:
+            f.seek(min(start_frame, len(f)))
+        return _ClosingSoundFileReader(f)
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+READERS = ("cdparanoia", "ioctl")
+
+
+def create_source(device: str, reader: str = "cdparanoia"):
+    """OS に応じた TrackSource を返す。device は DiscInserted.device と同じ値。
+
+    ディレクトリ(リッピング済みのファイル群)なら FileTreeSource。Linux の
+    ドライブは reader で読み方を選ぶ(cdparanoia / ioctl)。
+    """
     if sys.platform == "darwin":
         return AiffFileSource(device)
-    return CdparanoiaSource(device)
+    if os.path.isdir(device):
+        return FileTreeSource(device)
+    if reader == "ioctl":
+        return IoctlCdSource(device)
+    if reader == "cdparanoia":
+        return CdparanoiaSource(device)
+    raise ValueError(f"不明な読み取り方式: {reader}({', '.join(READERS)})")
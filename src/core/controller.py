@@ -1,10 +1,11 @@
 """状態機械。すべてのイベントはここで一元処理される。
 
-process_pending() は View(Tk メインループ)から定期的に呼ばれる。
-post() はどのスレッドから呼んでもよい。
+process_pending() は View(Tk メインループ)から、post() で起こされたときと
+低頻度の定期タイマーで呼ばれる。post() はどのスレッドから呼んでもよい。
 """
 from __future__ import annotations
 
+import dataclasses
 import logging
 import os
 import queue
@@ -13,10 +14,12 @@ import sys
 import threading
 import time
 
-from src.core.events import (AppState, DiscInfo, DiscInserted, DiscRemoved,
-                             MetadataFailed, MetadataReady, NotAudioCd,
-                             PlaybackError, PlaybackFinished, TocFailed,
-                             TocReady, TrackChanged, TrackSkipped, ViewState)
+from src.core.events import (AppState, CoverReady, DiscInfo, DiscInserted,
+                             DiscRemoved, DriveSpinningUp, MetadataFailed,
+                             MetadataReady, NotAudioCd, PlaybackError,
+                             PlaybackFinished, TocFailed, TocReady,
+                             TrackChanged, TrackSkipped, ViewState)
+from src.disc.toc import disc_id_from_tracks
 
 logger = logging.getLogger(__name__)
 
@@ -27,15 +30,23 @@ def run_in_thread(fn) -> None:
     threading.Thread(target=fn, daemon=True).start()
 
 
-def default_eject() -> None:
+def default_eject(device: str | None = None) -> None:
+    """device はドライブ(複数台のとき)。省略すると既定のドライブ。"""
     cmd = ["drutil", "eject"] if sys.platform == "darwin" else ["eject"]
+    if device and sys.platform != "darwin":
+        cmd.append(device)
     subprocess.run(cmd, check=False, timeout=30)
 
 
 class AppController:
     def __init__(self, toc_reader, engine, metadata_service, source_factory,
                  run_async=run_in_thread, eject_fn=default_eject,
-                 now_fn=time.monotonic):
+                 now_fn=time.monotonic, audio_cache=None, burst_buffer=None):
+        """audio_cache を渡すとリッピングキャッシュを使う(None なら無効)。
+
+        burst_buffer を渡すと、収まるディスクは全体を RAM へ読み込んでから
+        ドライブを止めて再生する(None なら常にドライブから読みながら)。
+        """
         self._toc_reader = toc_reader
         self._engine = engine
         self._metadata = metadata_service
@@ -43,7 +54,10 @@ class AppController:
         self._run_async = run_async
         self._eject_fn = eject_fn
         self._now = now_fn
+        self._audio_cache = audio_cache
+        self._burst_buffer = burst_buffer
         self._queue: queue.Queue = queue.Queue()
+        self._wakeup = None
 
         self._state = AppState.NO_DISC
         self._generation = 0
@@ -54,11 +68,21 @@ class AppController:
         self._error: str | None = None
         self._source = None
         self._retry_at: float | None = None
+        self._resume: tuple[int, float] | None = None  # (トラック, 秒)
 
     # --- どのスレッドからでも呼べる入口 ---
 
     def post(self, event) -> None:
         self._queue.put(event)
+        if self._wakeup is not None:
+            self._wakeup()
+
+    def set_wakeup(self, fn) -> None:
+        """post のたびに fn() を呼ぶ。View がメインループを起こすのに使う。
+
+        fn はどのスレッドから呼ばれてもよく、すぐ返ること。
+        """
+        self._wakeup = fn
 
     # --- View(Tk メインループ)から定期的に呼ぶ ---
 
@@ -97,7 +121,9 @@ class AppController:
     # --- イベント処理 ---
 
     def _handle(self, event) -> None:
-        if isinstance(event, DiscInserted):
+        if isinstance(event, DriveSpinningUp):
+            self._on_spinning_up(event.device)
+        elif isinstance(event, DiscInserted):
             self._on_inserted(event.device)
         elif isinstance(event, DiscRemoved):
             self._engine.stop()
@@ -114,6 +140,7 @@ class AppController:
         elif isinstance(event, TocFailed):
             if (event.generation == self._generation
                     and self._state is AppState.READING):
+                self._engine.stop()  # 投機的な準備を捨てる
                 self._state = AppState.ERROR
                 self._error = "このディスクを読み取れません"
         elif isinstance(event, TrackChanged):
@@ -126,6 +153,12 @@ class AppController:
                 self._state = AppState.FINISHED
         elif isinstance(event, PlaybackError):
             if self._state is AppState.PLAYING:
+                if (self._track_number is not None
+                        and self._engine.played_audio):
+                    # 再試行では止まった位置から再開する(このディスクを
+                    # 実際に鳴らしていた場合だけ)
+                    self._resume = (self._track_number,
+                                    self._engine.position_seconds)
                 self._engine.stop()
                 self._state = AppState.ERROR
                 self._error = event.message
@@ -134,16 +167,37 @@ class AppController:
         elif isinstance(event, MetadataReady):
             if event.generation == self._generation and self._disc is not None:
                 self._album = event.album
+        elif isinstance(event, CoverReady):
+            if (event.generation == self._generation
+                    and self._album is not None):
+                self._album = dataclasses.replace(
+                    self._album, cover_path=event.cover_path)
         elif isinstance(event, MetadataFailed):
             logger.info("メタデータ取得失敗(再生には影響なし): %s",
                         event.message)
 
+    def _on_spinning_up(self, device: str) -> None:
+        # 再生中のディスクがあるなら、それが抜けた知らせを待つ
+        if self._state not in (AppState.NO_DISC, AppState.ERROR):
+            return
+        self._engine.stop()
+        self._reset()
+        self._device = device
+        self._state = AppState.READING
+        # DISC_OK までの 15〜30 秒のうちに出力を開いておく
+        warm_output = getattr(self._engine, "warm_output", None)
+        if warm_output is not None:
+            warm_output()
+
     def _on_inserted(self, device: str) -> None:
         self._engine.stop()
         self._reset()
         self._device = device
         self._state = AppState.READING
         self._source = self._source_factory(device)
+        # ドライブの立ち上がり待ちを TOC の読み取りと重ねるため、出力と
+        # 1 曲目の読み取りを先に始めておく。TocReady で採用、外れたら捨てる
+        self._engine.prepare(self._source)
         gen = self._generation
         source = self._source
         reader = self._toc_reader
@@ -155,7 +209,9 @@ class AppController:
                 logger.warning("TOC 読み取り失敗(%s)。ソースに切替", e)
                 try:
                     tracks = tuple(source.list_tracks())
-                    disc = DiscInfo(disc_id=None, tracks=tracks)
+                    # cdparanoia -Q の位置が分かれば DiscID も求まる
+                    disc = DiscInfo(disc_id=disc_id_from_tracks(tracks),
+                                    tracks=tracks)
                 except Exception as e2:
                     self.post(TocFailed(str(e2), generation=gen))
                     return
@@ -165,6 +221,13 @@ class AppController:
 
     def _on_toc(self, disc: DiscInfo) -> None:
         self._disc = disc
+        if disc.disc_id and hasattr(self._source, "use_disc"):
+            # 前回このディスクで上げた読み取りモードから始める
+            self._source.use_disc(disc.disc_id)
+        if self._burst_buffer is not None:
+            self._source = self._burst_buffer.wrap(self._source, disc.tracks)
+        if self._audio_cache is not None and disc.disc_id:
+            self._use_audio_cache(disc)
         self._start_playback()
         if disc.disc_id:
             gen = self._generation
@@ -180,8 +243,18 @@ class AppController:
                     return
                 if album is None:
                     self.post(MetadataFailed("not found", generation=gen))
-                else:
-                    self.post(MetadataReady(album, generation=gen))
+                    return
+                # 曲名はカバーを待たずに出す
+                self.post(MetadataReady(album, generation=gen))
+                get_cover = getattr(service, "get_cover", None)
+                if album.cover_path is None and get_cover is not None:
+                    try:
+                        cover = get_cover(disc_id)
+                    except Exception:
+                        logger.exception("カバーアートの取得に失敗")
+                        return
+                    if cover is not None:
+                        self.post(CoverReady(cover, generation=gen))
 
             self._run_async(job)
 
@@ -192,7 +265,40 @@ class AppController:
         self._retry_at = None
         numbers = [t.number for t in disc.tracks]
         self._track_number = numbers[0] if numbers else None
-        self._engine.play(self._source, numbers)
+        start, self._resume = self._resume, None
+        if start is not None:
+            self._track_number = start[0]
+        self._engine.play(self._source, numbers,
+                          track_sectors=[t.sectors for t in disc.tracks],
+                          start=start)
+
+    def _use_audio_cache(self, disc: DiscInfo) -> None:
+        """リッピング済みならキャッシュから、未完ならドライブから読みつつ保存。"""
+        cache = self._audio_cache
+        if any(not t.sectors for t in disc.tracks):
+            return  # トラック長が分からないと完成を判定できない
+        try:
+            cache.touch(disc.disc_id)
+            if cache.is_complete(disc.disc_id, disc.tracks):
+                logger.info("リッピング済み: %s。キャッシュから再生します",
+                            disc.disc_id)
+                self._source.close()
+                self._source = cache.source(disc.disc_id)
+            else:
+                self._source = cache.wrap(self._source, disc.disc_id,
+                                          disc.tracks)
+        except OSError:
+            logger.exception("リッピングキャッシュを使えません")
+            return
+        disc_id = disc.disc_id
+
+        def job():
+            try:
+                cache.enforce_budget(keep=disc_id)
+            except OSError:
+                logger.exception("リッピングキャッシュの整理に失敗")
+
+        self._run_async(job)
 
     def _maybe_retry(self) -> None:
         if (self._retry_at is not None and self._state is AppState.ERROR
@@ -214,6 +320,7 @@ class AppController:
         self._track_number = None
         self._error = None
         self._retry_at = None
+        self._resume = None
         if self._source is not None:
             try:
                 self._source.close()
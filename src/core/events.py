@@ -17,6 +17,8 @@ class AppState(Enum):
 class TrackRef:
     number: int
     duration: float | None = None  # 秒。不明なら None
+    sectors: int | None = None  # 長さ(1/75 秒単位)。TOC から分かる場合のみ
+    start: int | None = None  # 先頭 LBA。TOC から分かる場合のみ
 
 
 @dataclass(frozen=True)
@@ -46,6 +48,15 @@ class DiscInserted:
     device: str  # Linux: /dev/sr0, macOS: /Volumes/<名前>
 
 
+@dataclass(frozen=True)
+class DriveSpinningUp:
+    """トレイが閉じ、ドライブがディスクを読める状態へ向かっている。
+
+    この後 DiscInserted / NotAudioCd、ディスクがなければ DiscRemoved が来る。
+    """
+    device: str
+
+
 @dataclass(frozen=True)
 class DiscRemoved:
     device: str
@@ -94,6 +105,13 @@ class MetadataReady:
     generation: int = 0
 
 
+@dataclass(frozen=True)
+class CoverReady:
+    """MetadataReady の後から届くカバー。"""
+    cover_path: str
+    generation: int = 0
+
+
 @dataclass(frozen=True)
 class MetadataFailed:
     message: str
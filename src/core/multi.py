@@ -0,0 +1,96 @@
+"""複数ドライブ。ドライブごとに独立した再生パイプラインを持つ。
+
+パイプラインは AppController + PlaybackEngine + 出力デバイスの組で、互いに
+状態を共有しない。ここはディスク検知のイベントをドライブ別に振り分け、
+View には表示中のドライブの ViewState を渡すだけ。
+
+資源はドライブ 1 台あたり一定で、台数に比例して増える:
+- スレッド: 再生中は再生と先読みの 2 本。blocking 出力は無音を流す 1 本を
+  常時持つ。ディスク検知は全ドライブで 1 本
+- メモリ: 先読みリング(prefetch_ceiling_bytes まで)と、RAM 読み込みを
+  有効にしていればその上限(--burst-mb)
+"""
+from __future__ import annotations
+
+import logging
+
+from src.core.events import AppState, DiscInserted, ViewState
+
+logger = logging.getLogger(__name__)
+
+
+class MultiDriveController:
+    """AppController と同じ入口(post / process_pending / 操作)を持つ。"""
+
+    def __init__(self, pipelines: dict):
+        """pipelines はドライブ(DiscInserted.device と同じ値)→ AppController。"""
+        if not pipelines:
+            raise ValueError("ドライブがありません")
+        self._pipelines = dict(pipelines)
+        self._order = list(self._pipelines)
+        self._active = self._order[0]  # 画面に出すドライブ
+
+    @property
+    def devices(self) -> list[str]:
+        return list(self._order)
+
+    @property
+    def active_device(self) -> str:
+        return self._active
+
+    def post(self, event) -> None:
+        """ディスク検知のイベントはドライブで、それ以外は表示中へ送る。
+
+        エンジンやジョブのイベントは各パイプラインが自分の
+        AppController へ直接送るので、ここを通らない。
+        """
+        device = self._route(getattr(event, "device", self._active))
+        if device is None:
+            logger.warning("管理していないドライブのイベントを無視: %s", event)
+            return
+        if isinstance(event, DiscInserted):
+            self._active = device  # 最後に入れたディスクを表示する
+        self._pipelines[device].post(event)
+
+    def _route(self, device: str) -> str | None:
+        if device in self._pipelines:
+            return device
+        if len(self._order) == 1:
+            return self._order[0]  # macOS の /Volumes/<名前> など
+        return None
+
+    def process_pending(self) -> ViewState:
+        states = {d: c.process_pending() for d, c in self._pipelines.items()}
+        if states[self._active].state is AppState.NO_DISC:
+            # 表示中のドライブが空になったら、ディスクのある別のドライブへ
+            for device in self._order:
+                if states[device].state is not AppState.NO_DISC:
+                    self._active = device
+                    break
+        return states[self._active]
+
+    def set_wakeup(self, fn) -> None:
+        """エンジンは各パイプラインへ直接 post するので、全部に配る。"""
+        for controller in self._pipelines.values():
+            if hasattr(controller, "set_wakeup"):
+                controller.set_wakeup(fn)
+
+    def next_drive(self) -> None:
+        """表示・操作の対象を次のドライブへ。"""
+        i = self._order.index(self._active)
+        self._active = self._order[(i + 1) % len(self._order)]
+        logger.info("表示するドライブ: %s", self._active)
+
+    # --- View からの操作は表示中のドライブへ ---
+
+    def toggle_pause(self) -> None:
+        self._pipelines[self._active].toggle_pause()
+
+    def next_track(self) -> None:
+        self._pipelines[self._active].next_track()
+
+    def prev_track(self) -> None:
+        self._pipelines[self._active].prev_track()
+
+    def eject(self) -> None:
+        self._pipelines[self._active].eject()
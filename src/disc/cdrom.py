@@ -0,0 +1,161 @@
+"""Linux の CD-ROM ioctl(linux/cdrom.h)を直接叩く薄い層。
+
+cdparanoia や libdiscid を介さずに TOC と CD-DA セクタを読む。ioctl の
+呼び出し口は差し替えられるので、テストではファイルを CD に見立てた
+フェイクを渡す(tests/support.py の FakeCdromIoctl)。
+"""
+from __future__ import annotations
+
+import ctypes
+import os
+from dataclasses import dataclass
+
+# linux/cdrom.h の定数
+CDROMREADTOCHDR = 0x5305
+CDROMREADTOCENTRY = 0x5306
+CDROMSTOP = 0x5307          # モーターを止める(次の読み取りで自動的に回る)
+CDROMREADAUDIO = 0x530E
+CDROM_SELECT_SPEED = 0x5322  # 引数は倍速(0 = ドライブの最高速)
+CDROM_LBA = 0x01
+CDROM_LEADOUT = 0xAA
+CDROM_DATA_TRACK = 0x04   # ctrl のビット
+CD_FRAMESIZE_RAW = 2352   # CD-DA 1 セクタ(588 フレーム × 4 バイト)
+CD_MAX_READ_SECTORS = 75  # CDROMREADAUDIO 1 回の上限(カーネルが弾く)
+CD_EXTRA_GAP = 11400      # マルチセッション(CD-Extra)のセッション間ギャップ
+
+
+class CdromAddr(ctypes.Union):
+    _fields_ = [("lba", ctypes.c_int), ("msf", ctypes.c_uint8 * 3)]
+
+
+class CdromTocHdr(ctypes.Structure):
+    _fields_ = [("trk0", ctypes.c_uint8), ("trk1", ctypes.c_uint8)]
+
+
+class CdromTocEntry(ctypes.Structure):
+    _fields_ = [("track", ctypes.c_uint8),
+                ("adr_ctrl", ctypes.c_uint8),  # 下位 4 ビット adr、上位 ctrl
+                ("format", ctypes.c_uint8),
+                ("addr", CdromAddr),
+                ("datamode", ctypes.c_uint8)]
+
+
+class CdromReadAudio(ctypes.Structure):
+    _fields_ = [("addr", CdromAddr),
+                ("addr_format", ctypes.c_uint8),
+                ("nframes", ctypes.c_int),
+                ("buf", ctypes.c_void_p)]
+
+
+@dataclass(frozen=True)
+class CdTrack:
+    number: int
+    start: int   # LBA
+    audio: bool
+
+
+@dataclass(frozen=True)
+class CdToc:
+    tracks: tuple[CdTrack, ...]
+    leadout: int  # LBA
+
+    def track_end(self, number: int) -> int:
+        """トラックの終端 LBA(含まない)。
+
+        直後がデータトラック(CD-Extra)なら、セッション間ギャップの手前まで。
+        """
+        for i, t in enumerate(self.tracks):
+            if t.number != number:
+                continue
+            if i + 1 == len(self.tracks):
+                return self.leadout
+            nxt = self.tracks[i + 1]
+            if t.audio and not nxt.audio:
+                return nxt.start - CD_EXTRA_GAP
+            return nxt.start
+        raise KeyError(number)
+
+    def audio_tracks(self) -> list[CdTrack]:
+        return [t for t in self.tracks if t.audio]
+
+
+def _default_ioctl(fd, request, arg):
+    import fcntl
+    if isinstance(arg, int):
+        return fcntl.ioctl(fd, request, arg)
+    return fcntl.ioctl(fd, request, arg, True)
+
+
+class CdromDevice:
+    """開いたままのドライブ 1 台。読み取りのたびに開き直さない。"""
+
+    def __init__(self, path: str, ioctl=None):
+        """ioctl(fd, request, arg) は fcntl.ioctl 互換(テスト用の差し替え口)。"""
+        self.path = path
+        self._ioctl = ioctl or _default_ioctl
+        self._fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+    @property
+    def closed(self) -> bool:
+        return self._fd < 0
+
+    def read_toc(self) -> CdToc:
+        hdr = CdromTocHdr()
+        self._call(CDROMREADTOCHDR, hdr)
+        tracks = []
+        for n in range(hdr.trk0, hdr.trk1 + 1):
+            entry = self._toc_entry(n)
+            tracks.append(CdTrack(
+                number=n, start=entry.addr.lba,
+                audio=not (entry.adr_ctrl >> 4) & CDROM_DATA_TRACK))
+        leadout = self._toc_entry(CDROM_LEADOUT).addr.lba
+        return CdToc(tracks=tuple(tracks), leadout=leadout)
+
+    def _toc_entry(self, number: int) -> CdromTocEntry:
+        entry = CdromTocEntry(track=number, format=CDROM_LBA)
+        self._call(CDROMREADTOCENTRY, entry)
+        return entry
+
+    def read_audio(self, lba: int, sectors: int, buf) -> None:
+        """lba から sectors セクタ分の CD-DA を buf(書き込み可能)へ読む。
+
+        buf の先頭 sectors * CD_FRAMESIZE_RAW バイトに直接書かれる。
+        """
+        if not 0 < sectors <= CD_MAX_READ_SECTORS:
+            raise ValueError(f"一度に読めるのは 1〜{CD_MAX_READ_SECTORS} セクタ")
+        size = sectors * CD_FRAMESIZE_RAW
+        if len(buf) < size:
+            raise ValueError("バッファが足りません")
+        target = (ctypes.c_char * size).from_buffer(buf)
+        try:
+            ra = CdromReadAudio(addr_format=CDROM_LBA, nframes=sectors,
+                                buf=ctypes.addressof(target))
+            ra.addr.lba = lba
+            self._call(CDROMREADAUDIO, ra)
+        finally:
+            del target  # buf のエクスポートを解く
+
+    def select_speed(self, speed: int) -> None:
+        """読み取り速度を倍速で指定する(0 = 最高速)。"""
+        self._call(CDROM_SELECT_SPEED, speed)
+
+    def keep_spinning(self) -> None:
+        """先頭のオーディオセクタを 1 つ読む。止まりかけたドライブを回し続ける。"""
+        tracks = self.read_toc().audio_tracks()
+        if not tracks:
+            raise OSError(f"{self.path}: オーディオトラックがありません")
+        self.read_audio(tracks[0].start, 1, bytearray(CD_FRAMESIZE_RAW))
+
+    def stop_motor(self) -> None:
+        """ディスクの回転を止める。読み終えたあとの騒音・電力を抑える。"""
+        self._call(CDROMSTOP, 0)
+
+    def _call(self, request: int, arg) -> None:
+        if self.closed:
+            raise OSError(f"{self.path} は閉じられています")
+        self._ioctl(self._fd, request, arg)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
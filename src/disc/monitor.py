@@ -1,13 +1,25 @@
-"""ディスク検知(OS 別)。専用スレッドで 2 秒間隔ポーリング。"""
+"""ディスク検知(OS 別)。専用スレッドで 1 本。
+
+Linux はカーネルの uevent(netlink)でメディアの変化を待ち、届いたときだけ
+ioctl で状態を確かめる。netlink が使えなければポーリングに戻る。間隔は
+ドライブの状態に合わせ、立ち上がり中だけ短くする。
+ドライブが何台あってもスレッドは 1 本で、全ドライブを見る。
+"""
 from __future__ import annotations
 
+import glob
 import logging
 import os
+import re
+import select
+import socket
 import sys
 import threading
+import time
 from pathlib import Path
 
-from src.core.events import DiscInserted, DiscRemoved, NotAudioCd
+from src.core.events import (DiscInserted, DiscRemoved, DriveSpinningUp,
+                             NotAudioCd)
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +27,33 @@ logger = logging.getLogger(__name__)
 CDROM_DRIVE_STATUS = 0x5326
 CDROM_DISC_STATUS = 0x5327
 CDS_NO_DISC = 1
+CDS_TRAY_OPEN = 2
+CDS_DRIVE_NOT_READY = 3
 CDS_DISC_OK = 4
 CDS_AUDIO = 100
 CDS_MIXED = 105
 
+# linux/netlink.h。グループ 1 はカーネル自身が送る uevent
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+SETTLE_INTERVAL = 0.5       # uevent のあと状態が落ち着くまで確かめ直す間隔
+MEDIA_SETTLE_SECONDS = 60.0  # 挿入後、ドライブが DISC_OK になるまでの上限
+EJECT_SETTLE_SECONDS = 5.0   # 取り出しボタンのあと、トレイが開くまでの上限
+
+# ポーリングの間隔。トレイを閉じてから DISC_OK までの 15〜30 秒だけ短くする。
+# linux/cdrom.h に「閉じている途中」の状態はなく、閉じ終わると NOT_READY になる
+FAST_POLL_SECONDS = 0.2       # NOT_READY(立ち上がり中)
+TRAY_OPEN_POLL_SECONDS = 0.5  # トレイが開いている(閉じればすぐ NOT_READY)
+RELEASE_SECONDS = 3.0         # 取り出しのためにデバイスを手放している時間
+
+
+def discover_drives(pattern: str = "/dev/sr*") -> list[str]:
+    """光学ドライブのデバイス一覧(/dev/sr0, /dev/sr1, ... の番号順)。"""
+    def number(path):
+        m = re.search(r"(\d+)$", path)
+        return int(m.group(1)) if m else -1
+    return sorted(glob.glob(pattern), key=lambda p: (number(p), p))
+
 
 class BaseMonitor:
     def __init__(self, post_event, interval: float = 2.0):
@@ -47,41 +82,256 @@ class BaseMonitor:
 
 
 class LinuxDiscMonitor(BaseMonitor):
-    """ioctl(CDROM_DRIVE_STATUS) でメディアの有無を正確に判定する。"""
+    """ioctl(CDROM_DRIVE_STATUS) でメディアの有無を正確に判定する。
+
+    devices を渡すと、その全ドライブを 1 本のスレッドで順に見る。
+    間隔はドライブごとに決める: 立ち上がり中(NOT_READY)は fast_interval、
+    ディスクなし・再生中は interval。デバイスは開いたまま使い回す。
+    status_fn(device) は (drive_status, disc_status) を返す(テスト用)。
+    """
 
     def __init__(self, post_event, device: str = "/dev/sr0",
-                 interval: float = 2.0, status_fn=None):
+                 interval: float = 2.0, status_fn=None,
+                 devices: list[str] | None = None,
+                 fast_interval: float = FAST_POLL_SECONDS):
         super().__init__(post_event, interval)
-        self.device = device
+        self.devices = list(devices or [device])
+        self.device = self.devices[0]
+        self._fast_interval = fast_interval
         self._status_fn = status_fn or self._read_status
-        self._had_disc = False
+        self._had_disc = dict.fromkeys(self.devices, False)
+        self._spinning: dict[str, float] = {}  # 立ち上がりを知らせた時刻
+        self._fds: dict[str, int] = {}
+        self._released: dict[str, float] = {}  # 手放している期限
+        self._fd_lock = threading.Lock()
+
+    def _loop(self) -> None:
+        due = dict.fromkeys(self.devices, 0.0)
+        try:
+            while not self._stop_flag.is_set():
+                for device in self.devices:
+                    if due[device] <= time.monotonic():
+                        due[device] = time.monotonic() + self._poll(device)
+                self._stop_flag.wait(
+                    max(0.0, min(due.values()) - time.monotonic()))
+        finally:
+            self._close_all()
 
     def poll_once(self) -> None:
-        drive_status, disc_status = self._status_fn()
+        for device in self.devices:
+            self._poll(device)
+
+    def _poll(self, device: str) -> float:
+        """1 台を確かめ、次に確かめるまでの秒数を返す。"""
+        try:
+            drive_status = self._poll_device(device)
+        except Exception:
+            # 1 台の失敗(抜かれた USB ドライブ等)で他を止めない
+            logger.exception("ディスク検知に失敗: %s", device)
+            return self._interval
+        return self.next_interval(device, drive_status)
+
+    def next_interval(self, device: str, drive_status: int | None) -> float:
+        if drive_status is None:  # 手放している
+            return max(self._released.get(device, 0.0) - time.monotonic(),
+                       self._fast_interval)
+        if drive_status == CDS_DRIVE_NOT_READY and device in self._spinning:
+            # 立ち上がらないまま止まったドライブを速く叩き続けない
+            spun = time.monotonic() - self._spinning[device]
+            if spun < MEDIA_SETTLE_SECONDS:
+                return self._fast_interval
+        if drive_status == CDS_TRAY_OPEN:
+            return min(TRAY_OPEN_POLL_SECONDS, self._interval)
+        return self._interval
+
+    def _poll_device(self, device: str) -> int | None:
+        """状態を確かめ、変化があればイベントを送る。drive_status を返す。
+
+        取り出しのためにデバイスを手放している間は確かめず None。
+        """
+        if self._released.get(device, 0.0) > time.monotonic():
+            return None
+        drive_status, disc_status = self._status_fn(device)
         has_disc = drive_status == CDS_DISC_OK
-        if has_disc and not self._had_disc:
+        if has_disc and not self._had_disc[device]:
             if disc_status in (CDS_AUDIO, CDS_MIXED):
-                logger.info("オーディオ CD 挿入: %s", self.device)
-                self._post(DiscInserted(self.device))
+                logger.info("オーディオ CD 挿入: %s", device)
+                self._post(DiscInserted(device))
             else:
-                logger.info("非オーディオディスク挿入: %s", self.device)
-                self._post(NotAudioCd(self.device))
-        elif not has_disc and self._had_disc:
-            logger.info("ディスク取り出し: %s", self.device)
-            self._post(DiscRemoved(self.device))
-        self._had_disc = has_disc
-
-    def _read_status(self) -> tuple[int, int]:
+                logger.info("非オーディオディスク挿入: %s", device)
+                self._post(NotAudioCd(device))
+        elif not has_disc and self._had_disc[device]:
+            logger.info("ディスク取り出し: %s", device)
+            self._post(DiscRemoved(device))
+        elif (drive_status == CDS_DRIVE_NOT_READY
+              and device not in self._spinning):
+            logger.info("ドライブの立ち上がり中: %s", device)
+            self._spinning[device] = time.monotonic()
+            self._post(DriveSpinningUp(device))
+        elif drive_status != CDS_DRIVE_NOT_READY and device in self._spinning:
+            if not has_disc:
+                # 空のトレイを閉じた等。立ち上がりの知らせを取り消す
+                logger.info("ディスクは見つかりませんでした: %s", device)
+                self._post(DiscRemoved(device))
+        if drive_status != CDS_DRIVE_NOT_READY:
+            self._spinning.pop(device, None)
+        self._had_disc[device] = has_disc
+        return drive_status
+
+    def release(self, device: str, seconds: float = RELEASE_SECONDS) -> None:
+        """取り出しの前に呼ぶ。しばらくデバイスを開かない。
+
+        カーネルは他に開いている者がいると取り出し(CDROMEJECT)を断る。
+        どのスレッドから呼んでもよい。
+        """
+        with self._fd_lock:
+            self._released[device] = time.monotonic() + seconds
+            fd = self._fds.pop(device, None)
+            if fd is not None:
+                os.close(fd)
+
+    def _read_status(self, device: str) -> tuple[int, int]:
         import fcntl
-        fd = os.open(self.device, os.O_RDONLY | os.O_NONBLOCK)
+        with self._fd_lock:
+            fd = self._fds.get(device)
+            if fd is None:
+                fd = os.open(device, os.O_RDONLY | os.O_NONBLOCK)
+                self._fds[device] = fd
+            try:
+                drive_status = fcntl.ioctl(fd, CDROM_DRIVE_STATUS, 0)
+                disc_status = -1
+                if drive_status == CDS_DISC_OK:
+                    disc_status = fcntl.ioctl(fd, CDROM_DISC_STATUS, 0)
+                return drive_status, disc_status
+            except OSError:
+                # 抜かれたドライブの fd は使えない。次は開き直す
+                del self._fds[device]
+                os.close(fd)
+                raise
+
+    def _close_all(self) -> None:
+        with self._fd_lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+
+def parse_uevent(data: bytes) -> dict[str, str]:
+    """カーネルの uevent(`action@devpath\0KEY=VALUE\0...`)を辞書にする。"""
+    env = {}
+    for field in data.split(b"\0")[1:]:
+        key, sep, value = field.partition(b"=")
+        if sep:
+            env[key.decode("ascii", "replace")] = value.decode("utf-8",
+                                                              "replace")
+    return env
+
+
+def open_uevent_socket() -> socket.socket:
+    """uevent を受ける netlink ソケット。使えない環境では OSError。"""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                         NETLINK_KOBJECT_UEVENT)
+    try:
+        sock.bind((0, UEVENT_KERNEL_GROUP))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class UeventDiscMonitor(LinuxDiscMonitor):
+    """uevent の DISK_MEDIA_CHANGE / DISK_EJECT_REQUEST で即座に反応する。
+
+    何も起きていない間はソケットで眠り、ドライブにも CPU にも触れない。
+    ioctl は uevent が届いたドライブの状態(音楽 CD かどうか)を見るためだけに
+    使う。挿入直後のドライブはしばらく NOT_READY なので、落ち着くまで
+    SETTLE_INTERVAL で確かめ直す。sock は受信できるソケット(テスト用)。
+    ソケットと stop を知らせるパイプは、監視のスレッドが終わるときに閉じる。
+    """
+
+    def __init__(self, post_event, device: str = "/dev/sr0",
+                 status_fn=None, devices: list[str] | None = None,
+                 sock=None):
+        super().__init__(post_event, device=device, status_fn=status_fn,
+                         devices=devices)
+        self._sock = sock
+        self._settling: dict[str, tuple[float, bool]] = {}  # 期限, 取り出し
+        self._wake_lock = threading.Lock()
+        self._wake_r: int | None = None
+        self._wake_w: int | None = None
+
+    def start(self) -> None:
+        if self._sock is None:
+            self._sock = open_uevent_socket()
+        self._wake_r, self._wake_w = os.pipe()
+        super().start()
+
+    def stop(self) -> None:
+        """始めていない・もう終わった監視に呼んでもよい。"""
+        super().stop()
+        with self._wake_lock:
+            if self._wake_w is not None:
+                os.write(self._wake_w, b"\0")
+
+    def _loop(self) -> None:
         try:
-            drive_status = fcntl.ioctl(fd, CDROM_DRIVE_STATUS, 0)
-            disc_status = -1
-            if drive_status == CDS_DISC_OK:
-                disc_status = fcntl.ioctl(fd, CDROM_DISC_STATUS, 0)
-            return drive_status, disc_status
+            self.poll_once()  # 起動前から入っているディスク
+            while not self._stop_flag.is_set():
+                timeout = SETTLE_INTERVAL if self._settling else None
+                ready, _, _ = select.select([self._sock, self._wake_r], [], [],
+                                            timeout)
+                if self._sock in ready:
+                    try:
+                        self.handle_uevent(self._sock.recv(8192))
+                    except Exception:
+                        logger.exception("uevent の処理に失敗")
+                self._settle()
         finally:
-            os.close(fd)
+            self._close_all()
+            self._sock.close()
+            with self._wake_lock:
+                os.close(self._wake_r)
+                os.close(self._wake_w)
+                self._wake_r = self._wake_w = None
+
+    def handle_uevent(self, data: bytes) -> None:
+        env = parse_uevent(data)
+        if env.get("SUBSYSTEM") != "block":
+            return
+        device = "/dev/" + env.get("DEVNAME", "")
+        if device not in self._had_disc:
+            return
+        eject = env.get("DISK_EJECT_REQUEST") == "1"
+        if not eject and env.get("DISK_MEDIA_CHANGE") != "1":
+            return
+        limit = EJECT_SETTLE_SECONDS if eject else MEDIA_SETTLE_SECONDS
+        self._settling[device] = (time.monotonic() + limit, eject)
+        self._check(device)
+
+    def _settle(self) -> None:
+        now = time.monotonic()
+        for device, (deadline, _) in list(self._settling.items()):
+            if now >= deadline:
+                del self._settling[device]
+            else:
+                self._check(device)
+
+    def _check(self, device: str) -> None:
+        try:
+            drive_status = self._poll_device(device)
+        except Exception:
+            logger.exception("ディスク検知に失敗: %s", device)
+            return
+        _, eject = self._settling.get(device, (0.0, False))
+        if drive_status is None:
+            settled = False  # 取り出しのために手放している
+        elif eject:
+            settled = drive_status != CDS_DISC_OK  # トレイが開いた
+        else:
+            settled = drive_status in (CDS_NO_DISC, CDS_TRAY_OPEN,
+                                       CDS_DISC_OK)
+        if settled:
+            self._settling.pop(device, None)
 
 
 class MacDiscMonitor(BaseMonitor):
@@ -109,11 +359,22 @@ class MacDiscMonitor(BaseMonitor):
 
 
 def create_monitor(post_event, device: str | None = None,
-                   interval: float = 2.0):
-    """OS に応じた DiscMonitor を返すファクトリ。"""
+                   interval: float = 2.0, devices: list[str] | None = None):
+    """OS に応じた DiscMonitor を返すファクトリ。
+
+    Linux で device も devices も渡さなければ /dev/sr* をすべて見る。
+    """
     if sys.platform == "darwin":
         return MacDiscMonitor(post_event, interval=interval)
     if sys.platform.startswith("linux"):
-        return LinuxDiscMonitor(post_event, device=device or "/dev/sr0",
-                                interval=interval)
+        if devices is None:
+            devices = [device] if device else discover_drives() or ["/dev/sr0"]
+        try:
+            sock = open_uevent_socket()
+        except OSError as e:
+            logger.warning("uevent を受けられません(%s)。%.0f 秒間隔の"
+                           "ポーリングで検知します", e, interval)
+            return LinuxDiscMonitor(post_event, devices=devices,
+                                    interval=interval)
+        return UeventDiscMonitor(post_event, devices=devices, sock=sock)
     raise NotImplementedError(f"Unsupported platform: {sys.platform}")
@@ -1,15 +1,27 @@
-"""discid による TOC(DiscID・トラック数・トラック長)の読み取り。"""
+"""TOC(DiscID・トラック数・トラック長)の読み取り。
+
+Linux は ioctl で TOC を 1 回読み、MusicBrainz の DiscID もここで計算する。
+macOS は libdiscid(discid)を使う。
+"""
 from __future__ import annotations
 
+import base64
+import hashlib
 import logging
 import subprocess
 import sys
 import time
+from dataclasses import dataclass
 
 from src.core.events import DiscInfo, TrackRef
+from src.disc.cdrom import CdromDevice
 
 logger = logging.getLogger(__name__)
 
+# MusicBrainz の位置は先頭 2 秒のプリギャップ(150 セクタ)を含めて数える
+PREGAP_SECTORS = 150
+_MB_BASE64 = str.maketrans("+/=", "._-")
+
 
 class TocError(Exception):
     """リトライしても TOC を読めなかった。"""
@@ -24,11 +36,84 @@ def resolve_mac_raw_device(mount_path: str, mount_output: str) -> str | None:
     return None
 
 
+def musicbrainz_disc_id(first: int, last: int, leadout: int,
+                        offsets: list[int]) -> str:
+    """MusicBrainz の DiscID。leadout と offsets はプリギャップ込みのセクタ位置。
+
+    SHA-1 に先頭・最終トラック番号(%02X)、リードアウトと 99 トラック分の
+    位置(%08X、ないトラックは 0)を通し、URL で使える base64 にする。
+    """
+    sha = hashlib.sha1(b"%02X%02X%08X" % (first, last, leadout))
+    for i in range(99):
+        sha.update(b"%08X" % (offsets[i] if i < len(offsets) else 0))
+    return base64.b64encode(sha.digest()).decode("ascii").translate(_MB_BASE64)
+
+
+def disc_id_from_tracks(tracks) -> str | None:
+    """先頭 LBA と長さの分かるトラック列(TrackRef)から DiscID を求める。
+
+    cdparanoia -Q のようにオーディオトラックしか分からない場合に使う。
+    どれかのトラックの位置か長さが分からなければ None。
+    """
+    tracks = list(tracks)
+    if not tracks or any(t.start is None or not t.sectors for t in tracks):
+        return None
+    last = tracks[-1]
+    return musicbrainz_disc_id(
+        tracks[0].number, last.number,
+        last.start + last.sectors + PREGAP_SECTORS,
+        [t.start + PREGAP_SECTORS for t in tracks])
+
+
+@dataclass(frozen=True)
+class TocTrack:
+    number: int
+    offset: int   # プリギャップ込みの先頭位置(discid.Track と同じ)
+    sectors: int
+
+
+@dataclass(frozen=True)
+class TocDisc:
+    id: str
+    tracks: tuple[TocTrack, ...]  # オーディオトラックのみ
+
+
+def read_disc(device: str = "/dev/sr0", open_device=CdromDevice) -> TocDisc:
+    """ioctl(CDROMREADTOCHDR / CDROMREADTOCENTRY)で TOC を 1 回読む。
+
+    discid.read と同じ形(id, tracks)を返す。CD-Extra の末尾のデータ
+    トラックは MusicBrainz と同じく除き、リードアウトをセッション間
+    ギャップの手前に置く。
+    """
+    drive = open_device(device)
+    try:
+        toc = drive.read_toc()
+    finally:
+        drive.close()
+    entries = list(toc.tracks)
+    while len(entries) > 1 and not entries[-1].audio:
+        entries.pop()
+    if not entries:
+        raise OSError(f"{device}: トラックがありません")
+    leadout = toc.track_end(entries[-1].number)
+    disc_id = musicbrainz_disc_id(
+        entries[0].number, entries[-1].number, leadout + PREGAP_SECTORS,
+        [t.start + PREGAP_SECTORS for t in entries])
+    tracks = tuple(
+        TocTrack(number=t.number, offset=t.start + PREGAP_SECTORS,
+                 sectors=toc.track_end(t.number) - t.start)
+        for t in toc.audio_tracks())
+    return TocDisc(id=disc_id, tracks=tracks)
+
+
 class TocReader:
     def __init__(self, read_fn=None, sleep_fn=time.sleep, attempts: int = 3):
         if read_fn is None:
-            import discid
-            read_fn = discid.read
+            if sys.platform.startswith("linux"):
+                read_fn = read_disc
+            else:
+                import discid
+                read_fn = discid.read
         self._read_fn = read_fn
         self._sleep = sleep_fn
         self._attempts = attempts
@@ -41,7 +126,8 @@ class TocReader:
             try:
                 disc = self._read_fn(target) if target else self._read_fn()
                 tracks = tuple(
-                    TrackRef(number=t.number, duration=t.sectors / 75.0)
+                    TrackRef(number=t.number, duration=t.sectors / 75.0,
+                             sectors=t.sectors, start=_start(t))
                     for t in disc.tracks)
                 logger.info("DiscID: %s (%d tracks)", disc.id, len(tracks))
                 return DiscInfo(disc_id=disc.id, tracks=tracks)
@@ -59,3 +145,8 @@ class TocReader:
             logger.info("%s -> raw device %s", device, resolved)
             return resolved
         return device
+
+
+def _start(track) -> int | None:
+    offset = getattr(track, "offset", None)
+    return None if offset is None else offset - PREGAP_SECTORS
@@ -1,4 +1,9 @@
-"""ディスク単位のメタデータキャッシュ(既定: ~/.cache/cdp/<disc_id>/)。"""
+"""ディスク単位のメタデータキャッシュ(既定: ~/.cache/cdp/<disc_id>/)。
+
+曲名(metadata.json)とカバー(cover.jpg)は別々に保存する。カバーだけが
+ないディスクは、曲名を取り直さずに release_id からカバーを探し直せる。
+Cover Art Archive にカバーがなかった時刻は cover.json に残す。
+"""
 from __future__ import annotations
 
 import json
@@ -29,25 +34,60 @@ class MetadataCache:
         except (OSError, KeyError, TypeError, json.JSONDecodeError):
             logger.warning("キャッシュが壊れています: %s", disc_id)
             return None
+        return AlbumMeta(title=title, artist=artist, tracks=tracks,
+                         cover_path=self.cover_path(disc_id))
+
+    def release_id(self, disc_id: str) -> str | None:
+        """曲名を取ったリリース。古いキャッシュや未登録なら None。"""
+        path = self._dir(disc_id) / "metadata.json"
+        try:
+            return json.loads(path.read_text(encoding="utf-8")).get(
+                "release_id")
+        except (OSError, AttributeError, json.JSONDecodeError):
+            return None
+
+    def cover_path(self, disc_id: str) -> str | None:
         cover = self._dir(disc_id) / "cover.jpg"
-        return AlbumMeta(
-            title=title, artist=artist, tracks=tracks,
-            cover_path=str(cover) if cover.exists() else None)
+        return str(cover) if cover.exists() else None
+
+    def cover_missing_since(self, disc_id: str) -> float | None:
+        """Cover Art Archive にカバーがないと分かった時刻(time.time)。"""
+        path = self._dir(disc_id) / "cover.json"
+        try:
+            return float(json.loads(path.read_text(encoding="utf-8"))
+                         ["missing_at"])
+        except (OSError, KeyError, TypeError, ValueError):
+            return None
+
+    def mark_cover_missing(self, disc_id: str, when: float) -> None:
+        d = self._dir(disc_id)
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "cover.json").write_text(json.dumps({"missing_at": when}),
+                                      encoding="utf-8")
+
+    def store_cover(self, disc_id: str, cover_bytes: bytes) -> str:
+        d = self._dir(disc_id)
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "cover.jpg").write_bytes(cover_bytes)
+        (d / "cover.json").unlink(missing_ok=True)
+        return str(d / "cover.jpg")
 
     def store(self, disc_id: str, album: AlbumMeta,
-              cover_bytes: bytes | None = None) -> AlbumMeta:
+              cover_bytes: bytes | None = None,
+              release_id: str | None = None) -> AlbumMeta:
         d = self._dir(disc_id)
         d.mkdir(parents=True, exist_ok=True)
         data = {
             "title": album.title,
             "artist": album.artist,
+            "release_id": release_id,
             "tracks": [{"number": t.number, "title": t.title}
                        for t in album.tracks],
         }
         (d / "metadata.json").write_text(
             json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-        cover_path = None
         if cover_bytes:
-            (d / "cover.jpg").write_bytes(cover_bytes)
-            cover_path = str(d / "cover.jpg")
+            cover_path = self.store_cover(disc_id, cover_bytes)
+        else:
+            cover_path = self.cover_path(disc_id)
         return AlbumMeta(album.title, album.artist, album.tracks, cover_path)
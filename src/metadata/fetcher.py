@@ -1,22 +1,61 @@
 """MusicBrainz / Cover Art Archive からのメタデータ取得。
 
 ここの関数はすべてブロッキング。必ずワーカースレッドから呼ぶこと。
+通信は HttpClient の 1 本の Session に集め、MusicBrainz の検索・リリース
+取得・カバーのダウンロードで接続を使い回す。XML の解釈は musicbrainzngs。
 """
 from __future__ import annotations
 
+import io
 import logging
+import re
+import threading
+import time
+import urllib.parse
+from xml.etree.ElementTree import ParseError
 
-import musicbrainzngs
 import requests
+from musicbrainzngs import mbxml
 
 from src.core.events import AlbumMeta, TrackMeta
 from src.metadata.cache import MetadataCache
+from src.metadata.http import HttpClient
 
 logger = logging.getLogger(__name__)
 
 APP_NAME = "cdp"
 APP_VERSION = "0.4.0"
 APP_CONTACT = "https://github.com/keiichiyasu/cdp"
+USER_AGENT = f"{APP_NAME}/{APP_VERSION} ( {APP_CONTACT} )"
+MUSICBRAINZ_URL = "https://musicbrainz.org/ws/2"
+COVER_ART_URL = "https://coverartarchive.org"
+MB_MIN_INTERVAL = 1.0  # MusicBrainz の利用規約: 1 秒に 1 リクエストまで
+# Cover Art Archive が用意する縮小版の一辺(px)。原寸は数 MB になることがある
+COVER_THUMBNAIL_SIZES = (250, 500, 1200)
+# Cover Art Archive になかったカバーを探し直す間隔
+COVER_RETRY_SECONDS = 7 * 24 * 3600
+# MusicBrainz 検索(Lucene)で逃がす文字
+_LUCENE_SPECIAL = re.compile(r'[+\-&|!(){}\[\]^"~*?:\\/]')
+
+
+def thumbnail_size(pixels: int) -> int:
+    """一辺 pixels で表示するのに足りる、いちばん小さい縮小版。
+
+    1 割までの拡大は目立たないので許す(720p の 504 px には 500)。
+    """
+    for size in COVER_THUMBNAIL_SIZES:
+        if size * 1.1 >= pixels:
+            return size
+    return COVER_THUMBNAIL_SIZES[-1]
+
+
+def lucene_phrase(text: str) -> str:
+    """text をそのまま探す MusicBrainz 検索(Lucene)のフレーズ。
+
+    CD-Text のタイトルには引用符・括弧・バックスラッシュなども入りうるので、
+    特殊文字はすべてバックスラッシュで逃がす。
+    """
+    return '"' + _LUCENE_SPECIAL.sub(r"\\\g<0>", text) + '"'
 
 
 def parse_release(release: dict) -> AlbumMeta:
@@ -42,21 +81,43 @@ def parse_release(release: dict) -> AlbumMeta:
                      artist=artist, tracks=tuple(tracks))
 
 
+class MetadataFetchError(Exception):
+    """MusicBrainz に問い合わせられなかった(未登録とは区別する)。"""
+
+
+class MetadataResponseError(MetadataFetchError):
+    """MusicBrainz は応えたが、エラーの状態か解釈できない応答だった。"""
+
+
 class MetadataFetcher:
-    def __init__(self):
-        musicbrainzngs.set_useragent(APP_NAME, APP_VERSION, APP_CONTACT)
+    def __init__(self, http: HttpClient | None = None,
+                 musicbrainz_url: str = MUSICBRAINZ_URL,
+                 cover_art_url: str = COVER_ART_URL,
+                 min_interval: float = MB_MIN_INTERVAL,
+                 cover_size: int | None = 1200):
+        """cover_size はカバーの縮小版の一辺(thumbnail_size)。None なら原寸。"""
+        self._http = http or HttpClient(USER_AGENT)
+        self._cover_size = cover_size
+        self._mb_url = musicbrainz_url.rstrip("/")
+        self._caa_url = cover_art_url.rstrip("/")
+        self._min_interval = min_interval
+        self._last_mb = float("-inf")
+        self._mb_lock = threading.Lock()
 
     def fetch(self, disc_id: str, fallback_title: str | None = None):
         """(AlbumMeta, release_id) を返す。見つからなければ None。"""
         try:
-            result = musicbrainzngs.get_releases_by_discid(
-                disc_id, includes=["artists", "recordings"])
-            if "disc" in result and result["disc"].get("release-list"):
+            result = self._mb_get(f"discid/{urllib.parse.quote(disc_id)}",
+                                  inc="artists recordings")
+            if result is None:
+                logger.info("DiscID %s は MusicBrainz に未登録", disc_id)
+            elif "disc" in result and result["disc"].get("release-list"):
                 release = result["disc"]["release-list"][0]
                 return parse_release(release), release.get("id")
-        except musicbrainzngs.ResponseError:
-            logger.info("DiscID %s は MusicBrainz に未登録", disc_id)
-        except musicbrainzngs.WebServiceError as e:
+        except MetadataResponseError as e:
+            # つながってはいるので、タイトル検索は試す
+            logger.info("DiscID %s を引けません: %s", disc_id, e)
+        except MetadataFetchError as e:
             logger.warning("MusicBrainz エラー: %s", e)
             return None
         if fallback_title and fallback_title != "Audio CD":
@@ -65,38 +126,82 @@ class MetadataFetcher:
 
     def _search_by_title(self, title: str):
         try:
-            result = musicbrainzngs.search_releases(release=title, limit=1)
-            if result["release-list"]:
+            result = self._mb_get("release/",
+                                  query="release:" + lucene_phrase(title),
+                                  limit="1")
+            if result and result.get("release-list"):
                 release_id = result["release-list"][0]["id"]
-                full = musicbrainzngs.get_release_by_id(
-                    release_id, includes=["artists", "recordings"])
-                return parse_release(full["release"]), release_id
-        except musicbrainzngs.WebServiceError as e:
+                full = self._mb_get(f"release/{release_id}",
+                                    inc="artists recordings")
+                if full is not None:
+                    return parse_release(full["release"]), release_id
+        except MetadataFetchError as e:
             logger.warning("タイトル検索に失敗: %s", e)
         return None
 
-    def fetch_cover(self, release_id: str) -> bytes | None:
-        url = f"https://coverartarchive.org/release/{release_id}/front"
+    def _mb_get(self, path: str, **params) -> dict | None:
+        """MusicBrainz の XML を musicbrainzngs と同じ dict にする。404 は None。"""
+        url = f"{self._mb_url}/{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        with self._mb_lock:
+            wait = self._last_mb + self._min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                resp = self._http.get(url)
+            except requests.RequestException as e:
+                raise MetadataFetchError(str(e)) from e
+            finally:
+                self._last_mb = time.monotonic()
+        if resp.status == 404:
+            return None
+        if resp.status != 200:
+            raise MetadataResponseError(f"HTTP {resp.status}: {url}")
         try:
-            resp = requests.get(
-                url, timeout=15,
-                headers={"User-Agent": f"{APP_NAME}/{APP_VERSION}"})
-            resp.raise_for_status()
-            return resp.content
-        except requests.RequestException as e:
-            logger.info("カバーアートなし: %s", e)
+            return mbxml.parse_message(io.BytesIO(resp.content))
+        except ParseError as e:
+            raise MetadataResponseError(f"応答を解釈できません: {e}") from e
+
+    def fetch_cover(self, release_id: str) -> bytes | None:
+        """カバーの画像(cover_size の縮小版)。登録がなければ None。
+
+        通信の失敗は requests.RequestException のまま送る(次の機会に再試行)。
+        """
+        url = f"{self._caa_url}/release/{release_id}/front"
+        if self._cover_size is not None:
+            resp = self._http.get(f"{url}-{self._cover_size}")
+            if resp.status != 404:
+                return self._cover(resp, release_id)
+            # 古い登録には縮小版がないことがある
+            logger.info("縮小版がないため原寸のカバーを取得: %s", release_id)
+        return self._cover(self._http.get(url), release_id)
+
+    @staticmethod
+    def _cover(resp, release_id: str) -> bytes | None:
+        if resp.status == 404:
+            logger.info("カバーアートなし: %s", release_id)
             return None
+        if resp.status != 200:
+            raise requests.HTTPError(f"HTTP {resp.status}: カバーアート")
+        return resp.content
 
 
 class MetadataService:
-    """キャッシュ優先でメタデータを取得する(ブロッキング。ワーカーで呼ぶ)。"""
+    """キャッシュ優先でメタデータを取得する(ブロッキング。ワーカーで呼ぶ)。
+
+    曲名(get)とカバー(get_cover)は別々に取る。曲名はカバーを待たない。
+    """
 
-    def __init__(self, cache: MetadataCache | None = None, fetcher=None):
+    def __init__(self, cache: MetadataCache | None = None, fetcher=None,
+                 now_fn=time.time):
         self._cache = cache or MetadataCache()
         self._fetcher = fetcher or MetadataFetcher()
+        self._now = now_fn
 
     def get(self, disc_id: str | None,
             fallback_title: str | None = None) -> AlbumMeta | None:
+        """アルバムと曲名。カバーはキャッシュにあるときだけ cover_path が入る。"""
         if not disc_id:
             return None
         cached = self._cache.load(disc_id)
@@ -107,5 +212,29 @@ class MetadataService:
         if found is None:
             return None
         album, release_id = found
-        cover = self._fetcher.fetch_cover(release_id) if release_id else None
-        return self._cache.store(disc_id, album, cover)
+        return self._cache.store(disc_id, album, release_id=release_id)
+
+    def get_cover(self, disc_id: str) -> str | None:
+        """カバーのパス。get の後に呼ぶ。なければ Cover Art Archive から取る。
+
+        通信に失敗したら次に呼ばれたとき、登録がなかったら
+        COVER_RETRY_SECONDS 経ってから探し直す。
+        """
+        path = self._cache.cover_path(disc_id)
+        if path is not None:
+            return path
+        release_id = self._cache.release_id(disc_id)
+        if release_id is None:
+            return None
+        missing = self._cache.cover_missing_since(disc_id)
+        if missing is not None and self._now() - missing < COVER_RETRY_SECONDS:
+            return None
+        try:
+            cover = self._fetcher.fetch_cover(release_id)
+        except requests.RequestException as e:
+            logger.info("カバーアートを取得できません(次回再試行): %s", e)
+            return None
+        if cover is None:
+            self._cache.mark_cover_missing(disc_id, self._now())
+            return None
+        return self._cache.store_cover(disc_id, cover)
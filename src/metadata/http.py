@@ -0,0 +1,126 @@
+"""MusicBrainz / Cover Art Archive 共通の HTTP。
+
+接続を使い回す 1 本の requests.Session と、ETag / Last-Modified を覚える
+ディスク上のレスポンスキャッシュ(既定: ~/.cache/cdp/http/)を持つ。
+キャッシュ済みの URL は条件付きリクエストで確かめ直すので、変わって
+いなければ 304 の 1 往復で済む。カバーはディスクごとのキャッシュにも
+残るので、ここは容量上限(HTTP_CACHE_BYTES)を超えたら使っていない順に
+消す。ここもブロッキング。ワーカーから呼ぶ。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_BYTES = 16 * 1024 ** 2  # 1200 px のカバーで数十枚分
+
+
+@dataclass(frozen=True)
+class HttpResponse:
+    status: int
+    content: bytes
+    revalidated: bool = False  # 304 でキャッシュを使った
+
+
+class HttpClient:
+    """どのスレッドから呼んでもよい(Session は共有、キャッシュはロック)。"""
+
+    def __init__(self, user_agent: str, cache_dir: Path | None = None,
+                 session: requests.Session | None = None,
+                 max_bytes: int = HTTP_CACHE_BYTES):
+        self.cache_dir = (Path(cache_dir) if cache_dir
+                          else Path.home() / ".cache" / "cdp" / "http")
+        self.max_bytes = max_bytes
+        self._session = session or requests.Session()
+        self._session.headers["User-Agent"] = user_agent
+        self._lock = threading.Lock()
+
+    def get(self, url: str, timeout: float = 15.0,
+            headers: dict | None = None) -> HttpResponse:
+        """GET する。通信の失敗は requests.RequestException のまま送る。
+
+        リダイレクト(CAA → archive.org)も同じ Session の接続で追う。
+        """
+        headers = dict(headers or {})
+        cached = self._load(url)
+        if cached is not None:
+            meta, body = cached
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        resp = self._session.get(url, timeout=timeout, headers=headers)
+        if resp.status_code == 304 and cached is not None:
+            logger.debug("変更なし(304): %s", url)
+            return HttpResponse(200, cached[1], revalidated=True)
+        if resp.status_code == 200:
+            self._store(url, resp)
+        return HttpResponse(resp.status_code, resp.content)
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.body"
+
+    def _load(self, url: str) -> tuple[dict, bytes] | None:
+        meta_path, body_path = self._paths(url)
+        with self._lock:
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                body = body_path.read_bytes()
+            except (OSError, ValueError):
+                return None
+            if meta.get("url") != url:
+                return None
+            try:
+                os.utime(body_path)  # 使った順(追い出しの判断用)
+            except OSError:
+                pass
+        return meta, body
+
+    def _store(self, url: str, resp) -> None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return  # 確かめ直す手段がない
+        if len(resp.content) > self.max_bytes:
+            return
+        meta_path, body_path = self._paths(url)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified}
+        with self._lock:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                body_path.write_bytes(resp.content)
+                meta_path.write_text(json.dumps(meta), encoding="utf-8")
+                self._evict()
+            except OSError:
+                logger.exception("HTTP キャッシュに保存できません: %s", url)
+
+    def _evict(self) -> None:
+        """max_bytes に収まるまで、最後に使ったのが古い応答から消す。ロック内で。"""
+        entries = []
+        for body_path in self.cache_dir.glob("*.body"):
+            try:
+                st = body_path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, body_path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, body_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            body_path.unlink(missing_ok=True)
+            body_path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+            logger.debug("HTTP キャッシュから追い出し: %s", body_path.name)
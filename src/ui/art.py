@@ -0,0 +1,124 @@
+"""アルバムアートの読み込みと縮小。Tk のメインスレッドの外で行う。
+
+大きな JPEG のデコードと LANCZOS 縮小は Pi 4 で数百 ms かかり、その間 UI が
+止まり、再生スレッドから GIL も奪う。ここでは専用スレッドで JPEG の
+draft(縮小デコード)を使って読み、縮小結果を (パス, 一辺) の LRU に置く。
+縮小したカバーは cover.jpg の隣(cover-<一辺>.jpg)にも保存し、同じ
+ディスクの再挿入ではデコードし直さない。
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+ART_CACHE_ENTRIES = 8
+
+
+def scaled_path(path: str, size: int) -> Path:
+    """縮小版の保存先(元画像と同じディレクトリ)。"""
+    p = Path(path)
+    return p.with_name(f"{p.stem}-{size}.jpg")
+
+
+def load_scaled(path: str, size: int, save: bool = True) -> Image.Image:
+    """path を一辺 size に収まるよう縮小して読む(ブロッキング)。
+
+    保存済みの縮小版が元画像より新しければそれを読むだけ。save なら
+    縮小した結果を保存する(書けなくても構わない)。
+    """
+    scaled = scaled_path(path, size)
+    try:
+        if save and scaled.stat().st_mtime >= Path(path).stat().st_mtime:
+            with Image.open(scaled) as img:
+                img.load()
+                return img
+    except OSError:
+        pass
+    with Image.open(path) as img:
+        img.draft("RGB", (size, size))  # JPEG は 1/2〜1/8 でデコードする
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        out = img.convert("RGB")
+    if save:
+        try:
+            out.save(scaled, "JPEG", quality=90)
+        except OSError as e:
+            logger.debug("縮小したカバーを保存できません: %s", e)
+    return out
+
+
+class ArtLoader:
+    """縮小済みの画像を返す。なければ専用スレッドで読み、次の get で返す。
+
+    get はどのスレッドから呼んでもよい(View は Tk のメインスレッドから)。
+    """
+
+    def __init__(self, entries: int = ART_CACHE_ENTRIES, load_fn=load_scaled,
+                 on_ready=None):
+        """on_ready() は読み込みを終えるたびに専用スレッドから呼ばれる。"""
+        self._entries = entries
+        self._on_ready = on_ready
+        self._load = load_fn
+        self._cache: OrderedDict[tuple[str, int], Image.Image] = OrderedDict()
+        self._failed: set[tuple[str, int]] = set()
+        self._pending: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._jobs: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+
+    def get(self, path: str, size: int) -> Image.Image | None:
+        """縮小済みなら画像、読み込み中なら None(読み込みを頼んでおく)。
+
+        読めなかった画像は KeyError。
+        """
+        key = (path, size)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            if key in self._failed:
+                raise KeyError(key)
+            if key in self._pending:
+                return None
+            self._pending.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work,
+                                                daemon=True)
+                self._thread.start()
+        self._jobs.put(key)
+        return None
+
+    def load_now(self, path: str, size: int) -> Image.Image:
+        """呼んだスレッドで読む(起動時のプレースホルダー用)。"""
+        img = self._load(path, size, save=False)
+        self._put((path, size), img)
+        return img
+
+    def _work(self) -> None:
+        while True:
+            key = self._jobs.get()
+            try:
+                img = self._load(*key)
+            except Exception:
+                logger.exception("画像を読み込めません: %s", key[0])
+                with self._lock:
+                    self._pending.discard(key)
+                    self._failed.add(key)
+            else:
+                self._put(key, img)
+            if self._on_ready is not None:
+                self._on_ready()
+
+    def _put(self, key, img) -> None:
+        with self._lock:
+            self._pending.discard(key)
+            self._cache[key] = img
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._entries:
+                self._cache.popitem(last=False)
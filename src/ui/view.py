@@ -2,19 +2,26 @@
 from __future__ import annotations
 
 import logging
+import os
 import tkinter as tk
 from pathlib import Path
 
-from PIL import Image, ImageTk
+from PIL import ImageTk
 
 from src.core.events import AppState, ViewState
+from src.ui.art import ArtLoader
 
 logger = logging.getLogger(__name__)
 
-POLL_MS = 200
+POLL_MS = 200  # 起こしてもらえない環境での定期確認
+# 起こしてもらえる環境でも、イベントを伴わない変化(再試行の期限など)を
+# 拾うために低頻度で確認する
+FALLBACK_POLL_MS = 2000
 # 起動直後はデスクトップ環境側がまだ整っておらず、1 回きりの要求では
 # 取りこぼす。自動起動時は特に競合しやすいので数回に分けて試みる。
 WINDOW_RETRY_MS = (500, 2000, 5000)
+ART_SCALE = 0.70  # アートの一辺(画面の高さに対する比)
+SMALL_ART = 0.35  # 待機・読み込み中・エラーのプレースホルダー(アートに対する比)
 BG = "#000000"
 FG_MAIN = "#e6e6e6"
 FG_SUB = "#8c8c8c"
@@ -45,6 +52,11 @@ def format_artist_line(vs: ViewState) -> str:
     return line
 
 
+def art_size(screen_height: int) -> int:
+    """全画面で表示するアートの一辺(px)。"""
+    return int(screen_height * ART_SCALE)
+
+
 def ensure_fullscreen(root) -> bool:
     """全画面が適用済みかを確かめ、外れていれば要求し直す。
 
@@ -60,6 +72,39 @@ def ensure_fullscreen(root) -> bool:
     return False
 
 
+class WakePipe:
+    """別スレッドから Tk のメインループを起こす self-pipe。
+
+    読み口を createfilehandler に登録し、wake() で 1 バイト書く。
+    書き込みは詰まらない(既に起こしてあれば何もしない)。
+    """
+
+    def __init__(self):
+        self._r, self._w = os.pipe()
+        os.set_blocking(self._r, False)
+        os.set_blocking(self._w, False)
+
+    def fileno(self) -> int:
+        return self._r
+
+    def wake(self) -> None:
+        try:
+            os.write(self._w, b"\0")
+        except BlockingIOError:
+            pass
+
+    def drain(self) -> None:
+        try:
+            while os.read(self._r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        os.close(self._r)
+        os.close(self._w)
+
+
 class View:
     def __init__(self, root: tk.Tk, controller):
         self._root = root
@@ -67,7 +112,10 @@ class View:
         self._last: ViewState | None = None
         self._photo = None       # PhotoImage の参照保持(GC 対策)
         self._photo_key = None
+        self._waiting_art: str | None = None  # 読み込みを待っているカバー
         self._on_quit = None
+        self._wake = self._install_wakeup(root, controller)
+        self._poll_ms = FALLBACK_POLL_MS if self._wake else POLL_MS
 
         root.configure(bg=BG)
         # 全画面要求が通らなかった場合の保険。place() で組んでいるため
@@ -77,7 +125,17 @@ class View:
         root.config(cursor="none")
 
         h = root.winfo_screenheight()
-        self._art_size = int(h * 0.70)
+        self._art_size = art_size(h)
+        self._art = ArtLoader(
+            on_ready=self._wake.wake if self._wake else None)
+        # プレースホルダーは起動時に両方の大きさで 1 回だけ作る
+        self._placeholders = {}
+        for size in (self._art_size, int(self._art_size * SMALL_ART)):
+            try:
+                self._placeholders[size] = ImageTk.PhotoImage(
+                    self._art.load_now(str(PLACEHOLDER), size))
+            except Exception:
+                logger.exception("プレースホルダーを読めません")
         font_main = ("Helvetica", max(int(h * 0.033), 20), "bold")
         font_sub = ("Helvetica", max(int(h * 0.022), 14))
 
@@ -94,6 +152,8 @@ class View:
         root.bind("n", lambda e: controller.next_track())
         root.bind("p", lambda e: controller.prev_track())
         root.bind("e", lambda e: controller.eject())
+        if hasattr(controller, "next_drive"):  # 複数ドライブ
+            root.bind("d", lambda e: controller.next_drive())
 
         # 全画面とキーボードフォーカスを自分から取りに行く。labwc + XWayland
         # では、開いたウィンドウが自動でフォーカスを得るとは限らず(キー操作が
@@ -102,7 +162,28 @@ class View:
         for delay in WINDOW_RETRY_MS:
             root.after(delay, self._claim_window)
 
-        root.after(POLL_MS, self._tick)
+        root.after(self._poll_ms, self._tick)
+
+    def _install_wakeup(self, root, controller) -> WakePipe | None:
+        """post で起こしてもらう。できなければ None(POLL_MS で確かめる)。"""
+        set_wakeup = getattr(controller, "set_wakeup", None)
+        if set_wakeup is None:
+            return None
+        try:
+            wake = WakePipe()
+            root.tk.createfilehandler(wake.fileno(), tk.READABLE,
+                                      self._on_wake)
+        except (AttributeError, OSError, tk.TclError):
+            # Windows の Tk は createfilehandler を持たない
+            logger.info("メインループを起こせないため %d ms ごとに確認します",
+                        POLL_MS)
+            return None
+        set_wakeup(wake.wake)
+        return wake
+
+    def _on_wake(self, fd, mask) -> None:
+        self._wake.drain()
+        self._refresh()
 
     def _claim_window(self) -> None:
         try:
@@ -117,17 +198,25 @@ class View:
     def _quit(self) -> None:
         if self._on_quit is not None:
             self._on_quit()
+        if self._wake is not None:
+            self._root.tk.deletefilehandler(self._wake.fileno())
         self._root.destroy()
 
     def _tick(self) -> None:
+        self._refresh()
+        self._root.after(self._poll_ms, self._tick)
+
+    def _refresh(self) -> None:
+        """届いたイベントを処理し、ViewState が変わったときだけ描く。"""
         try:
             vs = self._controller.process_pending()
             if vs != self._last:
                 self._render(vs)
                 self._last = vs
+            elif self._waiting_art is not None:
+                self._show_art(self._waiting_art)  # 読み込めていれば差し替える
         except Exception:
             logger.exception("描画に失敗")
-        self._root.after(POLL_MS, self._tick)
 
     def _render(self, vs: ViewState) -> None:
         if vs.state is AppState.NO_DISC:
@@ -148,16 +237,27 @@ class View:
             self._line2.config(text=vs.error_message or "エラーが発生しました")
 
     def _show_art(self, cover_path: str | None, small: bool = False) -> None:
-        path = cover_path or str(PLACEHOLDER)
-        size = int(self._art_size * (0.35 if small else 1.0))
-        key = (path, size)
+        """縮小済みの画像を差し替えるだけ。読み込みは ArtLoader のスレッド。"""
+        size = int(self._art_size * (SMALL_ART if small else 1.0))
+        self._waiting_art = None
+        img = None
+        if cover_path is not None:
+            try:
+                img = self._art.get(cover_path, size)
+            except KeyError:
+                cover_path = None  # 読めないカバーはプレースホルダーで
+            else:
+                if img is None:
+                    self._waiting_art = cover_path
+        key = (cover_path if img is not None else None, size)
         if key == self._photo_key:
             return
         try:
-            img = Image.open(path)
-            img.thumbnail((size, size), Image.Resampling.LANCZOS)
-            self._photo = ImageTk.PhotoImage(img)
+            if img is not None:
+                self._photo = ImageTk.PhotoImage(img)
+            else:
+                self._photo = self._placeholders[size]
             self._art_label.config(image=self._photo)
             self._photo_key = key
         except Exception:
-            logger.exception("画像を表示できません: %s", path)
+            logger.exception("画像を表示できません: %s", cover_path)
@@ -10,3 +10,57 @@ def wait_until(predicate, timeout=5.0, interval=0.01):
             return True
         time.sleep(interval)
     return False
+
+
+class FakeCdromIoctl:
+    """ファイルを CD に見立てる ioctl(fcntl.ioctl 互換)。
+
+    ファイルは LBA 0 から並んだ CD-DA セクタ(2352 バイト単位)。TOC は
+    starts(各トラックの先頭 LBA)と leadout で与える。data_tracks に含めた
+    トラックはデータトラックとして報告する。bad_sectors を読むと EIO。
+    """
+
+    def __init__(self, starts, leadout, data_tracks=(), bad_sectors=()):
+        self.starts = list(starts)
+        self.leadout = leadout
+        self.data_tracks = set(data_tracks)
+        self.bad_sectors = set(bad_sectors)
+        self.reads = []  # (lba, sectors)
+        self.controls = []  # 速度指定・モーター停止 (request, arg)
+
+    def __call__(self, fd, request, arg):
+        import ctypes
+        import errno
+        import os
+
+        from src.disc import cdrom
+        if request == cdrom.CDROMREADTOCHDR:
+            arg.trk0, arg.trk1 = 1, len(self.starts)
+        elif request == cdrom.CDROMREADTOCENTRY:
+            if arg.track == cdrom.CDROM_LEADOUT:
+                arg.addr.lba = self.leadout
+            else:
+                arg.addr.lba = self.starts[arg.track - 1]
+                ctrl = cdrom.CDROM_DATA_TRACK if arg.track in self.data_tracks else 0
+                arg.adr_ctrl = (ctrl << 4) | 1
+        elif request == cdrom.CDROMREADAUDIO:
+            lba, n = arg.addr.lba, arg.nframes
+            self.reads.append((lba, n))
+            if self.bad_sectors & set(range(lba, lba + n)):
+                raise OSError(errno.EIO, "Input/output error")
+            data = os.pread(fd, n * cdrom.CD_FRAMESIZE_RAW,
+                            lba * cdrom.CD_FRAMESIZE_RAW)
+            ctypes.memmove(arg.buf, data, len(data))
+        elif request in (cdrom.CDROM_SELECT_SPEED, cdrom.CDROMSTOP):
+            self.controls.append((request, arg))
+        else:
+            raise OSError(errno.ENOTTY, "Inappropriate ioctl")
+        return 0
+
+
+def write_fake_disc(path, sectors):
+    """各セクタの全バイトを (LBA % 251) で埋めた CD イメージを書く。"""
+    with open(path, "wb") as f:
+        for lba in range(sectors):
+            f.write(bytes([lba % 251]) * 2352)
+    return str(path)
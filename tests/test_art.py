@@ -0,0 +1,61 @@
+from PIL import Image
+
+from src.ui.art import ArtLoader, load_scaled, scaled_path
+from tests.support import wait_until
+
+
+def write_cover(path, size=2000, color=(200, 30, 30)):
+    Image.new("RGB", (size, size), color).save(path, "JPEG")
+    return str(path)
+
+
+def test_load_scaled_shrinks_and_saves_next_to_cover(tmp_path):
+    cover = write_cover(tmp_path / "cover.jpg")
+    img = load_scaled(cover, 500)
+    assert img.size == (500, 500)
+    saved = scaled_path(cover, 500)
+    assert saved == tmp_path / "cover-500.jpg"
+    assert Image.open(saved).size == (500, 500)
+
+
+def test_reinsert_uses_saved_scaled_cover(tmp_path):
+    cover = write_cover(tmp_path / "cover.jpg")
+    load_scaled(cover, 500)
+    # 保存済みの縮小版だけを読むことを、色を変えて確かめる
+    Image.new("RGB", (500, 500), (0, 0, 255)).save(scaled_path(cover, 500))
+    assert load_scaled(cover, 500).getpixel((250, 250))[2] > 200
+
+
+def test_loader_loads_off_thread_and_keeps_lru(tmp_path):
+    loads = []
+
+    def load(path, size, save=True):
+        loads.append((path, size))
+        return Image.new("RGB", (size, size))
+
+    loader = ArtLoader(entries=2, load_fn=load)
+    assert loader.get("a.jpg", 10) is None  # 読み込み中
+    assert wait_until(lambda: loader.get("a.jpg", 10) is not None)
+    for name in ("b.jpg", "c.jpg"):
+        loader.get(name, 10)
+        assert wait_until(lambda: loader.get(name, 10) is not None)
+    assert loader.get("a.jpg", 10) is None  # 追い出されたので読み直す
+    assert wait_until(lambda: loads.count(("a.jpg", 10)) == 2)
+
+
+def test_loader_reports_unreadable_image(tmp_path):
+    bad = tmp_path / "cover.jpg"
+    bad.write_bytes(b"not an image")
+    ready = []
+    loader = ArtLoader(on_ready=lambda: ready.append(1))
+    assert loader.get(str(bad), 100) is None
+
+    def failed():
+        try:
+            loader.get(str(bad), 100)
+        except KeyError:
+            return True
+        return False
+
+    assert wait_until(failed)
+    assert wait_until(lambda: ready == [1])  # 失敗しても View を起こす
@@ -0,0 +1,139 @@
+import threading
+
+from src.audio.burst import BurstBuffer, BurstSource
+from src.audio.sources import IoctlCdSource, SourceStallError
+from src.core.events import TrackRef
+from src.disc import cdrom
+from tests.support import FakeCdromIoctl, wait_until, write_fake_disc
+
+SECTOR = 2352
+
+
+class FakeDrive:
+    """セクタ長どおりに並んだディスク。fail_at バイト目で最初の読み取りが止まる。"""
+
+    def __init__(self, sectors, fail_at=None):
+        self.tracks = [TrackRef(i + 1, s / 75, s) for i, s in enumerate(sectors)]
+        self.starts = [sum(sectors[:i]) * SECTOR for i in range(len(sectors))]
+        self.pcm = bytes(i % 251 for i in range(sum(sectors) * SECTOR))
+        self.fail_at = fail_at
+        self.requests = []
+        self.controls = []
+        self.closed = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def list_tracks(self):
+        return self.tracks
+
+    def _chunks(self, pos, end, fail_at=None):
+        while pos < end:
+            self.gate.wait()
+            if fail_at is not None and pos >= fail_at:
+                raise SourceStallError("scratch")
+            yield self.pcm[pos:min(pos + 5000, end)]
+            pos += 5000
+
+    def open(self, n, start_frame=0):
+        self.requests.append(("open", n, start_frame))
+        end = self.starts[n] if n < len(self.starts) else len(self.pcm)
+        return self._chunks(self.starts[n - 1] + start_frame * 4, end)
+
+    def open_from(self, n, start_frame=0):
+        self.requests.append(("open_from", n, start_frame))
+        fail_at, self.fail_at = self.fail_at, None
+        return self._chunks(self.starts[n - 1] + start_frame * 4,
+                            len(self.pcm), fail_at)
+
+    def select_speed(self, speed):
+        self.controls.append(("speed", speed))
+
+    def stop_motor(self):
+        self.controls.append(("stop",))
+
+    def close(self):
+        self.closed = True
+
+
+def read_all(reader):
+    return b"".join(reader)
+
+
+def test_whole_disc_is_read_once_then_the_drive_stops():
+    drive = FakeDrive([10, 20, 5])
+    src = BurstSource(drive, drive.tracks)
+    assert read_all(src.open(2)) == drive.pcm[drive.starts[1]:drive.starts[2]]
+    assert wait_until(lambda: src.complete)
+    assert wait_until(lambda: drive.closed)
+    assert drive.controls == [("speed", 0), ("stop",)]
+    # 以後の曲送り・シークはメモリから(ドライブを開かない)
+    assert read_all(src.open_from(3, 100)) == drive.pcm[drive.starts[2] + 400:]
+    assert read_all(src.open(1)) == drive.pcm[:drive.starts[1]]
+    assert drive.requests == [("open_from", 1, 0)]
+
+
+def test_reader_waits_for_data_still_being_read():
+    drive = FakeDrive([10, 10])
+    drive.gate.clear()
+    src = BurstSource(drive, drive.tracks)
+    reader = src.open(2)
+    got = []
+    t = threading.Thread(target=lambda: got.append(read_all(reader)))
+    t.start()
+    t.join(0.1)
+    assert t.is_alive()
+    drive.gate.set()
+    t.join(2.0)
+    assert got == [drive.pcm[drive.starts[1]:]]
+
+
+def test_failed_burst_falls_back_to_streaming_at_that_position():
+    drive = FakeDrive([10, 20], fail_at=30000)
+    src = BurstSource(drive, drive.tracks)
+    assert read_all(src.open_from(1)) == drive.pcm
+    assert not src.complete
+    # 30000 バイト目 = トラック 2 の (30000 - 23520) / 4 フレーム目
+    assert drive.requests[-1] == ("open_from", 2, (30000 - 23520) // 4)
+    assert ("stop",) not in drive.controls
+
+
+def test_close_wakes_waiting_reader():
+    drive = FakeDrive([10])
+    drive.gate.clear()
+    src = BurstSource(drive, drive.tracks)
+    reader = src.open(1)
+    threading.Timer(0.05, src.close).start()
+    assert read_all(reader) == b""
+    assert drive.closed
+    drive.gate.set()
+
+
+
+def test_open_after_close_reads_the_disc_again():
+    # 再生エラーのたびにエンジンがソースを閉じるので、再試行で読み直す
+    drive = FakeDrive([10, 5])
+    src = BurstSource(drive, drive.tracks)
+    assert read_all(src.open(1)) == drive.pcm[:drive.starts[1]]
+    src.close()
+    assert read_all(src.open_from(1)) == drive.pcm
+    assert wait_until(lambda: src.complete)
+    assert drive.requests.count(("open_from", 1, 0)) == 2
+
+def test_buffer_budget_decides_between_burst_and_streaming():
+    drive = FakeDrive([10, 10])
+    assert isinstance(BurstBuffer(20 * SECTOR).wrap(drive, drive.tracks),
+                      BurstSource)
+    assert BurstBuffer(19 * SECTOR).wrap(drive, drive.tracks) is drive
+    unknown = [TrackRef(1), TrackRef(2, 1.0, 75)]
+    assert BurstBuffer(10 ** 9).wrap(drive, unknown) is drive
+
+
+def test_ioctl_drive_is_sped_up_and_stopped(tmp_path):
+    image = write_fake_disc(tmp_path / "disc.bin", 300)
+    fake = FakeCdromIoctl(starts=[0, 100], leadout=300)
+    inner = IoctlCdSource(image, ioctl=fake)
+    src = BurstSource(inner, inner.list_tracks())
+    data = read_all(src.open_from(1))
+    assert data == b"".join(bytes([lba % 251]) * SECTOR for lba in range(300))
+    assert wait_until(lambda: len(fake.controls) == 2)
+    assert fake.controls == [(cdrom.CDROM_SELECT_SPEED, 0), (cdrom.CDROMSTOP, 0)]
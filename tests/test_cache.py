@@ -31,3 +31,16 @@ def test_broken_json_returns_none(tmp_path):
     d.mkdir()
     (d / "metadata.json").write_text("{not json", encoding="utf-8")
     assert MetadataCache(root=tmp_path).load("abc123") is None
+
+
+def test_cover_is_stored_apart_from_titles(tmp_path):
+    cache = MetadataCache(root=tmp_path)
+    cache.store("abc123", ALBUM, release_id="rel-1")
+    assert cache.release_id("abc123") == "rel-1"
+    assert cache.load("abc123").cover_path is None
+    cache.mark_cover_missing("abc123", 1000.0)
+    assert cache.cover_missing_since("abc123") == 1000.0
+    path = cache.store_cover("abc123", b"jpegdata")
+    assert cache.load("abc123").cover_path == path
+    assert cache.cover_missing_since("abc123") is None
+    assert cache.load("abc123").title == ALBUM.title  # 曲名はそのまま
@@ -1,12 +1,14 @@
 from src.audio.sources import TrackSourceError
 from src.core.controller import AppController
-from src.core.events import (AlbumMeta, AppState, DiscInfo, DiscInserted,
-                             DiscRemoved, NotAudioCd, PlaybackError,
+from src.core.events import (AlbumMeta, AppState, CoverReady, DiscInfo,
+                             DiscInserted, DiscRemoved, DriveSpinningUp,
+                             MetadataReady, NotAudioCd, PlaybackError,
                              PlaybackFinished, TrackChanged, TrackMeta,
                              TrackRef)
 from src.disc.toc import TocError
 
-DISC = DiscInfo("abc123", (TrackRef(1, 200.0), TrackRef(2, 180.0)))
+DISC = DiscInfo("abc123", (TrackRef(1, 200.0, 15000),
+                           TrackRef(2, 180.0, 13500)))
 ALBUM = AlbumMeta("Kind of Blue", "Miles Davis",
                   (TrackMeta(1, "So What"), TrackMeta(2, "Freddie Freeloader")))
 
@@ -15,12 +17,25 @@ class FakeEngine:
     def __init__(self):
         self.calls = []
 
-    def play(self, source, tracks):
+    position_seconds = 0.0
+    played_audio = False
+
+    def play(self, source, tracks, track_sectors=None, start=None):
         self.calls.append(("play", tracks))
+        self.source = source
+        self.track_sectors = track_sectors
+        self.start = start
+
+    def prepare(self, source, track_no=1):
+        self.calls.append(("prepare", track_no))
+        self.prepared = source
 
     def stop(self):
         self.calls.append(("stop",))
 
+    def warm_output(self):
+        self.calls.append(("warm_output",))
+
     def toggle_pause(self):
         self.calls.append(("pause",))
 
@@ -73,7 +88,8 @@ class FakeMeta:
 
 
 def make_controller(toc=None, meta=None, source=None, eject=None,
-                    now_fn=None, run_async=None):
+                    now_fn=None, run_async=None, audio_cache=None,
+                    burst_buffer=None):
     engine = FakeEngine()
     source = source or FakeSource()
     c = AppController(
@@ -84,6 +100,8 @@ def make_controller(toc=None, meta=None, source=None, eject=None,
         run_async=run_async or (lambda fn: fn()),
         eject_fn=eject or (lambda: None),
         now_fn=now_fn or (lambda: 0.0),
+        audio_cache=audio_cache,
+        burst_buffer=burst_buffer,
     )
     return c, engine, source
 
@@ -98,6 +116,42 @@ def test_insert_starts_playback_immediately():
     assert vs.track_total == 2
 
 
+def test_toc_sector_lengths_are_passed_to_engine():
+    """ギャップレス再生のトラック境界は TOC のセクタ長から切る。"""
+    c, engine, _ = make_controller()
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert engine.track_sectors == [15000, 13500]
+
+
+def test_source_learns_disc_id_before_playback():
+    """前回このディスクで上げた読み取りモードから始められるように。"""
+    source = FakeSource()
+    seen = []
+    source.use_disc = seen.append
+    c, engine, _ = make_controller(source=source)
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert seen == ["abc123"]
+
+
+def test_insert_warms_up_before_toc_is_read():
+    c, engine, source = make_controller()
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert engine.prepared is source
+    prepare = engine.calls.index(("prepare", 1))
+    assert prepare < engine.calls.index(("play", [1, 2]))
+
+
+def test_toc_failure_discards_warm_up():
+    c, engine, _ = make_controller(toc=FakeToc(error=True),
+                                   source=FakeSource(fail=True))
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert engine.calls[-1] == ("stop",)
+
+
 def test_metadata_fills_view_state():
     c, _, _ = make_controller(meta=FakeMeta(album=ALBUM))
     c.post(DiscInserted("/dev/sr0"))
@@ -107,6 +161,30 @@ def test_metadata_fills_view_state():
     assert vs.track_title == "So What"
 
 
+def test_titles_are_shown_before_cover_arrives():
+    class SlowCoverMeta(FakeMeta):
+        def get_cover(self, disc_id):
+            # 取りに行った時点で曲名はもう送られている
+            self.queued = list(c._queue.queue)
+            return "/cache/abc123/cover.jpg"
+
+    meta = SlowCoverMeta(album=ALBUM)
+    c, _, _ = make_controller(meta=meta)
+    c.post(DiscInserted("/dev/sr0"))
+    vs = c.process_pending()
+    assert isinstance(meta.queued[-1], MetadataReady)
+    assert vs.cover_path == "/cache/abc123/cover.jpg"
+    assert vs.track_title == "So What"
+
+
+def test_stale_cover_is_ignored():
+    c, _, _ = make_controller(meta=FakeMeta(album=ALBUM))
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    c.post(CoverReady("/old/cover.jpg", generation=-1))
+    assert c.process_pending().cover_path is None
+
+
 def test_metadata_failure_keeps_playing():
     c, _, _ = make_controller(meta=FakeMeta(error=True))
     c.post(DiscInserted("/dev/sr0"))
@@ -125,6 +203,20 @@ def test_toc_failure_falls_back_to_source_tracks():
     assert vs.album_title is None  # DiscID なしなのでメタデータ検索しない
 
 
+def test_toc_failure_fallback_computes_disc_id_from_source_positions():
+    class PositionedSource(FakeSource):
+        def list_tracks(self):  # cdparanoia -Q の begin 列が読めた
+            return [TrackRef(1, sectors=100, start=0),
+                    TrackRef(2, sectors=200, start=100)]
+
+    meta = FakeMeta(album=ALBUM)
+    c, _, _ = make_controller(toc=FakeToc(error=True), meta=meta,
+                              source=PositionedSource())
+    c.post(DiscInserted("/dev/sr0"))
+    assert c.process_pending().album_title == ALBUM.title
+    assert meta.calls[0][0] is not None
+
+
 def test_toc_and_source_failure_shows_error():
     c, _, _ = make_controller(toc=FakeToc(error=True),
                               source=FakeSource(fail=True))
@@ -144,6 +236,25 @@ def test_removal_stops_and_resets():
     assert source.closed
 
 
+def test_spin_up_shows_reading_and_warms_output():
+    c, engine, _ = make_controller()
+    c.post(DriveSpinningUp("/dev/sr0"))
+    vs = c.process_pending()
+    assert vs.state is AppState.READING
+    assert ("warm_output",) in engine.calls
+    c.post(DiscInserted("/dev/sr0"))
+    assert c.process_pending().state is AppState.PLAYING
+
+
+def test_spin_up_is_ignored_while_playing():
+    c, engine, _ = make_controller()
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    c.post(DriveSpinningUp("/dev/sr0"))
+    assert c.process_pending().state is AppState.PLAYING
+    assert ("warm_output",) not in engine.calls
+
+
 def test_not_audio_cd():
     c, _, _ = make_controller()
     c.post(NotAudioCd("/dev/sr0"))
@@ -183,6 +294,37 @@ def test_playback_error_then_retry_after_30s():
     assert engine.calls.count(("play", [1, 2])) == 2
 
 
+def test_retry_resumes_where_playback_stopped():
+    clock = [0.0]
+    c, engine, _ = make_controller(now_fn=lambda: clock[0])
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert engine.start is None
+    c.post(TrackChanged(2))
+    engine.position_seconds = 42.5
+    engine.played_audio = True
+    c.post(PlaybackError("device lost"))
+    c.process_pending()
+    clock[0] = 31.0
+    vs = c.process_pending()
+    assert engine.start == (2, 42.5)
+    assert vs.track_number == 2
+
+
+def test_retry_starts_over_when_nothing_was_played():
+    clock = [0.0]
+    c, engine, _ = make_controller(now_fn=lambda: clock[0])
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    c.post(TrackChanged(2))
+    engine.position_seconds = 42.5  # 前のディスクの位置が残っていても
+    c.post(PlaybackError("cannot open output"))
+    c.process_pending()
+    clock[0] = 31.0
+    c.process_pending()
+    assert engine.start is None
+
+
 def test_stale_toc_result_ignored_after_removal():
     jobs = []
     c, _, _ = make_controller(run_async=jobs.append)
@@ -227,3 +369,80 @@ def test_user_commands_only_while_playing():
     c.next_track()
     c.prev_track()
     assert engine.calls == []  # NO_DISC 中は何もしない
+
+
+class FakeAudioCache:
+    def __init__(self, complete):
+        self.complete = complete
+        self.touched = []
+        self.budget_checks = 0
+
+    def touch(self, disc_id):
+        self.touched.append(disc_id)
+
+    def is_complete(self, disc_id, tracks):
+        return self.complete
+
+    def source(self, disc_id):
+        return ("cached", disc_id)
+
+    def wrap(self, source, disc_id, tracks):
+        return ("ripping", source, disc_id)
+
+    def enforce_budget(self, keep=None):
+        self.budget_checks += 1
+
+
+def test_fully_ripped_disc_plays_from_cache():
+    cache = FakeAudioCache(complete=True)
+    c, engine, drive = make_controller(audio_cache=cache)
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert engine.source == ("cached", "abc123")
+    assert drive.closed  # ドライブ側の読み取りは使わない
+    assert cache.touched == ["abc123"]
+    assert cache.budget_checks == 1
+
+
+def test_unripped_disc_is_ripped_while_playing():
+    cache = FakeAudioCache(complete=False)
+    c, engine, drive = make_controller(audio_cache=cache)
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert engine.source == ("ripping", drive, "abc123")
+
+
+def test_disc_without_id_is_not_ripped():
+    cache = FakeAudioCache(complete=False)
+    c, engine, drive = make_controller(
+        toc=FakeToc(disc=DiscInfo(None, (TrackRef(1, 1.0, 75),))),
+        audio_cache=cache)
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert engine.source is drive
+
+
+class FakeBurstBuffer:
+    def __init__(self):
+        self.wrapped = []
+
+    def wrap(self, source, tracks):
+        self.wrapped.append((source, tracks))
+        return ("burst", source)
+
+
+def test_disc_is_read_into_memory_when_burst_is_enabled():
+    burst = FakeBurstBuffer()
+    c, engine, source = make_controller(burst_buffer=burst)
+    c.post(DiscInserted("/dev/sr0"))
+    c.process_pending()
+    assert burst.wrapped == [(source, DISC.tracks)]
+    assert engine.source == ("burst", source)
+
+
+def test_post_wakes_the_view():
+    c, _, _ = make_controller()
+    woken = []
+    c.set_wakeup(lambda: woken.append(1))
+    c.post(TrackChanged(2))
+    assert woken == [1]
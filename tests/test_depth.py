@@ -0,0 +1,46 @@
+from src.audio.depth import (BYTES_PER_SECOND, INITIAL_SECONDS, MIN_SECONDS,
+                             AdaptiveDepth, describe)
+
+
+def feed(depth, reads, nbytes, elapsed):
+    for _ in range(reads):
+        depth.record(nbytes, elapsed)
+
+
+def test_initial_depth_until_enough_reads():
+    depth = AdaptiveDepth()
+    feed(depth, 3, 16384, 0.01)
+    assert depth.target_bytes() == int(INITIAL_SECONDS * BYTES_PER_SECOND)
+
+
+def test_healthy_fast_drive_shrinks_to_minimum():
+    depth = AdaptiveDepth()
+    feed(depth, 20, BYTES_PER_SECOND, 0.1)  # 10 倍速・停止なし
+    assert depth.target_bytes() == int(MIN_SECONDS * BYTES_PER_SECOND)
+
+
+def test_long_stall_deepens_buffer_up_to_ceiling():
+    depth = AdaptiveDepth(ceiling_bytes=20 * BYTES_PER_SECOND)
+    feed(depth, 20, BYTES_PER_SECOND, 0.1)
+    depth.record(16384, 6.0)  # 6 秒止まった
+    assert depth.target_bytes() == int(14 * BYTES_PER_SECOND)
+    depth.record(16384, 30.0)
+    assert depth.target_bytes() == 20 * BYTES_PER_SECOND
+
+
+def test_first_read_of_track_is_not_a_stall():
+    depth = AdaptiveDepth()
+    depth.record(16384, 20.0, first=True)
+    feed(depth, 20, BYTES_PER_SECOND, 0.1)
+    assert depth.disc.longest_gap < 1
+
+
+def test_lap_and_start_disc_reset_stats():
+    depth = AdaptiveDepth()
+    feed(depth, 2, BYTES_PER_SECOND, 0.5)
+    lap = depth.lap()
+    assert lap.speed == 2.0
+    assert "2.0 倍速" in describe(lap)
+    assert depth.lap().speed is None
+    depth.start_disc()
+    assert depth.disc.reads == 0
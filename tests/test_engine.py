@@ -1,4 +1,5 @@
 import sys
+import threading
 import time
 
 import pytest
@@ -58,6 +59,21 @@ class ScriptedSource:
         pass
 
 
+class SpanSource(ScriptedSource):
+    """ディスク全体を 1 本の連続 PCM として返すフェイク(open_from 対応)。"""
+
+    def __init__(self, pcm, chunk_bytes=CHUNK_BYTES):
+        super().__init__({})
+        self.pcm = pcm
+        self.chunk_bytes = chunk_bytes
+        self.spans = []
+
+    def open_from(self, n):
+        self.spans.append(n)
+        return (self.pcm[i:i + self.chunk_bytes]
+                for i in range(0, len(self.pcm), self.chunk_bytes))
+
+
 def make_engine(events):
     stream = FakeStream()
     engine = PlaybackEngine(events.append, stream_factory=lambda: stream,
@@ -81,6 +97,105 @@ def test_plays_all_tracks_in_order_and_finishes():
     assert stream.closed
 
 
+def test_next_track_is_opened_before_current_track_finishes_playing():
+    """前のトラックを読み切った時点で次を開き、先読みをつなぐ。
+
+    トラック 1 の最後のチャンクが出力されるより前に、トラック 2 の
+    読み取りが始まっていること(境界でバッファが空にならない)。
+    """
+    events = []
+    engine, stream = make_engine(events)
+    opened_at = {}
+
+    class RecordingSource(ScriptedSource):
+        def open(self, n):
+            opened_at[n] = stream.written
+            return super().open(n)
+
+    src = RecordingSource({1: make_chunks(20), 2: make_chunks(2)})
+    engine.play(src, [1, 2])
+    assert wait_until(lambda: finished(events))
+    assert opened_at[2] < 20 * CHUNK_BYTES
+    assert [e.number for e in events if isinstance(e, TrackChanged)] == [1, 2]
+    assert stream.written == 22 * CHUNK_BYTES
+
+
+def test_chained_track_that_fails_to_open_is_skipped():
+    events = []
+    engine, stream = make_engine(events)
+
+    class BrokenSecondTrack(ScriptedSource):
+        def open(self, n):
+            if n == 2:
+                self.opened.append(n)
+                raise OSError("read error")
+            return super().open(n)
+
+    src = BrokenSecondTrack({1: make_chunks(2), 3: make_chunks(2)})
+    engine.play(src, [1, 2, 3])
+    assert wait_until(lambda: finished(events))
+    assert [e.number for e in events if isinstance(e, TrackSkipped)] == [2]
+    assert stream.written == 4 * CHUNK_BYTES
+
+
+def test_continuous_read_cuts_track_boundaries_at_exact_frame():
+    """連続読みでは 1 本のストリームを TOC のセクタ長で切る。
+
+    境界はチャンクの途中にあってもよい。TrackChanged は境界のフレームを
+    書き終えた時点で出す(ストリームの書き込み位置で確認する)。
+    """
+    sector = 588 * 4
+    lengths = [3, 5, 2]  # セクタ
+    pcm = b"".join(bytes([n]) * (sector * k)
+                   for n, k in zip((1, 2, 3), lengths))
+    stream = FakeStream()
+    marks = []
+    engine = PlaybackEngine(
+        lambda e: marks.append((e, stream.written)),
+        stream_factory=lambda: stream, stall_timeout=1.0)
+    src = SpanSource(pcm, chunk_bytes=1000)  # セクタ境界と揃わない
+    engine.play(src, [1, 2, 3], track_sectors=lengths)
+    assert wait_until(lambda: finished([e for e, _ in marks]))
+    changes = [(e.number, pos) for e, pos in marks
+               if isinstance(e, TrackChanged)]
+    assert changes == [(1, 0), (2, 3 * sector), (3, 8 * sector)]
+    assert src.spans == [1] and src.opened == []  # プロセスは 1 本だけ
+    assert stream.written == len(pcm)
+
+
+def test_continuous_read_restarts_span_on_jump():
+    events = []
+    engine, stream = make_engine(events)
+    src = SpanSource(b"\x00" * CHUNK_BYTES * 2000)
+    engine.play(src, [1, 2, 3], track_sectors=[10000, 10000, 10000])
+    assert wait_until(lambda: stream.written > 0)
+    engine.next_track()
+    assert wait_until(lambda: src.spans == [1, 2])
+    engine.stop()
+
+
+def test_unknown_lengths_fall_back_to_per_track_reads():
+    events = []
+    engine, stream = make_engine(events)
+    src = SpanSource(b"")
+    src.tracks = {1: make_chunks(1), 2: make_chunks(1)}
+    engine.play(src, [1, 2], track_sectors=[None, 100])
+    assert wait_until(lambda: finished(events))
+    assert src.opened == [1, 2] and src.spans == []
+
+
+def test_buffer_stats_report_prefetch_fill():
+    events = []
+    engine, stream = make_engine(events)
+    src = ScriptedSource({1: make_chunks(3)})
+    engine.play(src, [1])
+    assert wait_until(lambda: finished(events))
+    stats = engine.buffer_stats()
+    assert stats["depth_seconds"] >= 4
+    assert 0 < stats["high_water"] <= stats["capacity"]
+    assert stats["read_speed"] is not None
+
+
 def test_pause_stops_output():
     events = []
     engine, stream = make_engine(events)
@@ -185,6 +300,26 @@ def test_stream_init_failure_posts_error():
         lambda: any(isinstance(e, PlaybackError) for e in events))
 
 
+def test_failed_open_on_next_disc_does_not_keep_old_position():
+    events = []
+    streams = [FakeStream()]
+
+    def factory():
+        if not streams:
+            raise RuntimeError("no device")
+        return streams.pop()
+
+    engine = PlaybackEngine(events.append, stream_factory=factory)
+    engine.play(ScriptedSource({1: make_chunks(3)}), [1])
+    assert wait_until(lambda: finished(events))
+    assert engine.played_audio and engine.position_seconds > 0
+    engine.play(ScriptedSource({1: make_chunks(3)}), [1])
+    assert wait_until(
+        lambda: any(isinstance(e, PlaybackError) for e in events))
+    assert not engine.played_audio
+    assert engine.position_seconds == 0
+
+
 def test_stop_is_responsive():
     events = []
     engine, stream = make_engine(events)
@@ -195,3 +330,424 @@ def test_stop_is_responsive():
     engine.stop()
     assert time.time() - t0 < 2.0
     assert not finished(events)
+
+
+def test_prefetch_depth_follows_read_stalls():
+    events = []
+    engine, stream = make_engine(events)
+
+    class SlowChunks:
+        """読み取りのたびに少し止まるドライブ。"""
+
+        def __iter__(self):
+            for i in range(12):
+                if i:
+                    time.sleep(0.05)
+                yield b"\x00" * CHUNK_BYTES
+
+    class SlowSource(ScriptedSource):
+        def open(self, track_no):
+            self.opened.append(track_no)
+            return SlowChunks()
+
+    engine.play(SlowSource({1: []}), [1])
+    assert wait_until(lambda: finished(events))
+    stats = engine.buffer_stats()
+    # 停止が短いので、初期値の 8 秒から下限の 4 秒まで縮む
+    assert stats["longest_gap"] >= 0.04
+    assert stats["depth_seconds"] == pytest.approx(4, abs=0.01)
+
+
+def counting_engine(events):
+    streams = []
+
+    def factory():
+        streams.append(FakeStream())
+        return streams[-1]
+
+    engine = PlaybackEngine(events.append, stream_factory=factory,
+                            stall_timeout=1.0)
+    return engine, streams
+
+
+def test_warm_up_is_reused_when_toc_confirms_track_one():
+    events = []
+    engine, streams = counting_engine(events)
+    pcm = bytes(i % 251 for i in range(10 * 588 * 4))  # 10 セクタ分
+    src = SpanSource(pcm)
+    engine.prepare(src)
+    assert wait_until(lambda: src.spans == [1] and len(streams) == 1)
+    time.sleep(0.05)  # TOC の読み取りに時間がかかった想定
+    engine.play(src, [1, 2], track_sectors=[5, 5])
+    assert wait_until(lambda: finished(events))
+    assert src.spans == [1]  # 開き直していない
+    assert len(streams) == 1 and streams[0].written == len(pcm)
+    assert 0 < engine.last_warm_up.saved < 1
+
+
+def test_output_opened_during_spin_up_is_used_by_prepare():
+    events = []
+    engine, streams = counting_engine(events)
+    engine.warm_output()
+    assert wait_until(lambda: len(streams) == 1 and streams[0].started)
+    pcm = bytes(10 * 588 * 4)
+    src = SpanSource(pcm)
+    engine.prepare(src)
+    engine.play(src, [1, 2], track_sectors=[5, 5])
+    assert wait_until(lambda: finished(events))
+    assert len(streams) == 1 and streams[0].written == len(pcm)
+
+
+def test_warm_up_is_discarded_on_stop_or_other_source():
+    events = []
+    engine, streams = counting_engine(events)
+    closed = []
+
+    class ClosingSource(ScriptedSource):
+        def open(self, n):
+            reader = super().open(n)
+
+            class Reader:
+                def __iter__(self):
+                    return reader
+
+                def close(self):
+                    closed.append(n)
+            return Reader()
+
+    engine.prepare(ClosingSource({1: make_chunks(1)}))
+    engine.stop()
+    assert wait_until(lambda: streams and streams[0].closed and closed == [1])
+
+    engine.prepare(ClosingSource({1: make_chunks(1)}))
+    other = ScriptedSource({1: make_chunks(2)})
+    engine.play(other, [1])
+    assert wait_until(lambda: finished(events))
+    assert wait_until(lambda: streams[1].closed and closed == [1, 1])
+    assert other.opened == [1] and streams[2].written == 2 * CHUNK_BYTES
+
+
+def record_waits(cond):
+    """cond.wait に渡された timeout を記録する(刻んで見回っていないかを見る)。"""
+    timeouts = []
+    wait = cond.wait
+
+    def recording(timeout=None):
+        timeouts.append(timeout)
+        return wait(timeout)
+    cond.wait = recording
+    return timeouts
+
+
+def test_skip_during_stalled_read_acts_at_once():
+    """読み取りが止まっている間の曲送りも、起こされてすぐ効く。
+
+    停止の閾値(60 秒)まで待たずに終わるのは、曲送りが待ちを起こした
+    ときだけ。待ちはその閾値までの 1 回きりで、短い間隔で見回らない。
+    キー入力から次のトラックの最初のサンプルまでは last_skip_latency に残る。
+    """
+    events = []
+    stream = FakeStream()
+    engine = PlaybackEngine(events.append, stream_factory=lambda: stream,
+                            stall_timeout=60.0, start_timeout=60.0)
+    waits = record_waits(engine._ring._cond)
+    release = threading.Event()
+
+    class StallingSource(ScriptedSource):
+        def open(self, n):
+            self.opened.append(n)
+            if n == 2:
+                return iter(make_chunks(2))
+
+            def gen():
+                yield b"\x00" * CHUNK_BYTES
+                release.wait(10)  # ドライブが止まったまま
+            return gen()
+
+    engine.play(StallingSource({}), [1, 2])
+    assert wait_until(lambda: stream.written == CHUNK_BYTES
+                      and engine.buffer_stats()["underruns"] > 0)
+    engine.next_track()
+    assert wait_until(lambda: finished(events))
+    release.set()
+    assert engine.last_skip_latency is not None
+    assert stream.written == 3 * CHUNK_BYTES
+    assert all(t is None or t > 30 for t in waits)
+
+
+def test_paused_engine_sleeps_without_cpu():
+    events = []
+    engine, stream = make_engine(events)
+    engine.play(ScriptedSource({1: make_chunks(2000)}), [1])
+    assert wait_until(lambda: stream.written > 0)
+    waits = record_waits(engine._lock)
+    engine.toggle_pause()
+    # 一時停止中は期限なしで眠り、起こされるまで戻らない(見回らない)
+    assert wait_until(lambda: waits)
+    assert all(t is None for t in waits)
+    thread = engine._thread
+    engine.stop()  # 一時停止中でも起こされてすぐ止まる
+    assert not thread.is_alive()
+
+
+def frame_pcm(first, count):
+    """各フレームに通し番号を書いた PCM(どのフレームか中身で分かる)。"""
+    return b"".join((first + i).to_bytes(4, "little") for i in range(count))
+
+
+class RecordingStream(FakeStream):
+    def __init__(self):
+        super().__init__()
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+        super().write(data)
+
+
+class DiscSource(ScriptedSource):
+    """セクタ長どおりに並んだディスク。open / open_from ともにシーク対応。"""
+
+    def __init__(self, sectors, gapless=True):
+        super().__init__({})
+        self.starts = [sum(sectors[:i]) * 588 for i in range(len(sectors))]
+        self.pcm = frame_pcm(0, sum(sectors) * 588)
+        self.ends = self.starts[1:] + [sum(sectors) * 588]
+        self.requests = []
+        if gapless:
+            self.open_from = self._open_from
+
+    def _chunks(self, first, last):
+        data = self.pcm[first * 4:last * 4]
+        return (data[i:i + CHUNK_BYTES] for i in range(0, len(data), CHUNK_BYTES))
+
+    def open(self, n, start_frame=0):
+        self.requests.append(("open", n, start_frame))
+        return self._chunks(self.starts[n - 1] + start_frame, self.ends[n - 1])
+
+    def _open_from(self, n, start_frame=0):
+        self.requests.append(("open_from", n, start_frame))
+        return self._chunks(self.starts[n - 1] + start_frame, self.ends[-1])
+
+
+def test_play_from_position_is_frame_exact_and_keeps_track_boundary():
+    events = []
+    stream = RecordingStream()
+    engine = PlaybackEngine(events.append, stream_factory=lambda: stream)
+    src = DiscSource([5, 5])
+    engine.play(src, [1, 2], track_sectors=[5, 5], start=(1, 1000 / 44100))
+    assert wait_until(lambda: finished(events))
+    assert src.requests == [("open_from", 1, 1000)]
+    assert bytes(stream.data) == src.pcm[1000 * 4:]
+    changed = [e.number for e in events if isinstance(e, TrackChanged)]
+    assert changed == [1, 2]
+
+
+def test_seek_during_playback_moves_to_exact_frame():
+    events = []
+    stream = RecordingStream()
+    engine = PlaybackEngine(events.append, stream_factory=lambda: stream)
+    src = DiscSource([2000, 5], gapless=False)
+    engine.play(src, [1, 2], track_sectors=[None, None])
+    assert wait_until(lambda: len(stream.data) > 0)
+    engine.seek(2, 0.05)
+    assert wait_until(lambda: finished(events))
+    frame = round(0.05 * 44100)
+    assert src.requests[-1] == ("open", 2, frame)
+    tail = src.pcm[(src.starts[1] + frame) * 4:]
+    assert bytes(stream.data).endswith(tail)
+    assert engine.position_seconds == pytest.approx(5 * 588 / 44100)
+    assert engine.last_skip_latency is not None
+    with pytest.raises(ValueError):
+        engine.seek(9, 0)
+
+
+class ScratchedDisc(DiscSource):
+    """frames [first, last) の範囲(ディスク上の通し位置)が読めないディスク。"""
+
+    def __init__(self, sectors, first, last):
+        super().__init__(sectors)
+        self.scratch = (first, last)
+
+    def _chunks(self, first, last):
+        pos = first
+        for data in super()._chunks(first, last):
+            end = pos + len(data) // 4
+            if pos < self.scratch[1] and end > self.scratch[0]:
+                raise SourceStallError("scratch")
+            yield data
+            pos = end
+
+
+def scratch_engine(events, stream):
+    return PlaybackEngine(events.append, stream_factory=lambda: stream,
+                          stall_timeout=0.2)
+
+
+def test_stall_resumes_past_the_scratch_instead_of_skipping():
+    events = []
+    stream = RecordingStream()
+    engine = scratch_engine(events, stream)
+    src = ScratchedDisc([100, 5], 8192, 9000)
+    engine.play(src, [1, 2], track_sectors=[100, 5])
+    assert wait_until(lambda: finished(events), timeout=5.0)
+    restart = 8192 + 22050  # 止まった位置 + 0.5 秒
+    assert src.requests == [("open_from", 1, 0), ("open_from", 1, restart)]
+    assert bytes(stream.data) == src.pcm[:8192 * 4] + src.pcm[restart * 4:]
+    assert not [e for e in events if isinstance(e, TrackSkipped)]
+    stats = engine.buffer_stats()
+    assert stats["stalls"] == 1 and stats["abandoned_tracks"] == 0
+    assert stats["skipped_seconds"] == pytest.approx(0.5)
+    assert stats["recovered_seconds"] == pytest.approx(
+        (100 * 588 - restart) / 44100)
+
+
+def test_track_is_skipped_when_recovery_runs_out():
+    events = []
+    stream = RecordingStream()
+    engine = scratch_engine(events, stream)
+    src = ScratchedDisc([100, 5], 8192, 100 * 588)  # 1 曲目の後半すべて
+    engine.play(src, [1, 2], track_sectors=[100, 5])
+    assert wait_until(lambda: finished(events), timeout=5.0)
+    skipped = [e.number for e in events if isinstance(e, TrackSkipped)]
+    assert skipped == [1]
+    # 0.5 秒先で再び止まり、次の 1 秒先はトラックの外なので諦める
+    assert src.requests[-1] == ("open_from", 2, 0)
+    assert bytes(stream.data).endswith(src.pcm[100 * 588 * 4:])
+    stats = engine.buffer_stats()
+    assert stats["stalls"] == 2 and stats["abandoned_tracks"] == 1
+
+
+def test_stall_is_reported_so_the_source_can_read_more_carefully():
+    events = []
+    stream = RecordingStream()
+    engine = scratch_engine(events, stream)
+    src = ScratchedDisc([100, 5], 8192, 9000)
+    src.troubles = []
+    src.report_trouble = lambda n, reason: src.troubles.append(n)
+    engine.play(src, [1, 2], track_sectors=[100, 5])
+    assert wait_until(lambda: finished(events), timeout=5.0)
+    assert src.troubles == [1]
+
+
+class HeldGuard:
+    """先読みが hold_at 回目に open_lock を取ろうとしたところで止める。"""
+
+    def __init__(self, hold_at):
+        self._entries = 0
+        self._hold_at = hold_at
+        self.waiting = threading.Event()
+        self.release = threading.Event()
+        self.left = threading.Event()
+
+    def __enter__(self):
+        self._entries += 1
+        if self._entries == self._hold_at:
+            self.waiting.set()
+            self.release.wait()
+
+    def __exit__(self, *exc):
+        if self._entries == self._hold_at:
+            self.left.set()
+
+
+def test_stopped_prefetch_does_not_open_the_next_track():
+    """止めた後に古い先読みが次のトラックを開くと、閉じたソースが動き出す。"""
+    events = []
+    engine, stream = make_engine(events)
+    src = ScriptedSource({1: make_chunks(1), 2: make_chunks(1)})
+    src.open_lock = HeldGuard(hold_at=2)  # 2 回目 = トラック 2 を開く前
+    engine.play(src, [1, 2])
+    assert src.open_lock.waiting.wait(2.0)
+    engine.stop()
+    src.open_lock.release.set()
+    assert src.open_lock.left.wait(2.0)
+    assert src.opened == [1]
+
+
+class SleepyDrive(ScriptedSource):
+    """gate_at チャンク目の手前で、gate が開くまで読みが止まる(止まったドライブ)。"""
+
+    def __init__(self, chunks, gate_at):
+        super().__init__({1: make_chunks(chunks)})
+        self.gate_at = gate_at
+        self.gate = threading.Event()
+        self.keep_alives = []
+        self.spin_ups = 0
+
+    def open(self, n):
+        self.opened.append(n)
+
+        def gen():
+            for i, chunk in enumerate(self.tracks[n]):
+                if i == self.gate_at:
+                    self.gate.wait()
+                yield chunk
+        return gen()
+
+    def keep_alive(self):
+        self.keep_alives.append(time.monotonic())
+        return True
+
+    def expect_spin_up(self):
+        self.spin_ups += 1
+
+
+def test_wait_ended_by_stop_is_not_reported_as_slow_read(monkeypatch):
+    """止めた・曲送りしたことで終わった待ちは、読み取りの遅れではない。"""
+    monkeypatch.setattr("src.audio.engine.SLOW_READ_SECONDS", 0.0)
+    events = []
+    engine, stream = make_engine(events)
+    src = SleepyDrive(5, gate_at=1)  # 1 チャンク目の後は届かない
+    src.troubles = []
+    src.report_trouble = lambda n, reason: src.troubles.append(reason)
+    engine.play(src, [1])
+    assert wait_until(lambda: stream.written > 0)
+    engine.stop()
+    src.gate.set()
+    assert src.troubles == []
+
+
+def test_pause_keeps_drive_spinning_for_a_while(monkeypatch):
+    monkeypatch.setattr("src.audio.engine.KEEP_ALIVE_INTERVAL", 0.02)
+    events = []
+    stream = FakeStream()
+    engine = PlaybackEngine(events.append, stream_factory=lambda: stream,
+                            keep_alive_seconds=0.1)
+    src = SleepyDrive(50, gate_at=40)
+    src.gate.set()
+    engine.play(src, [1])
+    assert wait_until(lambda: stream.written > 0)
+    waits = record_waits(engine._lock)
+    engine.toggle_pause()
+    # keep_alive_seconds の間は KEEP_ALIVE_INTERVAL ごとに起きてドライブへ
+    # 読みを送り、過ぎたら期限なしで眠る(以後は何も送らない)
+    assert wait_until(lambda: None in waits)
+    assert src.keep_alives
+    assert all(0 < t <= 0.02 for t in waits[:waits.index(None)])
+    sent = len(src.keep_alives)
+    engine.toggle_pause()
+    assert wait_until(lambda: finished(events))
+    assert len(src.keep_alives) == sent
+    assert src.spin_ups == 0
+
+
+def test_resume_after_long_pause_waits_for_cold_drive(monkeypatch):
+    """止まったドライブの立ち上がりが stall_timeout より長くてもスキップしない。"""
+    monkeypatch.setattr("src.audio.engine.COLD_PAUSE_SECONDS", 0.05)
+    events = []
+    stream = FakeStream()
+    engine = PlaybackEngine(events.append, stream_factory=lambda: stream,
+                            stall_timeout=0.2, start_timeout=3.0,
+                            keep_alive_seconds=0)
+    src = SleepyDrive(50, gate_at=40)
+    engine.play(src, [1])
+    assert wait_until(lambda: stream.written > 0)
+    engine.toggle_pause()
+    time.sleep(0.1)
+    engine.toggle_pause()
+    threading.Timer(0.6, src.gate.set).start()  # 再開から 0.6 秒で回り出す
+    assert wait_until(lambda: finished(events), timeout=5.0)
+    assert not [e for e in events if isinstance(e, TrackSkipped)]
+    assert stream.written == 50 * CHUNK_BYTES
+    assert src.spin_ups == 1
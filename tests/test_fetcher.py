@@ -1,6 +1,13 @@
+import dataclasses
+
+import requests
+
 from src.core.events import TrackMeta
 from src.metadata.cache import MetadataCache
-from src.metadata.fetcher import MetadataService, parse_release
+from src.metadata.fetcher import (COVER_RETRY_SECONDS, MetadataFetcher,
+                                  MetadataService, lucene_phrase,
+                                  parse_release)
+from src.metadata.http import HttpResponse
 
 RELEASE = {
     "id": "rel-1",
@@ -30,17 +37,66 @@ def test_parse_release_missing_fields():
 
 
 class FakeFetcher:
-    def __init__(self, album=None):
+    def __init__(self, album=None, covers=(b"img",)):
         self.album = album
+        self.covers = list(covers)  # 呼ばれるたびに先頭から返す
         self.fetch_calls = 0
+        self.cover_calls = 0
 
     def fetch(self, disc_id, fallback_title=None):
         self.fetch_calls += 1
         return (self.album, "rel-1") if self.album else None
 
     def fetch_cover(self, release_id):
-        return b"img"
+        self.cover_calls += 1
+        cover = self.covers.pop(0) if len(self.covers) > 1 else self.covers[0]
+        if isinstance(cover, Exception):
+            raise cover
+        return cover
+
+
+
+def test_title_search_escapes_lucene_syntax():
+    assert lucene_phrase('Say "Hi"') == r'"Say \"Hi\""'
+    assert lucene_phrase(r"AC/DC: Live (1) \ x") == \
+        r'"AC\/DC\: Live \(1\) \\ x"'
+    assert lucene_phrase("Kind of Blue") == '"Kind of Blue"'
+
+
+
+class FakeHttp:
+    """DiscID の問い合わせにだけ status を返し、他は 404(未登録)。"""
+
+    def __init__(self, status=None, error=None):
+        self.status = status
+        self.error = error
+        self.urls = []
 
+    def get(self, url, timeout=15.0, headers=None):
+        self.urls.append(url)
+        if "/discid/" in url:
+            if self.error is not None:
+                raise self.error
+            return HttpResponse(self.status, b"")
+        return HttpResponse(404, b"")
+
+
+def make_mb(http):
+    return MetadataFetcher(http=http, musicbrainz_url="http://mb",
+                           min_interval=0.0)
+
+
+def test_http_error_on_disc_id_falls_back_to_title_search():
+    http = FakeHttp(status=503)
+    assert make_mb(http).fetch("abc", fallback_title="Kind of Blue") is None
+    assert len(http.urls) == 2
+    assert "release" in http.urls[1] and "Kind+of+Blue" in http.urls[1]
+
+
+def test_connection_error_skips_title_search():
+    http = FakeHttp(error=requests.ConnectionError("offline"))
+    assert make_mb(http).fetch("abc", fallback_title="Kind of Blue") is None
+    assert len(http.urls) == 1
 
 def test_service_fetches_then_caches(tmp_path):
     album = parse_release(RELEASE)
@@ -49,10 +105,32 @@ def test_service_fetches_then_caches(tmp_path):
                               fetcher=fetcher)
     first = service.get("abc123")
     assert first.title == "Kind of Blue"
-    assert first.cover_path is not None
+    assert first.cover_path is None  # 曲名はカバーを待たない
+    assert fetcher.cover_calls == 0
+    cover = service.get_cover("abc123")
+    assert cover is not None
     second = service.get("abc123")
-    assert second == first
+    assert second == dataclasses.replace(first, cover_path=cover)
+    assert service.get_cover("abc123") == cover
     assert fetcher.fetch_calls == 1  # 2 回目はキャッシュヒット
+    assert fetcher.cover_calls == 1
+
+
+def test_missing_cover_is_retried_without_refetching_titles(tmp_path):
+    now = [1000.0]
+    fetcher = FakeFetcher(parse_release(RELEASE),
+                          covers=[requests.ConnectionError("offline"),
+                                  None, b"img"])
+    service = MetadataService(cache=MetadataCache(root=tmp_path),
+                              fetcher=fetcher, now_fn=lambda: now[0])
+    service.get("abc123")
+    assert service.get_cover("abc123") is None  # 通信失敗
+    assert service.get_cover("abc123") is None  # CAA に登録なし
+    assert service.get_cover("abc123") is None  # しばらくは探さない
+    assert fetcher.cover_calls == 2
+    now[0] += COVER_RETRY_SECONDS
+    assert service.get_cover("abc123") is not None
+    assert fetcher.fetch_calls == 1
 
 
 def test_service_not_found(tmp_path):
@@ -0,0 +1,154 @@
+"""ローカルの HTTP サーバーを MusicBrainz / Cover Art Archive に見立てる。"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.metadata.fetcher import MetadataFetcher, thumbnail_size
+from src.metadata.http import HttpClient
+
+RELEASE_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#">
+<disc id="abc123"><release-list count="1"><release id="rel-1">
+<title>Kind of Blue</title>
+<artist-credit><name-credit><artist id="a1"><name>Miles Davis</name>
+</artist></name-credit></artist-credit>
+<medium-list count="1"><medium><track-list count="2">
+<track id="t1"><position>1</position>
+<recording id="r1"><title>So What</title></recording></track>
+<track id="t2"><position>2</position>
+<recording id="r2"><title>Freddie Freeloader</title></recording></track>
+</track-list></medium></medium-list>
+</release></release-list></disc></metadata>
+"""
+COVER = b"\xff\xd8jpeg" * 1000
+THUMBS = {"500": b"\xff\xd8small", "1200": b"\xff\xd8large"}
+ETAG = '"cover-v1"'
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = 0
+    log = []  # (path, status)
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+
+    def do_GET(self):
+        if self.path.startswith("/ws/2/discid/abc123"):
+            self._send(200, RELEASE_XML, {"Content-Type": "application/xml"})
+        elif self.path in ("/release/rel-1/front", "/release/old/front"):
+            # CAA は画像の実体(archive.org)へリダイレクトする
+            self._send(307, b"", {"Location": "/img/rel-1.jpg"})
+        elif self.path.startswith("/release/rel-1/front-"):
+            size = self.path.rsplit("-", 1)[1]
+            self._send(307, b"", {"Location": f"/img/rel-1_{size}.jpg"})
+        elif self.path.startswith("/img/rel-1_"):
+            size = self.path[len("/img/rel-1_"):-len(".jpg")]
+            self._send(200, THUMBS[size], {"ETag": f'"{size}"'})
+        elif self.path == "/img/rel-1.jpg":
+            if self.headers.get("If-None-Match") == ETAG:
+                self._send(304, b"", {"ETag": ETAG})
+            else:
+                self._send(200, COVER, {"ETag": ETAG,
+                                        "Content-Type": "image/jpeg"})
+        else:
+            self._send(404, b"not found", {})
+
+    def _send(self, status, body, headers):
+        type(self).log.append((self.path, status))
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandIn.connections = 0
+    StandIn.log = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_fetcher(url, tmp_path, cover_size=None):
+    http = HttpClient("cdp-test", cache_dir=tmp_path)
+    return MetadataFetcher(http=http, musicbrainz_url=url + "/ws/2",
+                           cover_art_url=url, min_interval=0.0,
+                           cover_size=cover_size), http
+
+
+def test_lookup_and_cover_share_one_connection(server, tmp_path):
+    fetcher, http = make_fetcher(server, tmp_path)
+    album, release_id = fetcher.fetch("abc123")
+    assert album.title == "Kind of Blue"
+    assert album.artist == "Miles Davis"
+    assert [t.title for t in album.tracks] == ["So What",
+                                               "Freddie Freeloader"]
+    assert fetcher.fetch_cover(release_id) == COVER
+    # MB の問い合わせ、CAA、リダイレクト先の 3 リクエストで接続は 1 本
+    assert len(StandIn.log) == 3
+    assert StandIn.connections == 1
+    http.close()
+
+
+def test_cached_cover_is_refreshed_with_304(server, tmp_path):
+    fetcher, http = make_fetcher(server, tmp_path)
+    assert fetcher.fetch_cover("rel-1") == COVER
+    http.close()
+    # 再起動後: キャッシュは残り、画像は送り直されない
+    fetcher, http = make_fetcher(server, tmp_path)
+    StandIn.log = []
+    assert fetcher.fetch_cover("rel-1") == COVER
+    assert StandIn.log[-1] == ("/img/rel-1.jpg", 304)
+    http.close()
+
+
+def test_unknown_disc_is_not_an_error(server, tmp_path):
+    fetcher, http = make_fetcher(server, tmp_path)
+    assert fetcher.fetch("unknown") is None
+    assert fetcher.fetch_cover("rel-2") is None  # CAA に登録なし
+    http.close()
+
+
+def test_thumbnail_fits_the_art_size():
+    assert thumbnail_size(200) == 250
+    assert thumbnail_size(504) == 500  # 720p の 70%
+    assert thumbnail_size(756) == 1200  # 1080p の 70%
+    assert thumbnail_size(1512) == 1200  # 4K でも原寸は取らない
+
+
+def test_fetches_screen_sized_thumbnail(server, tmp_path):
+    fetcher, http = make_fetcher(server, tmp_path, cover_size=500)
+    assert fetcher.fetch_cover("rel-1") == THUMBS["500"]
+    assert ("/img/rel-1.jpg", 200) not in StandIn.log  # 原寸は取らない
+    # 縮小版のない古い登録だけ原寸へ
+    assert fetcher.fetch_cover("old") == COVER
+    http.close()
+
+
+
+def test_response_cache_drops_least_recently_used_past_the_limit(
+        server, tmp_path):
+    fetcher, http = make_fetcher(server, tmp_path, cover_size=500)
+    http.max_bytes = len(COVER) + len(THUMBS["500"])
+    fetcher.fetch_cover("old")  # 原寸
+    fetcher.fetch_cover("rel-1")  # 500 px。ここで上限ちょうど
+    assert len(list(tmp_path.glob("*.body"))) == 2
+    assert fetcher.fetch_cover("old") == COVER  # 304 で使い直す
+    large = MetadataFetcher(http=http, cover_art_url=server, min_interval=0.0,
+                            cover_size=1200)
+    large.fetch_cover("rel-1")
+    # いちばん長く使われていない 500 px が消える
+    bodies = sorted(p.read_bytes() for p in tmp_path.glob("*.body"))
+    assert bodies == sorted([COVER, THUMBS["1200"]])
+    http.close()
@@ -5,11 +5,12 @@
 音声デバイスだけフェイクにする。
 """
 import struct
+import threading
 
 import soundfile as sf
 
 from src.audio.engine import PlaybackEngine
-from src.audio.sources import AiffFileSource
+from src.audio.sources import AiffFileSource, FileTreeSource
 from src.core.controller import AppController
 from src.core.events import AppState, DiscInserted, DiscRemoved
 from src.disc.toc import TocError
@@ -38,7 +39,12 @@ class FakeStream:
 class FailingToc:
     """DiscID を読めないディスクを模す(ソース列挙へのフォールバックを通す)。"""
 
+    def __init__(self, release: threading.Event | None = None):
+        self.release = release  # セットされるまで読み取りを終えない
+
     def read(self, device):
+        if self.release is not None:
+            self.release.wait()
         raise TocError("no drive")
 
 
@@ -64,8 +70,9 @@ def test_insert_plays_all_tracks_then_finishes(tmp_path):
     controller_ref = []
     engine = PlaybackEngine(post_event=lambda e: controller_ref[0].post(e),
                             stream_factory=lambda: stream)
+    toc_done = threading.Event()
     controller = AppController(
-        toc_reader=FailingToc(),
+        toc_reader=FailingToc(release=toc_done),
         engine=engine,
         metadata_service=NoMetadata(),
         source_factory=lambda device: AiffFileSource(device))
@@ -74,6 +81,7 @@ def test_insert_plays_all_tracks_then_finishes(tmp_path):
     controller.post(DiscInserted(str(tmp_path)))
     # TOC 読取はワーカースレッドなので、挿入直後はまだ READING
     assert controller.process_pending().state is AppState.READING
+    toc_done.set()
 
     assert wait_until(
         lambda: controller.process_pending().state is AppState.PLAYING)
@@ -89,3 +97,36 @@ def test_insert_plays_all_tracks_then_finishes(tmp_path):
 
     controller.post(DiscRemoved(str(tmp_path)))
     assert controller.process_pending().state is AppState.NO_DISC
+
+
+def test_ripped_file_tree_plays_gapless(tmp_path):
+    """WAV のディレクトリは FileTreeSource で、TOC 長から連続読みされる。"""
+    frames = []
+    for n in (1, 2):
+        data = struct.pack("<h", n) * (int(44100 * TRACK_SECONDS) * 2)
+        with sf.SoundFile(str(tmp_path / f"{n:02d}.wav"), "w",
+                          samplerate=44100, channels=2, subtype="PCM_16",
+                          format="WAV") as f:
+            f.buffer_write(data, dtype="int16")
+        frames.append(len(data) // 4)
+
+    stream = FakeStream()
+    controller_ref = []
+    engine = PlaybackEngine(post_event=lambda e: controller_ref[0].post(e),
+                            stream_factory=lambda: stream)
+    source = FileTreeSource(str(tmp_path))
+    spans = []
+    open_from = source.open_from
+    source.open_from = lambda n: (spans.append(n), open_from(n))[1]
+    controller = AppController(
+        toc_reader=FailingToc(), engine=engine,
+        metadata_service=NoMetadata(),
+        source_factory=lambda device: source)
+    controller_ref.append(controller)
+
+    controller.post(DiscInserted(str(tmp_path)))
+    assert wait_until(
+        lambda: controller.process_pending().state is AppState.FINISHED,
+        timeout=15.0)
+    assert stream.written // 4 == sum(frames)
+    assert spans == [1]  # 2 曲目も同じ読み取りの続き
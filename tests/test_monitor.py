@@ -1,8 +1,12 @@
+import os
 import shutil
 
-from src.core.events import DiscInserted, DiscRemoved, NotAudioCd
-from src.disc.monitor import (CDS_AUDIO, CDS_DISC_OK, CDS_NO_DISC,
-                              LinuxDiscMonitor, MacDiscMonitor)
+from src.core.events import (DiscInserted, DiscRemoved, DriveSpinningUp,
+                             NotAudioCd)
+from src.disc.monitor import (CDS_AUDIO, CDS_DISC_OK, CDS_DRIVE_NOT_READY,
+                              CDS_NO_DISC, CDS_TRAY_OPEN, FAST_POLL_SECONDS,
+                              LinuxDiscMonitor, MacDiscMonitor,
+                              discover_drives)
 
 CDS_DATA_1 = 101  # linux/cdrom.h: データディスク
 
@@ -20,7 +24,7 @@ def seq_status(*pairs):
     it = iter(pairs)
     state = {"last": pairs[-1]}
 
-    def fn():
+    def fn(device=None):
         try:
             state["last"] = next(it)
         except StopIteration:
@@ -55,6 +59,61 @@ def test_linux_data_disc_reports_not_audio():
     assert post.events == [NotAudioCd("/dev/sr0")]  # 1 回だけ
 
 
+def test_linux_polls_fast_only_while_spinning_up():
+    post = Poster()
+    mon = LinuxDiscMonitor(post, device="/dev/sr0", interval=2.0,
+                           status_fn=seq_status(
+                               (CDS_NO_DISC, -1),
+                               (CDS_TRAY_OPEN, -1),
+                               (CDS_DRIVE_NOT_READY, -1),
+                               (CDS_DRIVE_NOT_READY, -1),
+                               (CDS_DISC_OK, CDS_AUDIO)))
+    intervals = [mon._poll("/dev/sr0") for _ in range(5)]
+    assert intervals == [2.0, 0.5, FAST_POLL_SECONDS, FAST_POLL_SECONDS, 2.0]
+    assert post.events == [DriveSpinningUp("/dev/sr0"),  # 1 回だけ
+                           DiscInserted("/dev/sr0")]
+
+
+def test_linux_spin_up_without_disc_is_withdrawn():
+    post = Poster()
+    mon = LinuxDiscMonitor(post, device="/dev/sr0",
+                           status_fn=seq_status(
+                               (CDS_DRIVE_NOT_READY, -1),
+                               (CDS_NO_DISC, -1),
+                               (CDS_NO_DISC, -1)))
+    for _ in range(3):
+        mon.poll_once()
+    assert post.events == [DriveSpinningUp("/dev/sr0"),
+                           DiscRemoved("/dev/sr0")]
+
+
+def test_linux_keeps_device_open_between_polls(monkeypatch, tmp_path):
+    import fcntl
+    opened = []
+    real_open = os.open
+
+    def counting_open(path, flags):
+        opened.append(path)
+        return real_open(path, flags)
+
+    monkeypatch.setattr(os, "open", counting_open)
+    monkeypatch.setattr(fcntl, "ioctl",
+                        lambda fd, req, arg: CDS_NO_DISC)
+    device = str(tmp_path / "sr0")
+    open(device, "w").close()
+    mon = LinuxDiscMonitor(Poster(), device=device)
+    for _ in range(3):
+        mon.poll_once()
+    assert opened == [device]
+    mon.release(device)  # 取り出しの間は開かない
+    mon.poll_once()
+    assert opened == [device] and not mon._fds
+    mon._released.clear()
+    mon.poll_once()
+    assert opened == [device, device]
+    mon._close_all()
+
+
 def test_mac_detects_audio_volume(tmp_path):
     post = Poster()
     mon = MacDiscMonitor(post, volumes_root=str(tmp_path))
@@ -86,3 +145,127 @@ def test_mac_detects_disc_present_at_startup(tmp_path):
     mon = MacDiscMonitor(post, volumes_root=str(tmp_path))
     mon.poll_once()
     assert post.events == [DiscInserted(str(vol))]  # 起動時挿入済みも再生対象
+
+
+def test_linux_one_monitor_covers_every_drive():
+    post = Poster()
+    status = {"/dev/sr0": (CDS_NO_DISC, -1), "/dev/sr1": (CDS_NO_DISC, -1)}
+    mon = LinuxDiscMonitor(post, devices=["/dev/sr0", "/dev/sr1"],
+                           status_fn=lambda device: status[device])
+    mon.poll_once()
+    status["/dev/sr1"] = (CDS_DISC_OK, CDS_AUDIO)
+    mon.poll_once()
+    status["/dev/sr0"] = (CDS_DISC_OK, CDS_AUDIO)
+    status["/dev/sr1"] = (CDS_NO_DISC, -1)
+    mon.poll_once()
+    assert post.events == [DiscInserted("/dev/sr1"), DiscInserted("/dev/sr0"),
+                           DiscRemoved("/dev/sr1")]
+
+
+def test_linux_failing_drive_does_not_block_others():
+    post = Poster()
+
+    def status(device):
+        if device == "/dev/sr0":
+            raise OSError("No medium found")
+        return CDS_DISC_OK, CDS_AUDIO
+
+    mon = LinuxDiscMonitor(post, devices=["/dev/sr0", "/dev/sr1"],
+                           status_fn=status)
+    mon.poll_once()
+    assert post.events == [DiscInserted("/dev/sr1")]
+
+
+def test_discover_drives_in_numeric_order(tmp_path):
+    for name in ("sr10", "sr2", "sr0"):
+        (tmp_path / name).touch()
+    assert discover_drives(str(tmp_path / "sr*")) == [
+        str(tmp_path / n) for n in ("sr0", "sr2", "sr10")]
+
+
+# --- uevent ---
+
+import socket
+import time
+
+from src.disc import monitor as monitor_mod
+from src.disc.monitor import UeventDiscMonitor, create_monitor, parse_uevent
+from tests.support import wait_until
+
+
+def uevent(devname, **env):
+    fields = [f"change@/devices/virtual/block/{devname}", "ACTION=change",
+              "SUBSYSTEM=block", f"DEVNAME={devname}", "DEVTYPE=disk"]
+    fields += [f"{k}={v}" for k, v in env.items()]
+    return "\0".join(fields).encode() + b"\0"
+
+
+def test_parse_uevent():
+    env = parse_uevent(uevent("sr0", DISK_MEDIA_CHANGE=1))
+    assert env["DEVNAME"] == "sr0" and env["DISK_MEDIA_CHANGE"] == "1"
+    assert "change@/devices/virtual/block/sr0" not in env
+
+
+def test_uevent_triggers_status_check_only_for_our_drives():
+    post = Poster()
+    checked = []
+
+    def status(device):
+        checked.append(device)
+        return CDS_DISC_OK, CDS_AUDIO
+
+    mon = UeventDiscMonitor(post, devices=["/dev/sr0"], status_fn=status)
+    mon.handle_uevent(uevent("sda", DISK_MEDIA_CHANGE=1))
+    mon.handle_uevent(uevent("sr0"))  # メディアの変化ではない
+    assert checked == []
+    mon.handle_uevent(uevent("sr0", DISK_MEDIA_CHANGE=1))
+    assert post.events == [DiscInserted("/dev/sr0")]
+
+
+def test_uevent_monitor_reacts_at_once_and_waits_for_spin_up(monkeypatch):
+    monkeypatch.setattr(monitor_mod, "SETTLE_INTERVAL", 0.02)
+    post = Poster()
+    status = {"now": (CDS_NO_DISC, -1)}
+    ours, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    mon = UeventDiscMonitor(post, devices=["/dev/sr0"],
+                            status_fn=lambda d: status["now"], sock=ours)
+    mon.start()
+    status["now"] = (CDS_DRIVE_NOT_READY, -1)  # 挿入直後は立ち上がり中
+    kernel.send(uevent("sr0", DISK_MEDIA_CHANGE=1))
+    time.sleep(0.1)
+    assert post.events == [DriveSpinningUp("/dev/sr0")]
+    status["now"] = (CDS_DISC_OK, CDS_AUDIO)
+    assert wait_until(lambda: post.events[-1] == DiscInserted("/dev/sr0"))
+    status["now"] = (CDS_TRAY_OPEN, -1)
+    kernel.send(uevent("sr0", DISK_EJECT_REQUEST=1))
+    assert wait_until(lambda: post.events[-1] == DiscRemoved("/dev/sr0"))
+    mon.stop()
+    assert wait_until(lambda: not mon._thread.is_alive(), timeout=1.0)
+    ours.close()
+    kernel.close()
+
+
+
+def test_uevent_monitor_closes_socket_and_pipe_on_exit():
+    ours, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    mon = UeventDiscMonitor(Poster(), devices=["/dev/sr0"],
+                            status_fn=lambda d: (CDS_NO_DISC, -1), sock=ours)
+    mon.stop()  # 始める前に止めても構わない
+    mon = UeventDiscMonitor(Poster(), devices=["/dev/sr0"],
+                            status_fn=lambda d: (CDS_NO_DISC, -1), sock=ours)
+    mon.start()
+    mon.stop()
+    assert wait_until(lambda: not mon._thread.is_alive(), timeout=1.0)
+    assert ours.fileno() == -1
+    assert mon._wake_r is None and mon._wake_w is None
+    mon.stop()  # 終わった後でも構わない
+    kernel.close()
+
+def test_falls_back_to_polling_without_netlink(monkeypatch):
+    def unavailable():
+        raise OSError("Address family not supported by protocol")
+
+    monkeypatch.setattr(monitor_mod, "open_uevent_socket", unavailable)
+    monkeypatch.setattr("sys.platform", "linux")
+    mon = create_monitor(Poster(), devices=["/dev/sr0"])
+    assert type(mon) is LinuxDiscMonitor
@@ -0,0 +1,86 @@
+from src.core.events import (AppState, DiscInserted, DiscRemoved,
+                             TrackChanged, ViewState)
+from src.core.multi import MultiDriveController
+
+
+class FakePipeline:
+    """AppController の代わり。受け取ったイベントと操作を記録する。"""
+
+    def __init__(self):
+        self.events = []
+        self.calls = []
+        self.state = AppState.NO_DISC
+
+    def post(self, event):
+        self.events.append(event)
+        if isinstance(event, DiscInserted):
+            self.state = AppState.PLAYING
+        elif isinstance(event, DiscRemoved):
+            self.state = AppState.NO_DISC
+
+    def process_pending(self):
+        return ViewState(state=self.state, track_number=None,
+                         track_total=None, track_title=None,
+                         album_title=None, artist=None, cover_path=None,
+                         error_message=None)
+
+    def toggle_pause(self):
+        self.calls.append("pause")
+
+    def next_track(self):
+        self.calls.append("next")
+
+    def prev_track(self):
+        self.calls.append("prev")
+
+    def eject(self):
+        self.calls.append("eject")
+
+    def set_wakeup(self, fn):
+        self.wakeup = fn
+
+
+def make_multi():
+    a, b = FakePipeline(), FakePipeline()
+    return MultiDriveController({"/dev/sr0": a, "/dev/sr1": b}), a, b
+
+
+def test_disc_events_go_to_their_drive_and_show_latest_insert():
+    multi, a, b = make_multi()
+    multi.post(DiscInserted("/dev/sr1"))
+    multi.post(DiscInserted("/dev/sr9"))  # 管理していないドライブ
+    assert a.events == [] and b.events == [DiscInserted("/dev/sr1")]
+    assert multi.process_pending().state is AppState.PLAYING
+    assert multi.active_device == "/dev/sr1"
+    multi.next_track()
+    assert b.calls == ["next"] and a.calls == []
+
+
+def test_view_falls_back_to_a_drive_with_a_disc():
+    multi, a, b = make_multi()
+    multi.post(DiscInserted("/dev/sr0"))
+    multi.post(DiscInserted("/dev/sr1"))
+    multi.post(DiscRemoved("/dev/sr1"))
+    assert multi.process_pending().state is AppState.PLAYING
+    assert multi.active_device == "/dev/sr0"
+    multi.next_drive()
+    multi.eject()
+    assert b.calls == ["eject"]
+
+
+def test_single_pipeline_takes_any_device():
+    only = FakePipeline()
+    multi = MultiDriveController({"/Volumes": only})
+    multi.post(DiscInserted("/Volumes/Kind of Blue"))
+    multi.post(TrackChanged(2))
+    assert only.events == [DiscInserted("/Volumes/Kind of Blue"),
+                           TrackChanged(2)]
+
+
+def test_wakeup_reaches_every_pipeline():
+    multi, a, b = make_multi()
+    woken = []
+    multi.set_wakeup(lambda: woken.append(1))
+    a.wakeup()  # エンジンは各パイプラインへ直接 post する
+    b.wakeup()
+    assert woken == [1, 1]
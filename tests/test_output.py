@@ -0,0 +1,193 @@
+import threading
+import time
+
+import pytest
+
+from src.audio.output import (CallbackOutputStream, PersistentOutput,
+                              default_stream_factory, make_stream_factory)
+from tests.support import wait_until
+
+
+class FakeRawStream:
+    """コールバックを手で回す偽の PortAudio ストリーム。"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.started = False
+        self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.closed = True
+
+    def pull(self, frames, status=None):
+        out = bytearray(frames * 4)
+        self.callback(out, frames, None, status)
+        return bytes(out)
+
+
+class Status:
+    def __init__(self, output_underflow):
+        self.output_underflow = output_underflow
+
+    def __bool__(self):
+        return self.output_underflow
+
+
+def make_stream(**kwargs):
+    raw = []
+
+    def open_stream(callback):
+        raw.append(FakeRawStream(callback))
+        return raw[0]
+
+    return CallbackOutputStream(open_stream=open_stream, **kwargs), raw
+
+
+def test_callback_pulls_written_pcm_in_order():
+    out, raw = make_stream()
+    out.start()
+    out.write(b"\x01\x00\x02\x00" * 3)
+    assert raw[0].pull(2) == b"\x01\x00\x02\x00" * 2
+    assert raw[0].pull(1) == b"\x01\x00\x02\x00"
+
+
+def test_short_buffer_is_padded_with_silence_and_counted():
+    out, raw = make_stream()
+    out.start()
+    assert raw[0].pull(4) == bytes(16)
+    assert out.starved == 0  # 書き込み前の無音は供給不足ではない
+    out.write(b"\x07" * 4)
+    assert raw[0].pull(2) == b"\x07" * 4 + bytes(4)
+    assert out.starved == 1
+
+
+def test_status_underflow_flag_is_counted():
+    out, raw = make_stream()
+    raw[0].pull(1, Status(output_underflow=True))
+    raw[0].pull(1, Status(output_underflow=False))
+    assert out.underruns == 1
+
+
+def test_write_blocks_when_ring_is_full_and_callback_drains_it():
+    out, raw = make_stream(buffer_frames=4)
+    out.write(b"\x00" * 16)
+    done = threading.Event()
+    threading.Thread(target=lambda: (out.write(b"\x01" * 16), done.set()),
+                     daemon=True).start()
+    assert not done.wait(0.1)
+    raw[0].pull(4)
+    assert done.wait(1.0)
+    assert raw[0].pull(4) == b"\x01" * 16
+
+
+def test_factory_selects_mode():
+    assert make_stream_factory("blocking") is default_stream_factory
+    with pytest.raises(ValueError):
+        make_stream_factory("vlc")
+
+
+def test_factory_targets_a_specific_output_device():
+    factory = make_stream_factory("blocking", device="hw:1,0")
+    assert factory.func is default_stream_factory
+    assert factory.keywords == {"device": "hw:1,0"}
+
+
+class FakeDevice:
+    """blocking 方式の偽デバイス。write は少し待ってから返る。
+
+    fail_writes 回だけ、無音でない書き込みを失敗させる。
+    """
+
+    def __init__(self, fail_writes=0):
+        self.written = []
+        self.fail_writes = fail_writes
+        self.started = False
+        self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def write(self, data):
+        if self.fail_writes and any(data):
+            self.fail_writes -= 1
+            raise OSError("device unplugged")
+        self.written.append(bytes(data))
+        time.sleep(0.005)
+
+    def abort(self):
+        self.started = False
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.closed = True
+
+
+def make_persistent(*devices):
+    opened = []
+
+    def factory():
+        opened.append(devices[len(opened)])
+        return opened[-1]
+
+    return PersistentOutput(factory, idle_gap=0.02, idle_block_frames=4), opened
+
+
+def test_persistent_output_is_shared_across_plays_and_fills_gaps():
+    out, opened = make_persistent(FakeDevice())
+    out.open()
+    dev = opened[0]
+    assert wait_until(lambda: bytes(16) in dev.written)  # アイドル中は無音
+    for _ in range(2):  # 2 回の再生(エンジンの使い方)
+        stream = out.lease()
+        stream.start()
+        stream.write(b"\x01" * 16)
+        stream.stop()
+        stream.close()
+    assert len(opened) == 1 and not dev.closed
+    assert dev.written.count(b"\x01" * 16) == 2
+    out.shutdown()
+    assert dev.closed
+
+
+def test_persistent_output_reopens_on_device_error():
+    out, opened = make_persistent(FakeDevice(fail_writes=1), FakeDevice())
+    stream = out.lease()
+    stream.start()
+    stream.write(b"\x02" * 16)
+    assert len(opened) == 2 and opened[0].closed
+    assert b"\x02" * 16 in opened[1].written
+    assert out.reopens == 1
+    out.shutdown()
+
+
+def test_persistent_callback_output_drains_without_stopping():
+    cb, raw = make_stream()
+    out = PersistentOutput(lambda: cb)
+    out.open()
+    stream = out.lease()
+    stream.start()
+    stream.write(b"\x03" * 8)
+    threading.Timer(0.05, lambda: raw[0].pull(2)).start()
+    stream.stop()  # 鳴らし切るまで待つ
+    stream.close()
+    assert raw[0].started and not raw[0].closed
+    assert raw[0].pull(1) == bytes(4) and cb.starved == 0
+    out.shutdown()
+    assert raw[0].closed
+
+
+def test_flush_drops_queued_audio_for_a_skip():
+    out, raw = make_stream()
+    out.start()
+    out.write(b"\x05" * 16)
+    out.flush()
+    out.write(b"\x06" * 4)
+    assert raw[0].pull(2) == b"\x06" * 4 + bytes(4)
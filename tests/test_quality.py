@@ -0,0 +1,47 @@
+from src.audio.quality import READ_MODES, ReadQuality
+
+
+def test_tracks_start_fast_and_escalate_one_step_per_reopen(tmp_path):
+    q = ReadQuality(root=tmp_path)
+    q.use_disc("disc-1")
+    assert q.mode(3).name == "fast"
+    assert q.escalate(3, "stall")
+    # 上げたモードを試す前の報告は同じ不調の続き
+    assert not q.escalate(3, "stall")
+    q.opened(3)
+    assert q.escalate(3, "stall")
+    assert q.mode(3) is READ_MODES[2]
+    assert q.mode(1).name == "fast"
+    # 連続読みは上げたトラックの手前で区切り、そこだけ慎重に読む
+    assert q.mode(1, span=True).name == "fast"
+    assert q.span_end(1) == 2
+    assert q.span_end(3) == 3
+    assert q.span_end(4) is None
+
+
+def test_escalation_stops_at_the_most_careful_mode(tmp_path):
+    q = ReadQuality(root=tmp_path)
+    for _ in range(len(READ_MODES) + 2):
+        q.escalate(1, "stall")
+        q.opened(1, span=True)
+    assert q.mode(1) is READ_MODES[-1]
+    assert not q.escalate(1, "stall")
+
+
+def test_levels_are_remembered_per_disc(tmp_path):
+    q = ReadQuality(root=tmp_path)
+    q.use_disc("disc-1")
+    q.escalate(2, "slow read")
+    again = ReadQuality(root=tmp_path)
+    again.use_disc("disc-1")
+    assert again.mode(2).name == "slow"
+    again.use_disc("disc-2")
+    assert again.mode(2).name == "fast"
+
+
+def test_broken_record_is_ignored(tmp_path):
+    (tmp_path / "disc-1").mkdir()
+    (tmp_path / "disc-1" / ReadQuality.FILENAME).write_text("{")
+    q = ReadQuality(root=tmp_path)
+    q.use_disc("disc-1")
+    assert q.mode(1).name == "fast"
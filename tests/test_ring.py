@@ -0,0 +1,146 @@
+import threading
+
+from src.audio.ring import PcmRingBuffer
+
+
+def test_write_then_peek_and_consume_without_copy():
+    ring = PcmRingBuffer(16)
+    epoch = ring.reset()
+    assert ring.write(epoch, b"abcdefgh")
+    view = ring.peek(100)
+    assert bytes(view) == b"abcdefgh"
+    assert view.obj is ring.peek(1).obj  # リング内を直接指している
+    ring.consume(len(view))
+    assert ring.fill == 0
+    assert ring.high_water == 8
+
+
+def test_wraps_around_in_contiguous_pieces():
+    ring = PcmRingBuffer(8)
+    epoch = ring.reset()
+    ring.write(epoch, b"123456")
+    ring.consume(4)
+    ring.write(epoch, b"abcd")  # 末尾 2 バイト + 先頭 2 バイトに分かれる
+    first = bytes(ring.peek(100))
+    ring.consume(len(first))
+    second = bytes(ring.peek(100))
+    assert first + second == b"56abcd"
+
+
+def test_readinto_style_writes_via_write_view():
+    ring = PcmRingBuffer(8)
+    epoch = ring.reset()
+    view = ring.write_view(epoch)
+    view[:4] = b"wxyz"
+    ring.commit(epoch, 4)
+    assert bytes(ring.peek(8)) == b"wxyz"
+
+
+def test_marks_stop_the_reader_at_their_position():
+    ring = PcmRingBuffer(16)
+    epoch = ring.reset()
+    ring.write(epoch, b"aaaa")
+    ring.mark(epoch, "boundary")
+    ring.write(epoch, b"bbbb")
+    assert ring.pop_mark() is None  # まだ境界の手前
+    assert bytes(ring.peek(100)) == b"aaaa"
+    ring.consume(4)
+    assert ring.pop_mark() == "boundary"
+    assert bytes(ring.peek(100)) == b"bbbb"
+
+
+def test_reset_rejects_stale_writer():
+    ring = PcmRingBuffer(8)
+    old = ring.reset()
+    ring.reset()
+    assert not ring.write(old, b"xxxx")
+    assert not ring.mark(old, "eof")
+    assert ring.fill == 0
+
+
+def test_writer_blocks_until_reader_frees_space():
+    ring = PcmRingBuffer(4)
+    epoch = ring.reset()
+    ring.write(epoch, b"1234")
+    done = threading.Event()
+
+    def writer():
+        ring.write(epoch, b"5678")
+        done.set()
+
+    threading.Thread(target=writer, daemon=True).start()
+    assert not done.wait(0.1)  # 満杯なので待たされる
+    ring.consume(4)
+    assert done.wait(1.0)
+    assert bytes(ring.peek(4)) == b"5678"
+
+
+def test_underrun_counted_only_after_playback_started():
+    ring = PcmRingBuffer(8)
+    epoch = ring.reset()
+    assert not ring.wait_readable(0.01)  # 再生前の空は数えない
+    assert ring.underruns == 0
+    ring.write(epoch, b"abcd")
+    ring.consume(4)
+    assert not ring.wait_readable(0.01)
+    assert ring.underruns == 1
+
+
+def test_resize_keeps_data_and_marks_across_wraparound():
+    ring = PcmRingBuffer(8)
+    epoch = ring.reset()
+    ring.write(epoch, b"123456")
+    ring.consume(4)
+    ring.write(epoch, b"ab")
+    ring.mark(epoch, "boundary")
+    ring.write(epoch, b"cd")  # 末尾をまたいで折り返している
+    assert ring.resize(epoch, 32)
+    assert ring.capacity == 32
+    assert bytes(ring.peek(100)) == b"56ab"
+    ring.consume(4)
+    assert ring.pop_mark() == "boundary"
+    assert bytes(ring.peek(100)) == b"cd"
+
+
+def test_resize_never_drops_buffered_data():
+    ring = PcmRingBuffer(16)
+    epoch = ring.reset()
+    ring.write(epoch, b"x" * 12)
+    assert ring.resize(epoch, 4)
+    assert ring.capacity == 12
+    assert not ring.resize(epoch - 1, 64)  # 古い世代は弾く
+
+
+def test_wake_releases_reader_when_interrupted():
+    ring = PcmRingBuffer(16)
+    ring.reset()
+    leave = threading.Event()
+    result = []
+    t = threading.Thread(target=lambda: result.append(
+        ring.wait_readable(5, interrupted=leave.is_set)))
+    t.start()
+    leave.set()
+    ring.wake()
+    t.join(1)
+    assert result == [False]
+
+
+def test_consume_after_reset_is_ignored_for_old_epoch():
+    ring = PcmRingBuffer(16)
+    old = ring.reset()
+    ring.write(old, b"abcd")
+    view = ring.peek(4)
+    new = ring.reset()
+    ring.write(new, b"wxyz")
+    ring.consume(len(view), old)
+    assert bytes(ring.peek(4)) == b"wxyz"
+
+
+def test_reallocate_detaches_stale_writer_view():
+    ring = PcmRingBuffer(16)
+    stale = ring.write_view(ring.reset())
+    epoch = ring.reset()
+    ring.reallocate()
+    ring.write(epoch, b"good")
+    stale[:4] = b"bad!"  # 止め損ねた書き手
+    assert bytes(ring.peek(4)) == b"good"
@@ -0,0 +1,133 @@
+import os
+
+import soundfile as sf
+
+from src.audio.ripcache import (WAV_HEADER_BYTES, AudioCache, RippingSource,
+                                track_bytes)
+from src.core.events import TrackRef
+
+SECTOR = 588 * 4
+TRACKS = (TrackRef(1, sectors=3), TrackRef(2, sectors=2))
+
+
+def pcm(track, sectors):
+    return bytes([track]) * (sectors * SECTOR)
+
+
+class DriveSource:
+    """トラックごと / 連続で PCM を返すフェイクのドライブ。"""
+
+    def __init__(self, chunk=1000):
+        self.chunk = chunk
+        self.opened = []
+        self.closed = 0
+
+    def _chunks(self, data):
+        return (data[i:i + self.chunk] for i in range(0, len(data), self.chunk))
+
+    def open(self, n):
+        self.opened.append(n)
+        return self._chunks(pcm(n, TRACKS[n - 1].sectors))
+
+    def open_from(self, n):
+        self.opened.append(f"{n}-")
+        return self._chunks(b"".join(pcm(t.number, t.sectors)
+                                     for t in TRACKS[n - 1:]))
+
+    def close(self):
+        self.closed += 1
+
+
+def test_playing_a_track_rips_it_to_wav(tmp_path):
+    cache = AudioCache(root=tmp_path)
+    src = RippingSource(DriveSource(), cache, "disc1", TRACKS)
+    assert b"".join(src.open(1)) == pcm(1, 3)
+    src.close()
+    path = cache.track_path("disc1", 1)
+    with sf.SoundFile(str(path)) as f:
+        assert (f.samplerate, f.channels, len(f)) == (44100, 2, 3 * 588)
+    assert path.read_bytes()[WAV_HEADER_BYTES:] == pcm(1, 3)
+    assert not cache.is_complete("disc1", TRACKS)  # トラック 2 が未保存
+
+
+def test_continuous_read_is_split_into_track_files(tmp_path):
+    cache = AudioCache(root=tmp_path)
+    src = RippingSource(DriveSource(), cache, "disc1", TRACKS)
+    b"".join(src.open_from(1))
+    src.close()
+    assert cache.is_complete("disc1", TRACKS)
+    played = b"".join(cache.source("disc1").open(2))
+    assert played == pcm(2, 2)
+
+
+def test_partial_rip_resumes_where_it_stopped(tmp_path):
+    cache = AudioCache(root=tmp_path)
+    src = RippingSource(DriveSource(), cache, "disc1", TRACKS)
+    reader = iter(src.open(1))
+    next(reader)
+    next(reader)  # 2000 バイトだけ読んで中断(取り出し等)
+    src.close()
+    part = cache.track_path("disc1", 1).with_suffix(".wav.part")
+    assert part.stat().st_size == WAV_HEADER_BYTES + 2000
+
+    src = RippingSource(DriveSource(), cache, "disc1", TRACKS)
+    b"".join(src.open(1))
+    src.close()
+    path = cache.track_path("disc1", 1)
+    assert path.read_bytes()[WAV_HEADER_BYTES:] == pcm(1, 3)
+    assert not part.exists()
+
+
+def test_readinto_readers_stay_readinto(tmp_path):
+    class Reader:
+        def __init__(self, data):
+            self.data = data
+
+        def readinto(self, buf):
+            n = min(len(buf), len(self.data))
+            buf[:n] = self.data[:n]
+            self.data = self.data[n:]
+            return n
+
+    class Source(DriveSource):
+        def open(self, n):
+            return Reader(pcm(n, TRACKS[n - 1].sectors))
+
+    cache = AudioCache(root=tmp_path)
+    reader = RippingSource(Source(), cache, "disc1", TRACKS).open(2)
+    buf = bytearray(1024)
+    while reader.readinto(memoryview(buf)):
+        pass
+    assert cache.track_path("disc1", 2).exists()
+
+
+def test_budget_evicts_least_recently_used_disc(tmp_path):
+    cache = AudioCache(root=tmp_path,
+                       budget_bytes=2 * (WAV_HEADER_BYTES + track_bytes(3)))
+    for i, disc_id in enumerate(("old", "mid", "new")):
+        src = RippingSource(DriveSource(), cache, disc_id, TRACKS)
+        b"".join(src.open(1))
+        src.close()
+        cache.touch(disc_id)
+        marker = cache.directory(disc_id) / ".last_used"
+        os.utime(marker, (1000 + i, 1000 + i))
+    cache.enforce_budget(keep="old")
+    assert cache.directory("old").exists()  # 再生中のディスクは消さない
+    assert not cache.directory("mid").exists()
+    assert cache.directory("new").exists()
+
+
+def test_seeking_past_saved_data_does_not_leave_a_hole(tmp_path):
+    class SeekingDrive(DriveSource):
+        def open_from(self, n, start_frame=0):
+            self.opened.append((n, start_frame))
+            data = b"".join(pcm(t.number, t.sectors) for t in TRACKS[n - 1:])
+            return self._chunks(data[start_frame * 4:])
+
+    cache = AudioCache(root=tmp_path)
+    src = RippingSource(SeekingDrive(), cache, "disc1", TRACKS)
+    data = b"".join(src.open_from(1, start_frame=588))
+    src.close()
+    assert data == pcm(1, 3)[SECTOR:] + pcm(2, 2)
+    assert not cache.track_path("disc1", 1).exists()  # 先頭が欠けるので保存しない
+    assert cache.track_path("disc1", 2).exists()      # 続くトラックは丸ごと保存
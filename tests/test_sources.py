@@ -18,14 +18,18 @@ def test_parse_cdparanoia_toc():
     tracks = parse_cdparanoia_toc(CDPARANOIA_Q_OUTPUT)
     assert [t.number for t in tracks] == [1, 2]
     assert tracks[0].duration == pytest.approx(16831 / 75.0)
+    assert [t.sectors for t in tracks] == [16831, 20995]
+    assert [t.start for t in tracks] == [0, 16831]
 
 
 def test_parse_cdparanoia_toc_empty():
     assert parse_cdparanoia_toc("no disc\n") == []
 
 
+import io
 from pathlib import Path
 
+from src.audio.quality import ReadQuality
 from src.audio.sources import CdparanoiaSource, SourceStallError
 
 FAKE_BIN = str(Path(__file__).parent / "bin" / "fake_cdparanoia")
@@ -44,6 +48,21 @@ def test_cdparanoia_open_reads_pcm():
     assert data == b"\x01\x02" * 4096
 
 
+def test_cdparanoia_readinto_fills_caller_buffer():
+    """先読みはパイプから呼び出し側のバッファへ直接読み込む。"""
+    src = CdparanoiaSource(device="/dev/null", binary=FAKE_BIN)
+    reader = src.open(1)
+    buf = bytearray(4096 * 4)
+    got = bytearray()
+    while True:
+        n = reader.readinto(memoryview(buf)[:3000])
+        if not n:
+            break
+        got += buf[:n]
+    src.close()
+    assert got == b"\x01\x02" * 4096
+
+
 def test_cdparanoia_read_command_prefers_low_latency():
     """再生はリアルタイム優先なので paranoia 検証を無効化する。
 
@@ -58,6 +77,55 @@ def test_cdparanoia_read_command_prefers_low_latency():
     assert argv[-2:] == ["3", "-"], "トラック指定と stdout 出力が末尾にない"
 
 
+def test_cdparanoia_span_command_reads_to_end_of_disc():
+    """ギャップレス再生はトラック N 以降を 1 プロセスで読む(`N-` スパン)。"""
+    src = CdparanoiaSource(device="/dev/sr0")
+    argv = src.span_command(3)
+    assert argv[-2:] == ["3-", "-"]
+    assert argv[:-2] == src.read_command(3)[:-2]
+
+
+def test_cdparanoia_reads_troubled_track_in_a_careful_mode(tmp_path):
+    """止まったトラックだけ、次に開くときから -Z をやめて速度を落とす。"""
+    src = CdparanoiaSource(device="/dev/sr0",
+                           quality=ReadQuality(root=tmp_path))
+    src.use_disc("disc-1")
+    assert src.report_trouble(3, "stall")
+    assert "-Z" in src.read_command(2)
+    argv = src.read_command(3)
+    assert argv[argv.index("-S") + 1] == "8"
+    assert src.read_mode(3) == "slow"
+    assert src.read_mode(1, span=True) == "fast"
+    restored = CdparanoiaSource(device="/dev/sr0",
+                                quality=ReadQuality(root=tmp_path))
+    restored.use_disc("disc-1")
+    assert restored.read_command(3) == argv
+
+
+def test_cdparanoia_open_from_reads_pcm():
+    src = CdparanoiaSource(device="/dev/null", binary=FAKE_BIN)
+    data = b"".join(src.open_from(1))
+    src.close()
+    assert data == b"\x01\x02" * 4096
+
+
+
+def test_cdparanoia_span_switches_mode_only_for_the_troubled_track(
+        tmp_path, monkeypatch):
+    """上げたトラックだけ慎重に読み、前後は -Z のまま続けて読む。"""
+    log = tmp_path / "argv.log"
+    monkeypatch.setenv("FAKE_CDPARANOIA_LOG", str(log))
+    src = CdparanoiaSource(device="/dev/null", binary=FAKE_BIN,
+                           quality=ReadQuality(root=tmp_path))
+    src.use_disc("disc-1")
+    src.report_trouble(3, "stall")
+    data = b"".join(src.open_from(1))
+    src.close()
+    assert data == b"\x01\x02" * 4096 * 3  # 3 本のスパンがつながる
+    runs = [line.split() for line in log.read_text().splitlines()]
+    assert [argv[-2] for argv in runs] == ["1-2", "3-3", "4-"]
+    assert ["-S" in argv for argv in runs] == [False, True, False]
+
 def test_cdparanoia_waits_longer_for_first_data(monkeypatch):
     """挿入直後のコールドスタートは待つ。
 
@@ -84,6 +152,18 @@ def test_cdparanoia_mid_stream_gap_still_raises(monkeypatch):
     src.close()
 
 
+def test_cdparanoia_waits_for_spin_up_after_long_pause(monkeypatch):
+    """長い一時停止からの再開は、再生中でも最初の音と同じだけ待つ。"""
+    monkeypatch.setenv("FAKE_CDPARANOIA_MID_DELAY", "0.5")
+    src = CdparanoiaSource(device="/dev/null", binary=FAKE_BIN,
+                           stall_timeout=0.2, start_timeout=3.0)
+    reader = iter(src.open(1))
+    assert next(reader) == b"\x01\x02" * 4096
+    src.expect_spin_up()
+    assert next(reader) == b"\x03\x04" * 4096
+    src.close()
+
+
 def test_cdparanoia_stall_raises(monkeypatch):
     """1 バイトも出ないまま start_timeout を超えたら諦める。"""
     monkeypatch.setenv("FAKE_CDPARANOIA_STALL", "1")
@@ -124,6 +204,265 @@ def test_aiff_open_reads_pcm(tmp_path):
     assert len(data) == 1000 * 4  # 1000 フレーム * 4 バイト
 
 
+def test_aiff_readinto_reads_whole_frames(tmp_path):
+    make_aiff(tmp_path / "1 Audio Track.aiff", frames=1000)
+    src = AiffFileSource(str(tmp_path))
+    reader = src.open(1)
+    buf = bytearray(4 * 300 + 2)  # 端数はフレームに満たないので使わない
+    total = 0
+    while n := reader.readinto(memoryview(buf)):
+        assert n % 4 == 0
+        total += n
+    src.close()
+    assert total == 1000 * 4
+
+
+
+def test_readinto_never_reports_more_than_the_buffer(tmp_path):
+    with sf.SoundFile(str(tmp_path / "1 Audio Track.aiff"), "w",
+                      samplerate=44100, channels=1, format="AIFF") as f:
+        f.buffer_write(b"\x00\x00" * 5000, dtype="int16")
+    src = AiffFileSource(str(tmp_path))
+    assert src.open(1).readinto(memoryview(bytearray(4096))) == 4096
+    src.close()
+
 def test_aiff_empty_dir_raises(tmp_path):
     with pytest.raises(TrackSourceError):
         AiffFileSource(str(tmp_path)).list_tracks()
+
+
+from src.audio.sources import (FileTreeSource, create_source,
+                               scan_pcm_layout)
+
+
+def make_track(path, frames, fmt, subtype="PCM_16", value=1000):
+    data = struct.pack("<h", value) * (frames * 2)
+    with sf.SoundFile(str(path), "w", samplerate=44100, channels=2,
+                      subtype=subtype, format=fmt) as f:
+        f.buffer_write(data, dtype="int16")
+    return data
+
+
+def test_wav_layout_is_mappable(tmp_path):
+    make_track(tmp_path / "01.wav", 588, "WAV")
+    layout = scan_pcm_layout(tmp_path / "01.wav")
+    assert layout.mappable
+    assert layout.frames == 588
+    assert layout.length == 588 * 4
+
+
+def test_big_endian_aiff_is_not_mappable(tmp_path):
+    make_track(tmp_path / "01.aiff", 10, "AIFF")
+    layout = scan_pcm_layout(tmp_path / "01.aiff")
+    assert layout.frames == 10 and not layout.mappable
+
+
+def test_file_tree_serves_wav_as_mmap_slices(tmp_path):
+    """非圧縮 PCM はコピーせず mmap のスライスで返す。"""
+    data = make_track(tmp_path / "01 Intro.wav", 5000, "WAV")
+    src = FileTreeSource(str(tmp_path))
+    chunks = list(src.open(1))
+    assert all(isinstance(c, memoryview) for c in chunks)
+    assert b"".join(chunks) == data
+    del chunks
+    src.close()
+
+
+def test_file_tree_mixed_formats_and_sector_lengths(tmp_path):
+    make_track(tmp_path / "1.wav", 588 * 2, "WAV")
+    flac = make_track(tmp_path / "2.flac", 1000, "FLAC")
+    aiff = make_track(tmp_path / "3.aiff", 300, "AIFF")
+    (tmp_path / "4.wav.part").write_bytes(b"x")  # リッピング途中は無視
+    src = FileTreeSource(str(tmp_path))
+    tracks = src.list_tracks()
+    assert [t.number for t in tracks] == [1, 2, 3]
+    assert [t.sectors for t in tracks] == [2, None, None]
+    assert b"".join(src.open(2)) == flac
+    assert b"".join(src.open(3)) == aiff
+    src.close()
+
+
+def test_file_tree_open_from_chains_files(tmp_path):
+    a = make_track(tmp_path / "1.wav", 700, "WAV", value=1)
+    b = make_track(tmp_path / "2.flac", 300, "FLAC", value=2)
+    src = FileTreeSource(str(tmp_path))
+    reader = src.open_from(1)
+    buf = bytearray(1000)
+    got = bytearray()
+    while n := reader.readinto(memoryview(buf)):
+        got += buf[:n]
+    src.close()
+    assert bytes(got) == a + b
+
+
+def test_file_tree_scans_directory_once(tmp_path):
+    make_track(tmp_path / "1.wav", 10, "WAV")
+    src = FileTreeSource(str(tmp_path))
+    assert len(src.list_tracks()) == 1
+    make_track(tmp_path / "2.wav", 10, "WAV")
+    assert len(src.list_tracks()) == 1  # ヘッダ走査の結果を使い回す
+
+
+
+def test_file_tree_counts_frames_once(tmp_path, monkeypatch):
+    make_track(tmp_path / "1.flac", 300, "FLAC")
+    src = FileTreeSource(str(tmp_path))
+    assert src.list_tracks()[0].duration == pytest.approx(300 / 44100)
+    monkeypatch.setattr(sf, "SoundFile", None)  # 2 回目はファイルを開かない
+    assert src.list_tracks()[0].duration == pytest.approx(300 / 44100)
+
+
+@pytest.mark.parametrize("rate, channels", [(44100, 1), (48000, 2)])
+def test_file_tree_rejects_non_cd_format(tmp_path, rate, channels):
+    with sf.SoundFile(str(tmp_path / "1.flac"), "w", samplerate=rate,
+                      channels=channels, format="FLAC") as f:
+        f.buffer_write(b"\x00\x00" * channels * 100, dtype="int16")
+    with pytest.raises(TrackSourceError, match="1.flac"):
+        FileTreeSource(str(tmp_path)).list_tracks()
+
+def test_create_source_for_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr("sys.platform", "linux")
+    assert isinstance(create_source(str(tmp_path)), FileTreeSource)
+    assert isinstance(create_source("/dev/sr0"), CdparanoiaSource)
+
+
+# --- IoctlCdSource ---
+
+from src.audio.sources import IoctlCdSource, TrackSourceError
+from src.disc.cdrom import CD_FRAMESIZE_RAW, CdromDevice
+from tests.support import FakeCdromIoctl, write_fake_disc
+
+
+def sector_bytes(start, end):
+    return b"".join(bytes([lba % 251]) * CD_FRAMESIZE_RAW
+                    for lba in range(start, end))
+
+
+def make_ioctl_source(tmp_path, batch=75, **kwargs):
+    image = write_fake_disc(tmp_path / "disc.img", 300)
+    fake = FakeCdromIoctl(starts=[0, 100, 250], leadout=300, **kwargs)
+    return IoctlCdSource(image, batch_sectors=batch, ioctl=fake), fake
+
+
+def test_cdrom_device_reads_toc(tmp_path):
+    image = write_fake_disc(tmp_path / "disc.img", 10)
+    dev = CdromDevice(image, ioctl=FakeCdromIoctl([0, 4], leadout=10,
+                                                  data_tracks=[2]))
+    toc = dev.read_toc()
+    dev.close()
+    assert [(t.number, t.start, t.audio) for t in toc.tracks] == [
+        (1, 0, True), (2, 4, False)]
+    assert toc.leadout == 10
+
+
+def test_keep_alive_reads_one_audio_sector(tmp_path):
+    src, fake = make_ioctl_source(tmp_path)
+    assert src.keep_alive()
+    assert fake.reads == [(0, 1)]
+
+
+def test_ioctl_list_tracks_from_toc(tmp_path):
+    src, _ = make_ioctl_source(tmp_path)
+    tracks = src.list_tracks()
+    src.close()
+    assert [(t.number, t.sectors) for t in tracks] == [
+        (1, 100), (2, 150), (3, 50)]
+
+
+def test_ioctl_open_reads_track_in_batches(tmp_path):
+    src, fake = make_ioctl_source(tmp_path, batch=40)
+    data = b"".join(src.open(2))
+    src.close()
+    assert data == sector_bytes(100, 250)
+    assert fake.reads == [(100, 40), (140, 40), (180, 40), (220, 30)]
+
+
+def test_ioctl_readinto_reads_directly_and_handles_small_buffers(tmp_path):
+    src, fake = make_ioctl_source(tmp_path, batch=8)
+    reader = src.open(3)
+    buf = bytearray(CD_FRAMESIZE_RAW * 5)
+    got = bytearray()
+    for size in (CD_FRAMESIZE_RAW * 5, 1000, 5000, len(buf)):
+        n = reader.readinto(memoryview(buf)[:size])
+        got += buf[:n]
+    while n:
+        n = reader.readinto(buf)
+        got += buf[:n]
+    src.close()
+    assert got == sector_bytes(250, 300)
+    assert fake.reads[0] == (250, 5)  # 呼び出し側のバッファへ直接 5 セクタ
+
+
+def test_ioctl_open_from_and_any_sector(tmp_path):
+    src, _ = make_ioctl_source(tmp_path)
+    assert b"".join(src.open_from(2)) == sector_bytes(100, 300)
+    assert b"".join(src.open_sectors(123, 130)) == sector_bytes(123, 130)
+    src.close()
+
+
+def test_ioctl_stops_before_data_session(tmp_path):
+    src, _ = make_ioctl_source(tmp_path, data_tracks=[3])
+    src._ioctl.leadout = 12000
+    src._ioctl.starts[2] = 11650
+    tracks = src.list_tracks()
+    assert [(t.number, t.sectors) for t in tracks] == [(1, 100), (2, 150)]
+    src.close()
+
+
+def test_ioctl_read_error_is_a_stall(tmp_path):
+    src, _ = make_ioctl_source(tmp_path, bad_sectors=[160])
+    with pytest.raises(SourceStallError):
+        b"".join(src.open(2))
+    with pytest.raises(TrackSourceError):
+        src.open(9)
+    src.close()
+
+
+def test_ioctl_rejects_oversized_batch():
+    with pytest.raises(ValueError):
+        IoctlCdSource("/dev/null", batch_sectors=76)
+
+
+def test_create_source_ioctl_reader(monkeypatch):
+    monkeypatch.setattr("sys.platform", "linux")
+    assert isinstance(create_source("/dev/sr0", reader="ioctl"), IoctlCdSource)
+    with pytest.raises(ValueError):
+        create_source("/dev/sr0", reader="cdda2wav")
+
+
+# --- シーク ---
+
+def test_cdparanoia_seek_uses_span_position_and_drops_partial_sector(monkeypatch):
+    src = CdparanoiaSource(device="/dev/null", binary=FAKE_BIN)
+    assert src.position_spec(3) == "3"
+    assert src.position_spec(3, 75 * 61 + 10) == "3[1:01.10]"
+    spawned = []
+    monkeypatch.setattr(src, "_spawn", lambda argv: (
+        spawned.append(argv) or io.BytesIO(b"x" * 4000)))
+    data = b"".join(src.open(2, start_frame=588 * 75 + 100))
+    assert spawned[-1][-2] == "2[0:01.00]-2"
+    assert data == b"x" * 3600  # セクタ内の 100 フレームを読み捨てる
+    b"".join(src.open_from(2, start_frame=588 * 2))
+    assert spawned[-1][-2] == "2[0:00.02]-"
+
+
+def test_ioctl_seek_is_frame_exact(tmp_path):
+    src, fake = make_ioctl_source(tmp_path)
+    data = b"".join(src.open(2, start_frame=600))
+    src.close()
+    assert fake.reads[0][0] == 101
+    assert data == sector_bytes(100, 250)[600 * 4:]
+
+
+def test_file_tree_and_aiff_seek(tmp_path):
+    make_track(tmp_path / "01.wav", 1000, "WAV", value=1)
+    make_track(tmp_path / "02.flac", 1000, "FLAC", value=2)
+    src = FileTreeSource(str(tmp_path))
+    assert len(b"".join(src.open(1, start_frame=900))) == 100 * 4
+    assert len(b"".join(src.open_from(1, start_frame=900))) == 1100 * 4
+    assert len(b"".join(src.open(2, start_frame=10))) == 990 * 4
+    src.close()
+    make_aiff(tmp_path / "1 Audio Track.aiff")
+    aiff = AiffFileSource(str(tmp_path))
+    assert len(b"".join(aiff.open(1, start_frame=250))) == 750 * 4
+    aiff.close()
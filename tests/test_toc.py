@@ -2,7 +2,14 @@ from types import SimpleNamespace
 
 import pytest
 
-from src.disc.toc import TocError, TocReader, resolve_mac_raw_device
+import functools
+
+from src.audio.sources import parse_cdparanoia_toc
+from src.disc.cdrom import CdromDevice
+from src.disc.toc import (TocError, TocReader, disc_id_from_tracks,
+                          musicbrainz_disc_id, read_disc,
+                          resolve_mac_raw_device)
+from tests.support import FakeCdromIoctl, write_fake_disc
 
 
 def fake_disc():
@@ -19,6 +26,7 @@ def test_toc_reader_success():
     assert info.disc_id == "abc123"
     assert [t.number for t in info.tracks] == [1, 2]
     assert info.tracks[0].duration == pytest.approx(200.0)
+    assert [t.sectors for t in info.tracks] == [15000, 22500]
 
 
 def test_toc_reader_retries_then_fails():
@@ -55,3 +63,62 @@ def test_resolve_mac_raw_device():
 
 def test_resolve_mac_raw_device_not_found():
     assert resolve_mac_raw_device("/Volumes/Nope", "") is None
+
+
+# MusicBrainz の「Disc ID Calculation」の例(6 トラック)
+MB_EXAMPLE_ID = "49HHV7Eb8UKF3aQiNmu1GR8vKTY-"
+MB_EXAMPLE_OFFSETS = [150, 15363, 32314, 46592, 63414, 80489]
+MB_EXAMPLE_LEADOUT = 95462
+
+
+def test_musicbrainz_disc_id_matches_reference():
+    assert musicbrainz_disc_id(1, 6, MB_EXAMPLE_LEADOUT,
+                               MB_EXAMPLE_OFFSETS) == MB_EXAMPLE_ID
+
+
+def ioctl_disc(tmp_path, data_tracks=()):
+    starts = [o - 150 for o in MB_EXAMPLE_OFFSETS]
+    leadout = MB_EXAMPLE_LEADOUT - 150
+    if data_tracks:  # CD-Extra: セッション間ギャップの後にデータトラック
+        starts.append(leadout + 11400)
+        leadout = starts[-1] + 1000
+    image = write_fake_disc(tmp_path / "disc.img", 1)
+    fake = FakeCdromIoctl(starts=starts, leadout=leadout,
+                          data_tracks=data_tracks)
+    return image, functools.partial(CdromDevice, ioctl=fake)
+
+
+def test_read_disc_computes_id_and_offsets_from_one_toc_read(tmp_path):
+    image, open_device = ioctl_disc(tmp_path)
+    disc = read_disc(image, open_device=open_device)
+    assert disc.id == MB_EXAMPLE_ID
+    assert [t.offset for t in disc.tracks] == MB_EXAMPLE_OFFSETS
+    assert disc.tracks[-1].sectors == MB_EXAMPLE_LEADOUT - 80489
+    info = TocReader(read_fn=lambda d: read_disc(d, open_device=open_device),
+                     sleep_fn=lambda s: None).read(image)
+    assert info.disc_id == MB_EXAMPLE_ID
+    assert info.tracks[1].start == 15363 - 150
+
+
+def test_read_disc_leaves_out_trailing_data_track(tmp_path):
+    image, open_device = ioctl_disc(tmp_path, data_tracks={7})
+    disc = read_disc(image, open_device=open_device)
+    assert disc.id == MB_EXAMPLE_ID
+    assert [t.number for t in disc.tracks] == [1, 2, 3, 4, 5, 6]
+
+
+def test_disc_id_from_cdparanoia_listing():
+    rows = []
+    for n, (begin, end) in enumerate(zip(MB_EXAMPLE_OFFSETS,
+                                         MB_EXAMPLE_OFFSETS[1:]
+                                         + [MB_EXAMPLE_LEADOUT]), 1):
+        rows.append(f"  {n}.    {end - begin} [00:00.00]    {begin - 150} "
+                    f"[00:00.00]    no   no  2")
+    tracks = parse_cdparanoia_toc("\n".join(rows))
+    assert disc_id_from_tracks(tracks) == MB_EXAMPLE_ID
+
+
+def test_disc_id_needs_track_positions():
+    tracks = TocReader(read_fn=lambda d=None: fake_disc(),
+                       sleep_fn=lambda s: None).read("/dev/sr0").tracks
+    assert disc_id_from_tracks(tracks) is None
@@ -1,5 +1,5 @@
 from src.core.events import AppState, ViewState
-from src.ui.view import (ensure_fullscreen, format_artist_line,
+from src.ui.view import (WakePipe, ensure_fullscreen, format_artist_line,
                          format_track_line)
 
 
@@ -60,3 +60,15 @@ def test_artist_line_full():
 def test_artist_line_counter_only():
     vs = ViewState(AppState.PLAYING, track_number=2, track_total=9)
     assert format_artist_line(vs) == "2 / 9"
+
+
+def test_wake_pipe_coalesces_wakeups():
+    import select
+    wake = WakePipe()
+    assert select.select([wake], [], [], 0)[0] == []
+    for _ in range(100000):  # パイプが一杯でも詰まらない
+        wake.wake()
+    assert select.select([wake], [], [], 0)[0] == [wake]
+    wake.drain()
+    assert select.select([wake], [], [], 0)[0] == []
+    wake.close()